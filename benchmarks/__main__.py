@@ -0,0 +1,4 @@
+from benchmarks.suite import main
+
+
+main()
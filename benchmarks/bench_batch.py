@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+# Scripted commands per second through run_script, one command at a time
+# and as a mix, with plain and JSON output.
+#
+#     python -m benchmarks.bench_batch
+
+import io
+import time
+from itertools import cycle, islice
+
+from riskcli import run_script
+
+
+MIXES = [
+    ('roll', ['roll 3']),
+    ('attack', ['attack 3 2']),
+    ('odds', ['odds 3 2']),
+    ('view', ['view Alaska', 'view Asia', 'view player1']),
+    ('player', ['player']),
+    ('mix', ['roll 3', 'attack 3 2', 'odds 3 2', 'view Alaska',
+             'view Kamchatka', 'attack 2 1', 'roll 1']),
+]
+
+
+def commands_per_second(commands, json_output, count=50000):
+    lines = ['start seed=0'] + list(islice(cycle(commands), count))
+    started = time.perf_counter()
+    run_script(lines, out=io.StringIO(), json_output=json_output)
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    print(f'  {"commands":10s} {"text /s":>10s} {"json /s":>10s}')
+    for name, commands in MIXES:
+        print(f'  {name:10s} {commands_per_second(commands, False):10.0f} '
+              f'{commands_per_second(commands, True):10.0f}')
+
+
+if __name__ == '__main__':
+    main()
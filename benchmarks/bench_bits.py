@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# Whole-player queries through the Territory objects versus Map.bitboards,
+# and what keeping the bitboards up to date adds to an owner change.
+#
+#     python -m benchmarks.bench_bits
+
+from riskcli import Player, gen_default_map
+from riskengine import is_border
+from riskmaps import generate_map
+from benchmarks.bench_collections import deal, time_per_call
+
+
+def bench(label, game_map):
+    players = [Player('p1', 'red'), Player('p2', 'black'),
+               Player('p3', 'blue')]
+    deal(game_map, players)
+    player = players[0]
+    continent = game_map.continents[0]
+    t = game_map.territories[0]
+
+    def change_owner():
+        t.owner = players[1]
+        t.owner = players[0]
+
+    object_cases = [
+        ('border', lambda: [u for u in player.territories.iter_unordered()
+                            if is_border(u)]),
+        ('frontier', lambda: {n for u in player.territories.iter_unordered()
+                              for n in u.neighbors.iter_unordered()
+                              if n.owner is not player}),
+        ('owns continent', lambda: all(u.owner is player
+                                       for u in continent.territories)),
+        ('owner change and back', change_owner),
+    ]
+    bits = game_map.bitboards
+    bit_cases = [
+        lambda: bits.border(player),
+        lambda: bits.frontier(player),
+        lambda: bits.owns_continent(player, continent),
+        change_owner,
+    ]
+    print(f'{label} ({len(game_map.territories)} territories)')
+    print(f'  {"":24s} {"objects us":>12s} {"bitboards us":>12s}')
+    # the owner change is timed without bitboards first
+    game_map._bitboards = None
+    objects = [time_per_call(fn) for _, fn in object_cases]
+    game_map.bitboards
+    for (name, _), before, fn in zip(object_cases, objects, bit_cases):
+        print(f'  {name:24s} {before * 1e6:12.2f} '
+              f'{time_per_call(fn) * 1e6:12.2f}')
+
+
+def main():
+    bench('default map', gen_default_map())
+    for n in [1000, 5000]:
+        bench('generated map', generate_map(n).build())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+# Iteration cost of the Territories/Neighbors collections.
+#
+#     python -m benchmarks.bench_collections
+
+from itertools import cycle
+from timeit import Timer
+
+from riskcli import Player, gen_default_map
+from riskmaps import generate_map
+
+
+def deal(game_map, players):
+    for t, p in zip(game_map.territories, cycle(players)):
+        t.owner = p
+        t.num_armies = 1
+
+
+def legacy_iter(collection):
+    # what every __iter__ used to do
+    return sorted(collection._set, key=lambda t: t.name).__iter__()
+
+
+def time_per_call(fn, repeat=5):
+    timer = Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def bench_map(label, game_map):
+    players = [Player('p1', 'red'), Player('p2', 'black')]
+    deal(game_map, players)
+    territories = players[0].territories
+    t = game_map.territories[0]
+
+    def all_neighbors_legacy():
+        for u in game_map.territories:
+            for _ in legacy_iter(u.neighbors):
+                pass
+
+    def all_neighbors_sorted():
+        for u in game_map.territories:
+            for _ in u.neighbors:
+                pass
+
+    def all_neighbors_unordered():
+        for u in game_map.territories:
+            for _ in u.neighbors.iter_unordered():
+                pass
+
+    def print_player_scan():
+        for c in game_map.continents:
+            [u for u in c.territories if u.owner is players[0]]
+
+    def change_owner():
+        t.owner = players[1]
+        t.owner = players[0]
+
+    cases = [
+        ('player territories, legacy sort',
+         lambda: list(legacy_iter(territories))),
+        ('player territories, sorted view', lambda: list(territories)),
+        ('player territories, unordered',
+         lambda: list(territories.iter_unordered())),
+        ('all neighbors, legacy sort', all_neighbors_legacy),
+        ('all neighbors, sorted view', all_neighbors_sorted),
+        ('all neighbors, unordered', all_neighbors_unordered),
+        ('cmd_print_player scan', print_player_scan),
+        ('owner change and back', change_owner),
+    ]
+    print(f'{label} ({len(game_map.territories)} territories)')
+    for name, fn in cases:
+        print(f'  {name:36s} {time_per_call(fn) * 1e6:10.2f} us')
+
+
+def main():
+    bench_map('default map', gen_default_map())
+    bench_map('generated map', generate_map(5000).build())
+
+
+if __name__ == '__main__':
+    main()
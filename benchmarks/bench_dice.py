@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+# roll() with the global random generator versus buffered Dice.
+#
+#     python -m benchmarks.bench_dice
+
+import random
+
+from riskcli import roll
+from riskdice import Dice, RecordingDice
+from benchmarks.bench_collections import time_per_call
+
+
+def main():
+    random.seed(0)
+    dice = Dice(0)
+    recording = RecordingDice(Dice(0))
+    for num_dice in [1, 2, 3]:
+        cases = [
+            ('randint', lambda: roll(num_dice)),
+            ('Dice', lambda: roll(num_dice, dice)),
+            ('Dice.roll', lambda: dice.roll(num_dice)),
+            ('recording', lambda: recording.roll(num_dice)),
+        ]
+        print(f'{num_dice} dice')
+        for name, fn in cases:
+            print(f'  {name:12s} {time_per_call(fn) * 1e9:8.0f} ns')
+        recording.events.clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+# Streaming simulated battles to .npz and Parquet: rows per second and peak
+# memory, which should stay flat however many rows are written.
+#
+#     python -m benchmarks.bench_export [num_battles]
+
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from riskexport import export_battles, pyarrow
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000000
+    directory = tempfile.mkdtemp()
+    formats = ['npz'] + (['parquet'] if pyarrow is not None else [])
+    try:
+        for fmt in formats:
+            path = os.path.join(directory, f'battles.{fmt}')
+            started = time.perf_counter()
+            export_battles(path, count, 20, 20, seed=0)
+            elapsed = time.perf_counter() - started
+            peak_mb = resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f'{fmt:8s} {count / elapsed:12.0f} rows/s  '
+                  f'{os.path.getsize(path) / 1e6:8.1f} MB on disk  '
+                  f'peak RSS {peak_mb:.0f} MB')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
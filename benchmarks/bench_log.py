@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+# Event log write throughput, full replay speed, and the latency of
+# reconstructing a late turn with and without snapshots.
+#
+#     python -m benchmarks.bench_log [num_events]
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from random import Random
+
+from riskcli import Game, Player, deal_territories, gen_default_map
+from risklog import EventLogReader, EventLogWriter
+
+
+def write_log(path, num_events, snapshot_every):
+    # Synthetic turns of 100 events: some reinforcements, exchanges and a
+    # move, against a real dealt game so snapshots have something to copy.
+    rng = Random(0)
+    game = Game(players=[Player('p1', 'red'), Player('p2', 'black'),
+                         Player('p3', 'blue')], game_map=gen_default_map())
+    deal_territories(game, rng)
+    territories = game.game_map.territories
+    started = time.perf_counter()
+    with EventLogWriter(path, game, snapshot_every=snapshot_every) as log:
+        turn = 0
+        while log.count < num_events:
+            log.turn(game.next_player, turn)
+            for _ in range(3):
+                log.reinforce(rng.choice(territories), 1)
+            for _ in range(95):
+                log.exchange(territories[0], territories[1], [6, 4, 1],
+                             [5, 3], 1, 1)
+            log.move(territories[0], territories[1], 1)
+            turn += 1
+    return turn, time.perf_counter() - started
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    directory = tempfile.mkdtemp()
+    try:
+        for snapshot_every in [10 ** 9, 10000]:
+            path = os.path.join(directory, f'{snapshot_every}.log')
+            turns, elapsed = write_log(path, num_events, snapshot_every)
+            reader = EventLogReader(path)
+            players = [(f'p{i + 1}', '') for i in range(3)]
+            game_map = gen_default_map()
+
+            started = time.perf_counter()
+            reader.state_at(game_map, players)
+            replay = time.perf_counter() - started
+
+            started = time.perf_counter()
+            reader.state_at(game_map, players, turn=turns - 1)
+            late_turn = time.perf_counter() - started
+
+            print(f'snapshot every {snapshot_every} records '
+                  f'({len(reader.snapshots)} snapshots, '
+                  f'{os.path.getsize(path) / 1e6:.1f} MB)')
+            print(f'  {"write":24s} {len(reader) / elapsed:12.0f} events/s')
+            print(f'  {"state at end":24s} {replay * 1e3:12.2f} ms'
+                  f'  ({len(reader) / replay:.0f} records/s)')
+            print(f'  {"state at last turn":24s} {late_turn * 1e3:12.2f} ms')
+            reader.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
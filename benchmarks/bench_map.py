@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+# Map distance table and owner-restricted region queries.
+#
+#     python -m benchmarks.bench_map
+
+from random import Random
+from timeit import Timer
+
+from riskcli import Player, gen_default_map
+from riskmaps import generate_map
+from benchmarks.bench_collections import deal, time_per_call
+
+
+def flood_fill(territory):
+    # what a region query costs without the incremental index
+    members = {territory}
+    frontier = [territory]
+    while frontier:
+        u = frontier.pop()
+        for v in u.neighbors.iter_unordered():
+            if v.owner is territory.owner and v not in members:
+                members.add(v)
+                frontier.append(v)
+    return members
+
+
+def bench_map(label, build):
+    started = Timer(build)
+    build_time = min(started.repeat(3, 1))
+    game_map = build()
+    n = len(game_map.territories)
+
+    rows = min(n, 200)
+
+    def distance_rows():
+        game_map._distances = [None] * n
+        for i in range(rows):
+            game_map.distances_from(i)
+
+    players = [Player('p1', 'red'), Player('p2', 'black')]
+    deal(game_map, players)
+    rng = Random(0)
+    pairs = [(rng.choice(game_map.territories),
+              rng.choice(game_map.territories)) for _ in range(1000)]
+    changes = [(rng.choice(game_map.territories), rng.choice(players))
+               for _ in range(1000)]
+
+    def distance_queries():
+        for a, b in pairs:
+            game_map.distance(a, b)
+
+    def connected_queries():
+        for a, b in pairs:
+            game_map.connected(a, b)
+
+    def flood_fill_queries():
+        for a, b in pairs:
+            a.owner is b.owner and b in flood_fill(a)
+
+    def ownership_changes():
+        for t, p in changes:
+            t.owner = p
+
+    print(f'{label} ({n} territories)')
+    print(f'  {"Map construction":36s} {build_time * 1e3:10.2f} ms')
+    row_time = min(Timer(distance_rows).repeat(1, 1)) / rows
+    print(f'  {"distance row (BFS)":36s} {row_time * 1e3:10.2f} ms')
+    print(f'  {"all-pairs distances (estimated)":36s} '
+          f'{row_time * n * 1e3:10.2f} ms')
+    for name, fn in [('1000 distance queries', distance_queries),
+                     ('1000 connected queries', connected_queries),
+                     ('1000 flood-fill queries', flood_fill_queries),
+                     ('1000 ownership changes', ownership_changes)]:
+        print(f'  {name:36s} {time_per_call(fn, 3) * 1e3:10.2f} ms')
+
+
+def main():
+    bench_map('default map', gen_default_map)
+    bench_map('generated map', lambda: generate_map(1000).build())
+    bench_map('generated map', lambda: generate_map(5000).build())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+# Generating maps, and loading them from text versus the compiled binary
+# form, from the size of the classic map up to 100,000 territories.
+#
+#     python -m benchmarks.bench_maps
+
+import os
+import shutil
+import tempfile
+import time
+
+from riskmaps import (compile_map, generate_map, load_compiled, load_json,
+                      write_json)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        for n in [42, 1000, 10000, 100000]:
+            template, generate_time = timed(lambda: generate_map(n))
+            json_path = os.path.join(directory, f'{n}.json')
+            rmap_path = os.path.join(directory, f'{n}.rmap')
+            write_json(template, json_path)
+            compile_map(template, rmap_path)
+            _, json_time = timed(lambda: load_json(json_path))
+            loaded, rmap_time = timed(lambda: load_compiled(rmap_path))
+            _, build_time = timed(loaded.build)
+            print(f'{n} territories')
+            print(f'  {"generate":28s} {generate_time * 1e3:10.2f} ms')
+            print(f'  {"parse + validate JSON":28s} {json_time * 1e3:10.2f} ms'
+                  f'  ({os.path.getsize(json_path)} bytes)')
+            print(f'  {"load compiled":28s} {rmap_time * 1e3:10.2f} ms'
+                  f'  ({os.path.getsize(rmap_path)} bytes)')
+            print(f'  {"build Map from compiled":28s} '
+                  f'{build_time * 1e3:10.2f} ms')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+# Reinforcement scoring and placement on the default map and on large
+# random maps; the cost per territory should stay flat as maps grow.
+#
+#     python -m benchmarks.bench_place
+
+from random import Random
+
+from riskcli import Game, Player, gen_default_map
+from riskplace import reinforcement_counts, recommend_placements
+from riskstate import GameState
+from riskmaps import generate_map
+from benchmarks.bench_collections import deal, time_per_call
+
+
+def bench(label, game_map):
+    players = [Player('p1', 'red'), Player('p2', 'black'),
+               Player('p3', 'blue')]
+    deal(game_map, players)
+    rng = Random(0)
+    for t in game_map.territories:
+        t.num_armies = rng.randint(1, 10)
+    state = GameState.from_game(Game(players=players, game_map=game_map))
+    n = len(game_map.territories)
+    counts = time_per_call(lambda: reinforcement_counts(state))
+    place = time_per_call(lambda: recommend_placements(state, 0))
+    print(f'{label:20s} counts {counts * 1e6:9.1f} us  '
+          f'placements {place * 1e6:9.1f} us  '
+          f'({place / n * 1e9:6.1f} ns/territory)')
+
+
+def main():
+    bench('default map', gen_default_map())
+    for n in [1000, 10000, 100000]:
+        bench(f'{n} territories', generate_map(n).build())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+# Attack planner latency for taking Asia from Ukraine on random boards,
+# with the battle tables already warm as they are for a bot mid-game.
+#
+#     python -m benchmarks.bench_plan [num_boards]
+
+import sys
+import time
+from random import Random
+
+from riskcli import Game, Player, gen_default_map
+from riskplan import plan_attack
+
+
+def board(rng, num_armies, max_defenders):
+    game = Game(players=[Player('p1', 'red'), Player('p2', 'black')],
+                game_map=gen_default_map())
+    for t in game.game_map.territories:
+        t.owner = game.players[1]
+        t.num_armies = rng.randint(1, max_defenders)
+    source = game.game_map.t_by_name['Ukraine']
+    source.owner = game.players[0]
+    source.num_armies = num_armies
+    return source, game.game_map.c_by_name['Asia']
+
+
+def main():
+    num_boards = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = Random(0)
+    for objective in ['probability', 'armies']:
+        times = []
+        nodes = []
+        for _ in range(num_boards):
+            source, asia = board(rng, rng.randint(15, 80),
+                                 rng.randint(1, 5))
+            plan_attack(source, asia, objective)
+            started = time.perf_counter()
+            plan = plan_attack(source, asia, objective)
+            times.append(time.perf_counter() - started)
+            nodes.append(plan.nodes if plan else 0)
+        times.sort()
+        print(f'{objective:12s} p50 {times[len(times) // 2] * 1e3:7.2f} ms'
+              f'  p99 {times[int(len(times) * 0.99)] * 1e3:7.2f} ms'
+              f'  max {times[-1] * 1e3:7.2f} ms'
+              f'  mean nodes {sum(nodes) / len(nodes):.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+# Import time of riskcli and latency of starting a game.
+#
+#     python -m benchmarks.bench_startup
+
+import io
+import subprocess
+import sys
+from contextlib import redirect_stdout
+from timeit import Timer
+
+
+def import_times(module, runs=5):
+    # Run `python -X importtime` in fresh interpreters and keep the fastest
+    # cumulative time (in microseconds) of each module imported by `module`.
+    best = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative_us, name = line.split('|')
+            name = name.strip()
+            cumulative_us = int(cumulative_us)
+            if name not in best or cumulative_us < best[name]:
+                best[name] = cumulative_us
+    return best
+
+
+def main():
+    times = import_times('riskcli')
+    print(f'import riskcli: {times["riskcli"] / 1e3:.2f} ms cumulative')
+    for name in ['readline', 'traceback', 'random', 'riskodds']:
+        if name in times:
+            print(f'  {name:30s} {times[name] / 1e3:8.2f} ms')
+        else:
+            print(f'  {name:30s}   not imported')
+
+    import riskcli
+
+    def start():
+        with redirect_stdout(io.StringIO()):
+            riskcli.cmd_start()
+
+    for name, fn in [('map from names', riskcli._build_default_map),
+                     ('gen_default_map', riskcli.gen_default_map),
+                     ('cmd_start', start)]:
+        timer = Timer(fn)
+        number, _ = timer.autorange()
+        per_call = min(timer.repeat(5, number)) / number
+        print(f'{name:32s} {per_call * 1e3:8.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
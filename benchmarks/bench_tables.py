@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+# Exchanges rolled die by die versus drawn from the exchange tables, one
+# at a time and vectorized, and whole battles simulated both ways.
+#
+#     python -m benchmarks.bench_tables
+
+from random import Random
+
+import numpy as np
+
+from riskcli import resolve_exchange
+from risksim import (MAX_ATTACK_DICE, MAX_DEFEND_DICE, make_rng, roll_batch,
+                     resolve_exchanges, sample_exchanges, simulate_battles,
+                     simulate_exchanges)
+from risktables import sample_exchange
+from benchmarks.bench_collections import time_per_call
+
+
+def dice_battles(attackers, defenders, size, rng=None):
+    # what simulate_battles did before the tables
+    rng = make_rng(rng)
+    a = np.full(size, attackers, dtype=np.int64)
+    d = np.full(size, defenders, dtype=np.int64)
+    active = np.arange(size)
+    while active.size:
+        aa = a[active]
+        dd = d[active]
+        attacker_loses, defender_loses = resolve_exchanges(
+            roll_batch(np.minimum(aa, MAX_ATTACK_DICE), active.size, rng,
+                       MAX_ATTACK_DICE),
+            roll_batch(np.minimum(dd, MAX_DEFEND_DICE), active.size, rng,
+                       MAX_DEFEND_DICE))
+        aa -= attacker_loses
+        dd -= defender_loses
+        a[active] = aa
+        d[active] = dd
+        active = active[(aa > 0) & (dd > 0)]
+    return a, d
+
+
+def report(title, cases, scale, unit):
+    print(title)
+    for name, fn in cases:
+        print(f'  {name:28s} {time_per_call(fn) * scale:10.2f} {unit}')
+
+
+def main():
+    rng = Random(0)
+    randint = rng.randint
+
+    def rolled():
+        return resolve_exchange(
+            sorted([randint(1, 6) for _ in range(3)], reverse=True),
+            sorted([randint(1, 6) for _ in range(2)], reverse=True))
+
+    report('one exchange, 3 dice against 2', [
+        ('rolled', rolled),
+        ('table', lambda: sample_exchange(3, 2, rng)),
+    ], 1e9, 'ns')
+    size = 100000
+    generator = np.random.default_rng(0)
+    report(f'{size} exchanges, vectorized', [
+        ('rolled', lambda: simulate_exchanges(3, 2, size, generator)),
+        ('table', lambda: sample_exchanges(3, 2, size, generator)),
+    ], 1e3, 'ms')
+    report(f'{size} battles, 10 against 10', [
+        ('rolled', lambda: dice_battles(10, 10, size, generator)),
+        ('table', lambda: simulate_battles(10, 10, size, generator)),
+    ], 1e3, 'ms')
+
+
+if __name__ == '__main__':
+    main()
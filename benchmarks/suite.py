@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+# Seeded benchmark scenarios with JSON results and a regression check.
+# The bench_* scripts explore one subject each in more detail; this is the
+# set worth tracking from one change to the next.
+#
+#     python -m benchmarks run --output results.json
+#     python -m benchmarks compare baseline.json results.json
+#
+# `compare` exits with status 1 if any scenario got slower than the
+# threshold allows, so it can gate a CI job.
+
+import argparse
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from itertools import cycle, islice
+
+import riskcli
+from riskcli import (Game, Player, Territory, cmd_attack, gen_default_map,
+                     roll)
+from riskdice import Dice
+from riskengine import AggressivePolicy, HeadlessGame, RandomPolicy
+from riskmaps import generate_map
+from benchmarks.bench_collections import deal, time_per_call
+
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    # Register a setup function returning the callable to time. Setups
+    # seed everything they use, so every run times the same work.
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+@scenario('dice.roll')
+def roll_three():
+    random.seed(0)
+    return lambda: roll(3)
+
+
+@scenario('dice.roll_buffered')
+def roll_buffered():
+    dice = Dice(0)
+    return lambda: roll(3, dice)
+
+
+@scenario('dice.cmd_attack')
+def attack():
+    random.seed(0)
+    out = io.StringIO()
+
+    def run():
+        with redirect_stdout(out):
+            cmd_attack(3, 2)
+        out.seek(0)
+        out.truncate()
+    return run
+
+
+def dealt_map(game_map):
+    players = [Player('p1', 'red'), Player('p2', 'black')]
+    deal(game_map, players)
+    return game_map, players
+
+
+def collection_scenarios(label, build):
+    @scenario(f'collections.{label}.territories_iterate')
+    def territories_iterate():
+        _, players = dealt_map(build())
+        territories = players[0].territories
+        return lambda: list(territories)
+
+    @scenario(f'collections.{label}.territories_add_remove')
+    def territories_add_remove():
+        game_map, players = dealt_map(build())
+        rng = random.Random(0)
+        changes = [rng.choice(game_map.territories) for _ in range(100)]
+
+        def run():
+            # every territory changes owner and back: a remove and an add
+            # on each of the two players
+            for t in changes:
+                owner = t.owner
+                t.owner = players[1] if owner is players[0] else players[0]
+                t.owner = owner
+        return run
+
+    @scenario(f'collections.{label}.neighbors_iterate')
+    def neighbors_iterate():
+        game_map, _ = dealt_map(build())
+
+        def run():
+            for t in game_map.territories:
+                for _ in t.neighbors:
+                    pass
+        return run
+
+
+collection_scenarios('default', gen_default_map)
+collection_scenarios('1000', lambda: generate_map(1000).build())
+
+
+@scenario('collections.neighbors_add_remove')
+def neighbors_add_remove():
+    # Free-standing territories, so the map's tables aren't involved.
+    territories = [Territory(f'T{i:03d}') for i in range(100)]
+    for t, u in zip(territories, territories[1:]):
+        t.neighbors.add(u)
+    hub = territories[0]
+    list(hub.neighbors)
+
+    def run():
+        for t in territories[2:]:
+            hub.neighbors.add(t)
+        for t in territories[2:]:
+            hub.neighbors.remove(t)
+    return run
+
+
+@scenario('map.gen_default_map')
+def build_default():
+    return gen_default_map
+
+
+@scenario('map.build_from_names')
+def build_from_names():
+    return riskcli._build_default_map
+
+
+@scenario('map.generate_map_1000')
+def generate():
+    return lambda: generate_map(1000)
+
+
+@scenario('game.get_object_by_name')
+def lookups():
+    players = [Player('player1', 'red'), Player('player2', 'black')]
+    game = Game(players=players, game_map=gen_default_map())
+    for t, p in zip(game.game_map.territories, cycle(players)):
+        t.owner = p
+    names = ['player2', riskcli.KAMCHATKA, 'Asia', riskcli.W_US,
+             'South America', 'nobody']
+
+    def run():
+        for name in names:
+            game.get_object_by_name(name)
+    return run
+
+
+@scenario('game.hypothetical')
+def what_if():
+    # A conquest tried out and taken back.
+    players = [Player('player1', 'red'), Player('player2', 'black')]
+    game = Game(players=players, game_map=gen_default_map())
+    deal(game.game_map, players)
+    t_by_name = game.game_map.t_by_name
+    source = t_by_name[riskcli.ALASKA]
+    target = t_by_name[riskcli.KAMCHATKA]
+    source.owner = players[0]
+    source.num_armies = 10
+    target.owner = players[1]
+
+    def run():
+        with game.hypothetical():
+            target.owner = players[0]
+            target.num_armies = 3
+            source.num_armies = 1
+    return run
+
+
+@scenario('cli.run_script_1000')
+def scripted():
+    # A thousand cheap commands on the default game, with JSON results.
+    commands = ['roll 3', 'attack 3 2', 'odds 3 2', 'view Alaska',
+                'view Kamchatka', 'attack 2 1', 'roll 1']
+    lines = list(islice(cycle(commands), 1000))
+    game, _, _ = riskcli.run_script(['start seed=0'], out=io.StringIO())
+    return lambda: riskcli.run_script(lines, game, io.StringIO(),
+                                      json_output=True)
+
+
+@scenario('game.headless')
+def headless_game():
+    # The same games in every call: games differ a lot in length, so
+    # cycling through seeds would make the time depend on how many calls
+    # the timer happens to make.
+    def run():
+        for seed in range(5):
+            HeadlessGame([AggressivePolicy, RandomPolicy], seed=seed).play()
+    return run
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenarios(names, repeat=5):
+    results = {}
+    for name in names:
+        fn = SCENARIOS[name]()
+        seconds = time_per_call(fn, repeat)
+        results[name] = {'seconds_per_call': seconds}
+        print(f'  {name:48s} {seconds * 1e6:12.2f} us')
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    # Returns the names of scenarios that are slower than the baseline by
+    # more than `threshold` (a fraction).
+    regressions = []
+    print(f'  {"scenario":48s} {"baseline us":>12s} {"current us":>12s} '
+          f'{"change":>8s}')
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            print(f'  {name:48s} {"":>12s} '
+                  f'{result["seconds_per_call"] * 1e6:12.2f}      new')
+            continue
+        before = baseline['results'][name]['seconds_per_call']
+        after = result['seconds_per_call']
+        if before <= 0:
+            print(f'  {name:48s} {before * 1e6:12.2f} {after * 1e6:12.2f} '
+                  f'     n/a  (no usable baseline)')
+            continue
+        change = after / before - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print(f'  {name:48s} {before * 1e6:12.2f} {after * 1e6:12.2f} '
+              f'{change:+8.1%}{flag}')
+    return regressions
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Run the benchmark suite.')
+    sub = parser.add_subparsers(dest='command')
+    run = sub.add_parser('run', help='run the scenarios')
+    run.add_argument('--output', help='write the results to this JSON file')
+    run.add_argument('--filter', default='',
+                     help='only run scenarios whose name contains this')
+    run.add_argument('--repeat', type=int, default=5)
+    cmp = sub.add_parser('compare', help='compare results with a baseline')
+    cmp.add_argument('baseline')
+    cmp.add_argument('current', nargs='?',
+                     help='results to check (default: run the suite now)')
+    cmp.add_argument('--threshold', type=float, default=0.10,
+                     help='allowed slowdown as a fraction (default 0.10)')
+    sub.add_parser('list', help='list the scenarios')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        names = [name for name in SCENARIOS if args.filter in name]
+        results = run_scenarios(names, args.repeat)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+    elif args.command == 'compare':
+        baseline = load(args.baseline)
+        if args.current:
+            current = load(args.current)
+        else:
+            current = run_scenarios([name for name in SCENARIOS
+                                     if name in baseline['results']])
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s) beyond '
+                  f'{args.threshold:.0%}')
+            sys.exit(1)
+    elif args.command == 'list':
+        for name in SCENARIOS:
+            print(name)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
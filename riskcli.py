@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 
-import traceback
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
 from itertools import cycle
 from random import randint, shuffle
-import readline
 
+from riskodds import battle_odds
 
-def roll(num_dice):
+
+def roll(num_dice, dice=None):
+    # `dice` is a riskdice.Dice or anything else with its roll method; by
+    # default dice come from the global random generator.
+    if dice is not None:
+        return dice.roll(num_dice)
     return sorted([randint(1, 6) for _ in range(num_dice)], reverse=True)
 
 
@@ -59,31 +66,106 @@ W_EURO = 'Western Europe'
 W_US = 'Western United States'
 YAKUTSK = 'Yakutsk'
 
+# Short names accepted wherever a name is looked up, from the constants
+# above: "e_us" or "nw terr" for instance.
+ALIASES = {name: value for name, value in list(globals().items())
+           if name.isupper() and isinstance(value, str)}
+
+
+class SortedByName:
+    # Set of named objects that iterates in name order. The ordered view is
+    # built on first iteration and then kept up to date by _insert and
+    # _discard, so repeated iteration doesn't sort again. Updates change the
+    # lists in place, except that the first update after an iteration has
+    # started copies them: iterators run over the lists as they were when
+    # they started, so the set can be modified while it is being iterated
+    # over.
+    def __init__(self):
+        self._set = set()
+        self._sorted = None
+        self._names = None
+        self._shared = False
+
+    def __iter__(self):
+        if self._sorted is None:
+            self._sorted = sorted(self._set, key=lambda t: t.name)
+            self._names = [t.name for t in self._sorted]
+        self._shared = True
+        return self._sorted.__iter__()
+
+    def __contains__(self, item):
+        return item in self._set
+
+    def __len__(self):
+        return len(self._set)
+
+    def iter_unordered(self):
+        return self._set.__iter__()
+
+    def _unshare(self):
+        if self._shared:
+            self._sorted = self._sorted[:]
+            self._shared = False
+
+    def _insert(self, item):
+        self._set.add(item)
+        if self._sorted is not None:
+            self._unshare()
+            i = bisect_left(self._names, item.name)
+            self._sorted.insert(i, item)
+            self._names.insert(i, item.name)
+
+    def _discard(self, item):
+        self._set.remove(item)
+        if self._sorted is not None:
+            self._unshare()
+            i = bisect_left(self._names, item.name)
+            while self._sorted[i] is not item:
+                i += 1
+            del self._sorted[i]
+            del self._names[i]
+
 
 class Player:
     def __init__(self, name, color):
         self.name = name
         self.color = color
         self.territories = Player.Territories(self)
+        # Kept up to date by Territories, Territory.num_armies and
+        # Continent.Territories, so none of the queries below need a scan.
+        self._num_armies = 0
+        self._territories_by_continent = {}
 
     def count_all_armies(self):
-        count = 0
-        for t in self.territories:
-            count += t.num_armies
+        return self._num_armies
 
-    class Territories:
-        def __init__(self, player):
-            self.player = player
-            self._set = set()
+    def count_territories_in(self, continent):
+        return self._territories_by_continent.get(continent, 0)
+
+    def owns_continent(self, continent):
+        return (len(continent.territories) > 0 and
+                self.count_territories_in(continent) ==
+                len(continent.territories))
 
-        def __iter__(self):
-            return sorted(self._set, key=lambda t: t.name).__iter__()
+    def owned_continents(self):
+        return [c for c, count in self._territories_by_continent.items()
+                if count == len(c.territories)]
 
-        def __contains__(self, item):
-            return item in self._set
+    def reinforcements(self):
+        bonus = sum(c.bonus or 0 for c in self.owned_continents())
+        return max(3, len(self.territories) // 3) + bonus
+
+    def _add_to_continent(self, continent, delta):
+        count = self._territories_by_continent.get(continent, 0) + delta
+        if count:
+            self._territories_by_continent[continent] = count
+        else:
+            del self._territories_by_continent[continent]
 
-        def __len__(self):
-            return len(self._set)
+    class Territories(SortedByName):
+        def __init__(self, player):
+            self.player = player
+            super().__init__()
 
         def append(self, item):
             return self.add(item)
@@ -91,24 +173,48 @@ class Player:
         def add(self, item):
             if item not in self:
                 item.owner = None
-                self._set.add(item)
+                self._insert(item)
+                self.player._num_armies += item.num_armies
+                if item.continent is not None:
+                    self.player._add_to_continent(item.continent, 1)
+                if item._map is not None:
+                    item._map._territory_gained(item, self.player)
                 item.owner = self.player
 
         def remove(self, item):
             if item in self:
-                self._set.remove(item)
+                self._discard(item)
+                self.player._num_armies -= item.num_armies
+                if item.continent is not None:
+                    self.player._add_to_continent(item.continent, -1)
+                if item._map is not None:
+                    item._map._territory_lost(item)
                 item.owner = None
 
 
 class Territory:
     def __init__(self, name, neighbors_by_name=None):
         self.name = name
+        self.index = None
+        self._map = None
         self.neighbors = Territory.Neighbors(self)
         self._continent = None
         self._owner = None
-        self.num_armies = 0
+        self._num_armies = 0
         self.neighbors_by_name = neighbors_by_name
 
+    @property
+    def num_armies(self):
+        return self._num_armies
+
+    @num_armies.setter
+    def num_armies(self, value):
+        if self._map is not None and self._map._journal is not None:
+            self._map._record(self)
+        if self._owner is not None:
+            self._owner._num_armies += value - self._num_armies
+        self._num_armies = value
+
     @property
     def owner(self):
         return self._owner
@@ -116,6 +222,8 @@ class Territory:
     @owner.setter
     def owner(self, value):
         if value != self._owner:
+            if self._map is not None and self._map._journal is not None:
+                self._map._record(self)
             if self._owner is not None:
                 self._owner.territories.remove(self)
             self._owner = value
@@ -135,54 +243,37 @@ class Territory:
             if self._continent is not None:
                 self._continent.territories.add(self)
 
-    class Neighbors:
+    class Neighbors(SortedByName):
         def __init__(self, container):
             self.container = container
-            self._set = set()
-
-        def __iter__(self):
-            return sorted(self._set, key=lambda t: t.name).__iter__()
-
-        def __contains__(self, item):
-            return item in self._set
-
-        def __len__(self):
-            return len(self._set)
+            super().__init__()
 
         def append(self, item):
             return self.add(item)
 
         def add(self, item):
             if item not in self:
-                self._set.add(item)
+                self._insert(item)
                 item.neighbors.add(self.container)
 
         def remove(self, item):
             if item in self:
-                self._set.remove(item)
+                self._discard(item)
                 item.neighbors.remove(self.container)
 
 
 class Continent:
     def __init__(self, name, bonus=None, territories_by_name=None):
         self.name = name
+        self.index = None
         self.bonus = bonus
         self.territories = Continent.Territories(self)
         self.territories_by_name = territories_by_name
 
-    class Territories:
+    class Territories(SortedByName):
         def __init__(self, player):
             self.player = player
-            self._set = set()
-
-        def __iter__(self):
-            return sorted(self._set, key=lambda t: t.name).__iter__()
-
-        def __contains__(self, item):
-            return item in self._set
-
-        def __len__(self):
-            return len(self._set)
+            super().__init__()
 
         def append(self, item):
             return self.add(item)
@@ -190,24 +281,68 @@ class Continent:
         def add(self, item):
             if item not in self:
                 item.continent = None
-                self._set.add(item)
+                self._insert(item)
+                if item.owner is not None:
+                    item.owner._add_to_continent(self.player, 1)
                 item.continent = self.player
 
         def remove(self, item):
             if item in self:
-                self._set.remove(item)
+                self._discard(item)
+                if item.owner is not None:
+                    item.owner._add_to_continent(self.player, -1)
                 item.continent = None
 
 
+UNREACHABLE = 0xFFFF
+
+
 class Map:
-    def __init__(self, territories, continents):
+    # Maps up to this size get the full distance matrix at construction;
+    # on bigger ones rows are computed the first time they are needed.
+    EAGER_DISTANCE_LIMIT = 1000
+
+    def __init__(self, territories, continents, template=None):
         self.territories = territories
         self.continents = continents
+        self._template = template
+        # territory -> (owner, armies) before the innermost hypothetical
+        # block changed it, and the journals of the blocks around it
+        self._journal = None
+        self._outer_journals = []
 
         self.t_by_name = {}
-        for t in self.territories:
+        for i, t in enumerate(self.territories):
+            t.index = i
             self.t_by_name[t.name] = t
 
+        self.c_by_name = {}
+        for i, c in enumerate(self.continents):
+            c.index = i
+            self.c_by_name[c.name] = c
+
+        if template is None:
+            self._link_by_name()
+        else:
+            # Already wired up by MapTemplate.build; the integer tables and
+            # distances never change, so every map from the template shares
+            # them.
+            self.adjacency_offsets = template.adjacency_offsets
+            self.adjacency = template.adjacency
+            self.continent_of = template.continent_of
+            self._distances = template.distances
+
+        # Connected components of territories with the same owner, once
+        # something has asked for them. Every owned territory maps to the
+        # set of territory indexes in its component; the sets are shared by
+        # all members and are updated as territories change hands.
+        self._region_of = None
+        # Bitboards, once something has asked for them
+        self._bitboards = None
+        for t in self.territories:
+            t._map = self
+
+    def _link_by_name(self):
         for t in self.territories:
             for nname in t.neighbors_by_name:
                 t.neighbors.append(self.t_by_name[nname])
@@ -218,9 +353,477 @@ class Map:
                 c.territories.append(self.t_by_name[tname])
                 self.t_by_name[tname].continent = c
 
-        self.c_by_name = {}
-        for c in self.continents:
-            self.c_by_name[c.name] = c
+        # Integer view of the topology, for code that works on territory
+        # indexes rather than objects: the neighbors of territory i are
+        # adjacency[adjacency_offsets[i]:adjacency_offsets[i + 1]].
+        self.adjacency_offsets = array('i', [0])
+        self.adjacency = array('i')
+        for t in self.territories:
+            self.adjacency.extend(sorted(n.index for n in t.neighbors))
+            self.adjacency_offsets.append(len(self.adjacency))
+        self.continent_of = array('i', (-1 if t.continent is None
+                                        else t.continent.index
+                                        for t in self.territories))
+
+        self._distances = [None] * len(self.territories)
+        if len(self.territories) <= Map.EAGER_DISTANCE_LIMIT:
+            for i in range(len(self.territories)):
+                self.distances_from(i)
+
+    def neighbor_indexes(self, index):
+        start = self.adjacency_offsets[index]
+        end = self.adjacency_offsets[index + 1]
+        return self.adjacency[start:end]
+
+    def distances_from(self, index):
+        # Hop distance from territory `index` to every territory, by BFS over
+        # the adjacency table; UNREACHABLE where there is no path.
+        row = self._distances[index]
+        if row is None:
+            adjacency = self.adjacency
+            offsets = self.adjacency_offsets
+            row = array('H', [UNREACHABLE]) * len(self.territories)
+            row[index] = 0
+            frontier = [index]
+            distance = 0
+            while frontier:
+                distance += 1
+                next_frontier = []
+                for u in frontier:
+                    for v in adjacency[offsets[u]:offsets[u + 1]]:
+                        if row[v] == UNREACHABLE:
+                            row[v] = distance
+                            next_frontier.append(v)
+                frontier = next_frontier
+            self._distances[index] = row
+        return row
+
+    def distance(self, a, b):
+        d = self.distances_from(a.index)[b.index]
+        return None if d == UNREACHABLE else d
+
+    def _regions(self):
+        if self._region_of is None:
+            self._region_of = [None] * len(self.territories)
+            for t in self.territories:
+                if t.owner is not None:
+                    self._join_region(t.index, t.owner)
+        return self._region_of
+
+    def region(self, territory):
+        # All territories reachable from `territory` through territories
+        # with the same owner, including itself. Empty if it has no owner.
+        members = self._regions()[territory.index]
+        if members is None:
+            return []
+        return [self.territories[i] for i in sorted(members)]
+
+    def connected(self, a, b):
+        # Whether armies could move from a to b through one owner's
+        # territories.
+        region_of = self._regions()
+        members = region_of[a.index]
+        return members is not None and members is region_of[b.index]
+
+    @property
+    def bitboards(self):
+        if self._bitboards is None:
+            self._bitboards = Bitboards(self)
+        return self._bitboards
+
+    def _territory_gained(self, territory, player):
+        index = territory.index
+        if self._bitboards is not None:
+            self._bitboards._gained(index, player)
+        if self._region_of is not None:
+            self._join_region(index, player)
+
+    def _join_region(self, index, player):
+        regions = []
+        for n in self.territories[index].neighbors.iter_unordered():
+            members = self._region_of[n.index]
+            if n.owner is player and members is not None and \
+                    all(members is not r for r in regions):
+                regions.append(members)
+        if not regions:
+            self._region_of[index] = {index}
+            return
+        regions.sort(key=len, reverse=True)
+        merged = regions[0]
+        for members in regions[1:]:
+            merged.update(members)
+            for i in members:
+                self._region_of[i] = merged
+        merged.add(index)
+        self._region_of[index] = merged
+
+    def _territory_lost(self, territory):
+        # called while territory.owner is still the player losing it
+        index = territory.index
+        if self._bitboards is not None:
+            self._bitboards._lost(index, territory.owner)
+        if self._region_of is None:
+            return
+        members = self._region_of[index]
+        self._region_of[index] = None
+        if members is None:
+            return
+        members.discard(index)
+        starts = [i for i in self.neighbor_indexes(index) if i in members]
+        if len(starts) < 2:
+            # A territory with at most one neighbor in the component can't
+            # have been holding it together.
+            return
+        self._split_region(members, starts)
+
+    def _split_region(self, members, starts):
+        # Search from every start at once, one step each in turn. Searches
+        # that meet join up; one that runs out of territories first has
+        # found a part of its own, which leaves `members`. Once a single
+        # search is left, the rest of `members` is its part and needn't be
+        # visited, so the work is bounded by the parts split off rather
+        # than by the whole old component.
+        found_by = {i: i for i in starts}
+        joined = {i: i for i in starts}
+        parts = {i: {i} for i in starts}
+        frontiers = {i: [i] for i in starts}
+
+        def search_of(i):
+            while joined[i] != i:
+                joined[i] = joined[joined[i]]
+                i = joined[i]
+            return i
+
+        while len(frontiers) > 1:
+            for s in list(frontiers):
+                if s not in frontiers:
+                    continue
+                if not frontiers[s]:
+                    del frontiers[s]
+                    part = parts.pop(s)
+                    members.difference_update(part)
+                    for i in part:
+                        self._region_of[i] = part
+                    if len(frontiers) == 1:
+                        return
+                    continue
+                u = frontiers[s].pop()
+                for v in self.neighbor_indexes(u):
+                    if v not in members:
+                        continue
+                    other = found_by.get(v)
+                    if other is None:
+                        found_by[v] = s
+                        parts[s].add(v)
+                        frontiers[s].append(v)
+                        continue
+                    other = search_of(other)
+                    if other == s:
+                        continue
+                    # the smaller search joins the larger one
+                    if len(parts[s]) < len(parts[other]):
+                        s, other = other, s
+                    joined[other] = s
+                    parts[s].update(parts.pop(other))
+                    frontiers[s].extend(frontiers.pop(other))
+                    if len(frontiers) == 1:
+                        return
+
+    def _record(self, territory):
+        if territory not in self._journal:
+            self._journal[territory] = (territory._owner,
+                                        territory._num_armies)
+
+    @contextmanager
+    def hypothetical(self):
+        """Undo every change of owner and armies made in the block when it
+        ends, in time proportional to the number of territories changed.
+        Blocks nest. Changes to the topology or continents aren't undone."""
+        if self._journal is not None:
+            self._outer_journals.append(self._journal)
+        journal = self._journal = {}
+        try:
+            yield self
+        finally:
+            # Nothing recorded while restoring: the territories go back to
+            # what they were when the block started, which is all an outer
+            # block needs to know.
+            self._journal = None
+            for t, (owner, num_armies) in journal.items():
+                t.owner = owner
+                t.num_armies = num_armies
+            if self._outer_journals:
+                self._journal = self._outer_journals.pop()
+
+    @staticmethod
+    def load(path):
+        # Map from a .json, .csv or compiled .rmap file; see riskmaps.
+        from riskmaps import load_map
+        return load_map(path).build()
+
+    def to_template(self):
+        if self._template is None:
+            self._template = MapTemplate.from_map(self)
+        return self._template
+
+    def copy(self):
+        # A map with the same topology and fresh, unowned territories.
+        return self.to_template().build()
+
+
+class Bitboards:
+    """Territory sets of a map as int bitmasks, bit i standing for
+    territory i: the neighbors of every territory, the territories of every
+    continent and those owned by every player, kept up to date as
+    territories change hands.
+
+    Set operations are single int operations, so questions about a whole
+    player, like which territories border an enemy, cost a few of them per
+    territory involved rather than a walk over Territory objects.
+    """
+
+    def __init__(self, game_map):
+        self.territories = game_map.territories
+        self.all = (1 << len(self.territories)) - 1
+        self.adjacency = []
+        for i in range(len(self.territories)):
+            mask = 0
+            for j in game_map.neighbor_indexes(i):
+                mask |= 1 << j
+            self.adjacency.append(mask)
+        self.continents = {}
+        for c in game_map.continents:
+            mask = 0
+            for t in c.territories:
+                mask |= 1 << t.index
+            self.continents[c] = mask
+        self._owned = {}
+        for t in self.territories:
+            if t.owner is not None:
+                self._gained(t.index, t.owner)
+
+    def _gained(self, index, player):
+        self._owned[player] = self._owned.get(player, 0) | 1 << index
+
+    def _lost(self, index, player):
+        self._owned[player] &= ~(1 << index)
+
+    @staticmethod
+    def indexes(mask):
+        # Through the binary string: peeling bits off the int one at a time
+        # would copy all of it for every bit.
+        bits = bin(mask)[:1:-1]
+        indexes = []
+        i = bits.find('1')
+        while i >= 0:
+            indexes.append(i)
+            i = bits.find('1', i + 1)
+        return indexes
+
+    def mask(self, indexes):
+        # All bits set in one go, for the same reason.
+        bits = bytearray((len(self.territories) + 7) // 8)
+        for i in indexes:
+            bits[i >> 3] |= 1 << (i & 7)
+        return int.from_bytes(bits, 'little')
+
+    def to_territories(self, mask):
+        territories = self.territories
+        return [territories[i] for i in Bitboards.indexes(mask)]
+
+    def owned(self, player):
+        return self._owned.get(player, 0)
+
+    def neighbors(self, mask):
+        # Every territory bordering one in `mask`, those included if they
+        # border each other.
+        adjacency = self.adjacency
+        result = 0
+        for i in Bitboards.indexes(mask):
+            result |= adjacency[i]
+        return result
+
+    def border(self, player):
+        # The player's territories with an enemy or unowned neighbor.
+        owned = self.owned(player)
+        others = self.all & ~owned
+        if bin(owned).count('1') > bin(others).count('1'):
+            # borders are symmetric: look from the smaller side
+            return owned & self.neighbors(others)
+        adjacency = self.adjacency
+        return self.mask(i for i in Bitboards.indexes(owned)
+                         if adjacency[i] & others)
+
+    def frontier(self, player):
+        # Territories the player could attack: not theirs, next to theirs.
+        owned = self.owned(player)
+        return self.neighbors(owned) & ~owned
+
+    def owns_continent(self, player, continent):
+        mask = self.continents[continent]
+        return mask != 0 and mask & ~self.owned(player) == 0
+
+    def expand(self, mask, within=None, steps=1):
+        # `mask` and everything up to `steps` borders away from it, only
+        # going through territories in `within` (default everywhere).
+        within = self.all if within is None else within
+        reached = mask
+        frontier = mask
+        for _ in range(steps):
+            frontier = self.neighbors(frontier) & within & ~reached
+            if not frontier:
+                break
+            reached |= frontier
+        return reached
+
+
+class MapTemplate:
+    # Immutable description of a map's topology, compiled once so that new
+    # Map objects can be stamped out without resolving any names.
+
+    def __init__(self, names, adjacency_offsets, adjacency, continents):
+        self.names = tuple(names)
+        self.adjacency_offsets = adjacency_offsets
+        self.adjacency = adjacency
+        # (name, bonus, territory indexes) for each continent
+        self.continents = tuple((name, bonus, tuple(members))
+                                for name, bonus, members in continents)
+        self.continent_of = array('i', [-1]) * len(self.names)
+        for ci, (_, _, members) in enumerate(self.continents):
+            for i in members:
+                self.continent_of[i] = ci
+        # Filled in lazily (or by from_map) and shared with every map built
+        # from this template.
+        self.distances = [None] * len(self.names)
+
+    @staticmethod
+    def from_map(game_map):
+        template = MapTemplate(
+            [t.name for t in game_map.territories],
+            game_map.adjacency_offsets, game_map.adjacency,
+            [(c.name, c.bonus, [t.index for t in c.territories])
+             for c in game_map.continents])
+        template.distances = game_map._distances
+        return template
+
+    def build(self):
+        territories = [Territory(name) for name in self.names]
+        adjacency = self.adjacency
+        offsets = self.adjacency_offsets
+        for i, t in enumerate(territories):
+            # The adjacency table is symmetric, so each side is filled in
+            # directly instead of through the mirroring Neighbors.add.
+            for j in adjacency[offsets[i]:offsets[i + 1]]:
+                t.neighbors._insert(territories[j])
+        continents = []
+        for name, bonus, members in self.continents:
+            c = Continent(name, bonus)
+            for i in members:
+                t = territories[i]
+                c.territories._insert(t)
+                t._continent = c
+            continents.append(c)
+        return Map(territories, continents, template=self)
+
+
+def normalize_name(name):
+    # Case, underscores and runs of spaces don't matter in names.
+    return ' '.join(name.replace('_', ' ').split()).casefold()
+
+
+class NameIndex:
+    # Case-insensitive index of named objects. A dict answers exact
+    # lookups, a trie of the normalized names answers prefixes, so both
+    # take time in the length of the name rather than the number of
+    # objects. Aliases resolve exactly but aren't offered as completions.
+
+    class Node:
+        __slots__ = ['children', 'count', 'name']
+
+        def __init__(self):
+            self.children = {}
+            # names ending in this subtree
+            self.count = 0
+            # the name ending here, as it was added
+            self.name = None
+
+    def __init__(self):
+        # by name as added, which is how most lookups come
+        self._exact = {}
+        self._objects = {}
+        self._root = NameIndex.Node()
+
+    def add(self, name, obj):
+        # The first object by a name keeps it.
+        key = normalize_name(name)
+        if key in self._objects:
+            return
+        self._exact[name] = obj
+        self._objects[key] = obj
+        node = self._root
+        node.count += 1
+        for char in key:
+            node = node.children.setdefault(char, NameIndex.Node())
+            node.count += 1
+        node.name = name
+
+    def add_alias(self, alias, name):
+        key = normalize_name(name)
+        if key in self._objects:
+            self._objects.setdefault(normalize_name(alias), self._objects[key])
+
+    def _find(self, prefix):
+        key = normalize_name(prefix)
+        if key and prefix[-1:] in [' ', '_']:
+            # "eastern " rules out Easter Island
+            key += ' '
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def get(self, name):
+        """The object by this name or alias, or else the only one whose name
+        starts with it. None if there is no such object, or several."""
+        obj = self._exact.get(name)
+        if obj is None:
+            obj = self._objects.get(normalize_name(name))
+        if obj is not None:
+            return obj
+        node = self._find(name)
+        if node is None or node.count != 1:
+            return None
+        while node.name is None:
+            node, = node.children.values()
+        return self._objects[normalize_name(node.name)]
+
+    def complete(self, prefix):
+        # Every name starting with `prefix`, in order.
+        names = []
+        node = self._find(prefix)
+        stack = [node] if node is not None else []
+        while stack:
+            node = stack.pop()
+            if node.name is not None:
+                names.append(node.name)
+            stack.extend(node.children[char]
+                         for char in sorted(node.children, reverse=True))
+        return names
+
+    @staticmethod
+    def for_game(game):
+        index = NameIndex()
+        for p in game.players:
+            index.add(p.name, p)
+        for t in game.game_map.territories:
+            index.add(t.name, t)
+        for c in game.game_map.continents:
+            index.add(c.name, c)
+        for alias, name in ALIASES.items():
+            index.add_alias(alias, name)
+        return index
 
 
 class Game:
@@ -229,24 +832,61 @@ class Game:
         self.game_map = game_map
         self.turns = []
         self.next_player = players[0]
+        # optional risklog.EventLogWriter recording every state change
+        self.log = None
+        # optional riskdice.Dice for the game's rolls and shuffles
+        self.dice = None
+        self._names = None
+
+    @property
+    def names(self):
+        # Built on first use: headless games never look anything up.
+        if self._names is None:
+            self._names = NameIndex.for_game(self)
+        return self._names
 
     def get_most_recent_turn(self):
         if not self.turns:
             return None
         return self.turns[-1]
 
+    @contextmanager
+    def hypothetical(self):
+        """Play out a what-if: the map, whose turn it is and the turns
+        played are put back when the block ends. Nothing is logged.
+
+            with game.hypothetical():
+                kamchatka.owner = me
+                ...
+        """
+        next_player = self.next_player
+        num_turns = len(self.turns)
+        log = self.log
+        self.log = None
+        try:
+            with self.game_map.hypothetical():
+                yield self
+        finally:
+            self.next_player = next_player
+            del self.turns[num_turns:]
+            self.log = log
+
     def get_object_by_name(self, name):
-        for p in self.players:
-            if p.name == name:
-                return p
-        if name in self.game_map.t_by_name:
-            return self.game_map.t_by_name[name]
-        if name in self.game_map.c_by_name:
-            return self.game_map.c_by_name[name]
-        return None
+        # Players first, then territories, then continents, if names clash.
+        return self.names.get(name)
 
 
 def gen_default_map():
+    global _default_map_template
+    if _default_map_template is None:
+        _default_map_template = MapTemplate.from_map(_build_default_map())
+    return _default_map_template.build()
+
+
+_default_map_template = None
+
+
+def _build_default_map():
     return Map(
         territories=[
             Territory(ALASKA, neighbors_by_name=[KAMCHATKA, NW_TERR, ALBERTA]),
@@ -321,9 +961,42 @@ def print_info(game):
     print(f'It is {game.next_player.name}\'s turn.')
 
 
+def complete_line(line, game):
+    # Completions of a whole input line: the command, then the names taken
+    # by "view" and "plan".
+    command, space, rest = line.partition(' ')
+    if not space:
+        return [c + ' ' for c in COMMANDS if c.startswith(command)]
+    if game is None or command not in ['view', 'plan']:
+        return []
+    head = command + ' '
+    if command == 'plan':
+        source, to, target = rest.partition(' to ')
+        if to:
+            head += source + to
+            rest = target
+    return [head + name for name in game.names.complete(rest)]
+
+
 def repl():
+    # Only needed interactively; importing them at module level slows down
+    # every process that just wants the game model.
+    import readline
+    import traceback
+
     prompt = '> '
     game = None
+    completions = []
+
+    def complete(text, state):
+        if state == 0:
+            completions[:] = complete_line(text, game)
+        return completions[state] if state < len(completions) else None
+
+    # Names have spaces in them, so complete the line as a whole.
+    readline.set_completer_delims('')
+    readline.set_completer(complete)
+    readline.parse_and_bind('tab: complete')
     while True:
         try:
             print_info(game)
@@ -334,134 +1007,438 @@ def repl():
             if not input_s:
                 continue
             parts = input_s.split()
-            command = parts[0]
-            nparts = len(parts)
-            if command in ['exit', 'quit']:
+            if parts[0] in ['exit', 'quit']:
                 break
-            elif command == 'roll':
-                num_dice = 1
-                if nparts > 1:
-                    num_dice = int(parts[1])
-                cmd_roll(num_dice)
-            elif command == 'attack':
-                attacker = 3
-                defender = 2
-                if nparts > 1:
-                    attacker = int(parts[1])
-                if nparts > 2:
-                    defender = int(parts[2])
-                cmd_attack(attacker, defender)
-            elif command == 'start':
-                game = cmd_start()
-            elif command == 'player':
-                player = game.next_player
-                if nparts > 1:
-                    player_num = int(parts[1]) - 1
-                    player = game.players[player_num]
-                cmd_print_player(player, game)
-            elif command == 'view':
-                if nparts < 2:
-                    print('No object name specified. '
-                          'What do you want to view?')
-                else:
-                    cmd_view(' '.join(parts[1:]), game)
-            else:
-                print(f'Unknown: "{command}"')
+            game = run_command(parts, game)
         except EOFError:
             print('')
             break
         except KeyboardInterrupt:
             print('')
             continue
+        except UnknownCommand as ex:
+            print(ex)
         except Exception as ex:
             print('Caught the following exception:')
             tb = traceback.format_exception(type(ex), ex, ex.__traceback__)
             for line in tb:
                 print('  ' + line, end='')
+    if game is not None and game.log is not None:
+        game.log.close()
+
+
+def main(argv=None):
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+        description='Play Risk at an interactive prompt, or run a script of '
+                    'the same commands.')
+    parser.add_argument('script', nargs='?',
+                        help='file of commands, one per line ("-" for '
+                             'stdin); without it the prompt is started')
+    parser.add_argument('--json', action='store_true',
+                        help='report every command as a line of JSON')
+    parser.add_argument('--stop-on-error', action='store_true')
+    args = parser.parse_args(argv)
+    if args.script is None:
+        repl()
+        return
+    if args.script == '-':
+        game, _, errors = run_script(sys.stdin, json_output=args.json,
+                                     stop_on_error=args.stop_on_error)
+    else:
+        with open(args.script) as f:
+            game, _, errors = run_script(f, json_output=args.json,
+                                         stop_on_error=args.stop_on_error)
+    if game is not None and game.log is not None:
+        game.log.close()
+    if errors:
+        sys.exit(1)
+
+
+def _parse_dice(args):
+    attacker = int(args[0]) if args else 3
+    defender = int(args[1]) if len(args) > 1 else 2
+    return attacker, defender
+
+
+def _run_roll(args, game):
+    cmd_roll(int(args[0]) if args else 1, game)
+    return game
+
+
+def _run_attack(args, game):
+    cmd_attack(*_parse_dice(args), game)
+    return game
+
 
+def _run_odds(args, game):
+    cmd_odds(*_parse_dice(args))
+    return game
+
+
+def _run_start(args, game):
+    # start [log file] [seed=N]
+    if game is not None and game.log is not None:
+        game.log.close()
+    log_path = None
+    dice = None
+    for arg in args:
+        if arg.startswith('seed='):
+            from riskdice import Dice
+            dice = Dice(int(arg[len('seed='):]))
+        else:
+            log_path = arg
+    return cmd_start(log_path, dice)
+
+
+def _run_suggest(args, game):
+    time_budget_ms = int(args[0]) if args else 200
+    cmd_suggest(game, time_budget_ms / 1000)
+    return game
+
+
+def _run_plan(args, game):
+    source_name, _, target_name = ' '.join(args).partition(' to ')
+    if not source_name or not target_name:
+        print('Usage: plan <territory> to <continent or territory>')
+    else:
+        cmd_plan(source_name, target_name, game)
+    return game
+
+
+def _run_reinforce(args, game):
+    player = game.players[int(args[0]) - 1] if args else game.next_player
+    cmd_reinforce(player, game)
+    return game
+
+
+def _run_stats(args, game):
+    cmd_stats(args)
+    return game
+
+
+def _run_player(args, game):
+    player = game.players[int(args[0]) - 1] if args else game.next_player
+    cmd_print_player(player, game)
+    return game
+
+
+def _run_view(args, game):
+    if not args:
+        print('No object name specified. What do you want to view?')
+    else:
+        cmd_view(' '.join(args), game)
+    return game
 
-def cmd_roll(num_dice):
-    print('    ' + str(roll(num_dice)))
+
+# The command language: each handler takes the words after the command and
+# the current game, prints its output and returns the game, which "start"
+# replaces.
+COMMAND_HANDLERS = {
+    'attack': _run_attack,
+    'odds': _run_odds,
+    'plan': _run_plan,
+    'player': _run_player,
+    'reinforce': _run_reinforce,
+    'roll': _run_roll,
+    'start': _run_start,
+    'stats': _run_stats,
+    'suggest': _run_suggest,
+    'view': _run_view,
+}
+COMMANDS = sorted([*COMMAND_HANDLERS, 'exit', 'quit'])
+
+
+class UnknownCommand(ValueError):
+    pass
+
+
+def run_command(parts, game):
+    # Run one command, already split into words, printing its output.
+    # Returns the game, which is replaced by "start".
+    handler = COMMAND_HANDLERS.get(parts[0])
+    if handler is None:
+        raise UnknownCommand(f'Unknown: "{parts[0]}"')
+    return handler(parts[1:], game)
+
+
+# run_script hands its output on in writes of about this many characters
+SCRIPT_FLUSH_BYTES = 1 << 16
+
+
+def run_script(lines, game=None, out=None, json_output=False,
+               stop_on_error=False):
+    """Run commands from `lines` (any iterable of strings, such as an open
+    file or sys.stdin) without prompts, up to its end or an "exit".
+    Blank lines and lines starting with "#" are skipped.
+
+    Output goes to `out` (default sys.stdout) in large writes rather than
+    line by line. With `json_output` every command is reported instead as
+    one JSON object per line, holding its line number, the command, its
+    output and, if it failed, the error. A failing command doesn't stop the
+    script unless `stop_on_error` is set.
+
+    Returns (game, number of commands run, number that failed).
+    """
+    import io
+    import sys
+    from contextlib import redirect_stdout
+    from json.encoder import encode_basestring as quote
+
+    out = sys.stdout if out is None else out
+    # Commands print into `buffer`; in JSON mode each command's output is
+    # taken from there into a result in `results`. Whichever one collects
+    # what's written is handed to `out` whenever it gets large.
+    buffer = io.StringIO()
+    results = io.StringIO() if json_output else buffer
+    commands = 0
+    errors = 0
+    with redirect_stdout(buffer):
+        for number, line in enumerate(lines, 1):
+            parts = line.split()
+            if not parts or parts[0].startswith('#'):
+                continue
+            if parts[0] in ['exit', 'quit']:
+                break
+            commands += 1
+            error = None
+            try:
+                game = run_command(parts, game)
+            except Exception as ex:
+                errors += 1
+                error = repr(ex)
+                if not json_output:
+                    print(f'Error on line {number}: {error}')
+            if json_output:
+                # Spelled out rather than json.dumps of a dict, which
+                # takes several times as long.
+                results.write(f'{{"line": {number}, '
+                              f'"command": {quote(line.strip())}, '
+                              f'"output": {quote(buffer.getvalue())}')
+                if error is not None:
+                    results.write(f', "error": {quote(error)}')
+                results.write('}\n')
+                buffer.seek(0)
+                buffer.truncate()
+            if results.tell() >= SCRIPT_FLUSH_BYTES:
+                out.write(results.getvalue())
+                results.seek(0)
+                results.truncate()
+            if error is not None and stop_on_error:
+                break
+    out.write(results.getvalue())
+    out.flush()
+    return game, commands, errors
 
 
-def cmd_attack(attacker, defender):
-    rattacker = roll(attacker)
-    rdefender = roll(defender)
+def cmd_roll(num_dice, game=None):
+    if num_dice < 0:
+        raise ValueError(f'Can\'t roll {num_dice} dice')
+    dice = game.dice if game is not None else None
+    print('    ' + str(roll(num_dice, dice)))
 
-    print(f'    attacker: {rattacker}')
-    print(f'    defender: {rdefender}')
 
+def resolve_exchange(rattacker, rdefender):
     attacker_loses = 0
     defender_loses = 0
-
-    def cmp_(a, d):
-        nonlocal attacker_loses
-        nonlocal defender_loses
+    for a, d in zip(rattacker, rdefender):
         if d >= a:
             attacker_loses += 1
         else:
             defender_loses += 1
-        return [a, d]
+    return attacker_loses, defender_loses
+
 
-    list(map(cmp_, rattacker, rdefender))
+def cmd_attack(attacker, defender, game=None):
+    dice = game.dice if game is not None else None
+    rattacker = roll(attacker, dice)
+    rdefender = roll(defender, dice)
 
+    attacker_loses, defender_loses = resolve_exchange(rattacker, rdefender)
+    if game is not None and game.log is not None:
+        game.log.exchange(None, None, rattacker, rdefender, attacker_loses,
+                          defender_loses)
+
+    # Commands print their output in one go: a print call costs more than
+    # the formatting, which counts when scripts run thousands of them.
+    lines = [f'    attacker: {rattacker}', f'    defender: {rdefender}']
     if attacker_loses > 0:
-        print(f'    attacker loses {attacker_loses}')
+        lines.append(f'    attacker loses {attacker_loses}')
     if defender_loses > 0:
-        print(f'    defender loses {defender_loses}')
+        lines.append(f'    defender loses {defender_loses}')
+    print('\n'.join(lines))
+
 
+def cmd_odds(attacker, defender):
+    odds = battle_odds(attacker, defender)
+    print(f'    attacker wins: {odds.win_probability:.2%}\n'
+          f'    defender wins: {odds.loss_probability:.2%}\n'
+          f'    expected attacker survivors: '
+          f'{odds.expected_attacker_survivors:.2f}\n'
+          f'    expected defender survivors: '
+          f'{odds.expected_defender_survivors:.2f}')
+
+
+def deal_territories(game, rng=None):
+    terrs = list(game.game_map.territories)
+    if rng is None:
+        shuffle(terrs)
+    else:
+        rng.shuffle(terrs)
+    for terr, player in zip(terrs, cycle(game.players)):
+        player.territories.append(terr)
+        terr.owner = player
+        terr.num_armies = 1
+    if game.log is not None:
+        for terr in game.game_map.territories:
+            game.log.place(terr, terr.owner, terr.num_armies)
+
+
+def cmd_start(log_path=None, dice=None):
+    from riskdice import Dice
 
-def cmd_start():
     game = Game(players=[Player('player1', 'red'),
                          Player('player2', 'black')],
                 game_map=gen_default_map())
+    game.dice = Dice() if dice is None else dice
+    if log_path is not None:
+        from risklog import EventLogWriter
+        game.log = EventLogWriter(log_path, game)
+        print(f'Recording the game to {log_path}.')
 
     print('The players, in order, are:')
     for i, player in enumerate(game.players):
         print(f'  {i + 1}. {player.name} ({player.color})')
     print('Territories will be assigned randomly.')
-    terrs = list(game.game_map.territories)
-    shuffle(terrs)
-    for terr, player in zip(terrs, cycle(game.players)):
-        player.territories.append(terr)
-        terr.owner = player
-        terr.num_armies = 1
+    deal_territories(game, game.dice)
     return game
 
 
+def cmd_suggest(game, time_budget):
+    from riskmcts import MCTS
+    from riskstate import GameState
+
+    if game is None:
+        print('No game started.')
+        return
+    decision = MCTS().decide(GameState.from_game(game), time_budget)
+    territories = game.game_map.territories
+    action = decision.action
+    if action[0] == 'attack':
+        print(f'    attack {territories[action[2]].name} '
+              f'from {territories[action[1]].name}')
+    elif action[0] == 'fortify':
+        print(f'    move {action[3]} armies from '
+              f'{territories[action[1]].name} to '
+              f'{territories[action[2]].name}')
+    else:
+        print('    end the turn')
+    print(f'    expected value {decision.value:.3f} '
+          f'after {decision.visits} visits')
+    print(f'    {decision.iterations} iterations, '
+          f'{decision.nodes_per_second:.0f} nodes/sec, '
+          f'{decision.tt_size} table entries')
+
+
+def cmd_plan(source_name, target_name, game):
+    from riskplan import plan_attack
+
+    source = game.get_object_by_name(source_name)
+    target = game.get_object_by_name(target_name)
+    if not isinstance(source, Territory):
+        print(f'No territory by the name "{source_name}".')
+        return
+    if isinstance(target, Territory):
+        targets = [target]
+    elif isinstance(target, Continent):
+        targets = target.territories
+    else:
+        print(f'No continent or territory by the name "{target_name}".')
+        return
+    plan = plan_attack(source, targets)
+    if plan is None:
+        print('    No chain of attacks reaches every target.')
+        return
+    if not plan.path:
+        print(f'    {source.owner.name} already owns every target.')
+        return
+    for t in plan.path:
+        print(f'    attack {t.name} ({t.owner.name}, {t.num_armies})')
+    print(f'    success {plan.probability:.1%}, '
+          f'{plan.expected_armies:.1f} armies expected at the end')
+    print(f'    {plan.nodes} nodes in {plan.elapsed * 1e3:.1f} ms')
+
+
+def cmd_reinforce(player, game):
+    from riskplace import recommend_placements
+    from riskstate import GameState
+
+    count = player.reinforcements()
+    print(f'    {player.name} gets {count} armies.')
+    state = GameState.from_game(game)
+    territories = game.game_map.territories
+    for i, n in recommend_placements(state, game.players.index(player),
+                                     count):
+        print(f'    place {n} on {territories[i].name} '
+              f'({territories[i].num_armies})')
+
+
+def cmd_stats(args):
+    import riskprof
+
+    instrumentation = riskprof.instrumentation
+    action = args[0] if args else 'show'
+    if action == 'on':
+        riskprof.enable()
+        print('    Instrumentation is on.')
+    elif action == 'off':
+        riskprof.disable()
+        print('    Instrumentation is off.')
+    elif action == 'reset':
+        instrumentation.reset()
+    elif action == 'save' and len(args) > 1:
+        riskprof.JsonExporter().write(args[1], instrumentation.report(), {})
+        print(f'    Wrote {args[1]}')
+    elif action == 'show':
+        if not instrumentation.enabled and not instrumentation.stats:
+            print('    Instrumentation is off. Type "stats on" to start.')
+        else:
+            riskprof.print_stats()
+    else:
+        print('Usage: stats [on|off|reset|save <file>]')
+
+
 def cmd_print_player(player, game):
-    print(f'    {player.name}')
-    print(f'    Color: {player.color}')
-    # territory_list = ', '.join(f'{t.name} ({t.num_armies})'
-    #                            for t in player.territories)
-    # print(f'    Territories: {territory_list}')
-    print(f'    Territories:')
+    lines = [f'    {player.name}', f'    Color: {player.color}',
+             '    Territories:']
     for c in game.game_map.continents:
         t_in_c = [t for t in c.territories if t.owner is player]
         if t_in_c:
-            print(f'      {c.name}:')
-            for t in t_in_c:
-                print(f'        {t.name} ({t.num_armies})')
-    print('')
+            lines.append(f'      {c.name}:')
+            lines.extend(f'        {t.name} ({t.num_armies})' for t in t_in_c)
+    lines.append('')
+    print('\n'.join(lines))
 
 
 def cmd_print_continent(continent, game):
-    print(f'    {continent.name}')
-    print(f'    Bonus: {continent.bonus}')
-    print(f'    Territories:')
-    for t in continent.territories:
-        print(f'        {t.name} ({t.owner.name}, {t.num_armies})')
-    print('')
+    lines = [f'    {continent.name}', f'    Bonus: {continent.bonus}',
+             '    Territories:']
+    lines.extend(f'        {t.name} ({t.owner.name}, {t.num_armies})'
+                 for t in continent.territories)
+    lines.append('')
+    print('\n'.join(lines))
 
 
 def cmd_print_territory(territory, game):
-    print(f'    {territory.name}')
-    print(f'    Owner: {territory.owner.name}')
-    print(f'    Number of armies: {territory.num_armies}')
-    print(f'    Neighbors:')
-    for t in territory.neighbors:
-        print(f'        {t.name} ({t.owner.name}, {t.num_armies})')
-    print('')
+    lines = [f'    {territory.name}', f'    Owner: {territory.owner.name}',
+             f'    Number of armies: {territory.num_armies}',
+             '    Neighbors:']
+    lines.extend(f'        {t.name} ({t.owner.name}, {t.num_armies})'
+                 for t in territory.neighbors)
+    lines.append('')
+    print('\n'.join(lines))
 
 
 def cmd_view(name, game):
@@ -477,4 +1454,8 @@ def cmd_view(name, game):
 
 
 if __name__ == '__main__':
-    repl()
+    # Modules that commands import on demand import riskcli in turn; make
+    # that this module rather than a second copy of it.
+    import sys
+    sys.modules['riskcli'] = sys.modules[__name__]
+    main()
@@ -0,0 +1,122 @@
+import json
+from random import Random, SystemRandom
+
+
+# Random bytes become dice by translation: the 252 values below 6 * 42 map
+# evenly onto 1-6 and the 4 above are dropped, all without a Python-level
+# loop.
+_FACES = bytes(b % 6 + 1 for b in range(252)) + bytes(4)
+_REJECTED = bytes(range(252, 256))
+
+
+class Dice:
+    """Source of dice rolls and shuffles for one game.
+
+    Dice are drawn from the seeded generator `BLOCK` random bytes at a time
+    and handed out from the buffer, so a roll costs a slice and a sort. The
+    same seed always gives the same rolls; `spawn` derives independent,
+    reproducible sources for workers or sub-games.
+    """
+
+    BLOCK = 4096
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = SystemRandom().getrandbits(64)
+        self.seed = seed
+        self._rng = Random(seed)
+        self._buffer = b''
+        self._position = 0
+
+    def _refill(self, needed):
+        buffer = self._buffer[self._position:]
+        while len(buffer) < needed:
+            # what Random.randbytes does, which needs Python 3.9
+            block = self._rng.getrandbits(8 * self.BLOCK).to_bytes(
+                self.BLOCK, 'little')
+            buffer += block.translate(_FACES, _REJECTED)
+        self._buffer = buffer
+        self._position = 0
+
+    def roll(self, num_dice):
+        if num_dice < 0:
+            raise ValueError(f'Can\'t roll {num_dice} dice')
+        start = self._position
+        end = start + num_dice
+        if end > len(self._buffer):
+            self._refill(num_dice)
+            start, end = 0, num_dice
+        self._position = end
+        return sorted(self._buffer[start:end], reverse=True)
+
+    def shuffle(self, items):
+        self._rng.shuffle(items)
+
+    def spawn(self, key):
+        # String seeds are hashed by Random, so sources spawned with
+        # neighbouring keys are unrelated.
+        return Dice(f'{self.seed}:{key}')
+
+    def split(self, count):
+        return [self.spawn(i) for i in range(count)]
+
+
+class RecordingDice:
+    # Passes everything through to `dice` and keeps a list of what came
+    # out, for ReplayDice to play back.
+    def __init__(self, dice):
+        self.dice = dice
+        self.events = []
+
+    def roll(self, num_dice):
+        result = self.dice.roll(num_dice)
+        self.events.append(['roll', result])
+        return result
+
+    def shuffle(self, items):
+        order = list(range(len(items)))
+        self.dice.shuffle(order)
+        items[:] = [items[i] for i in order]
+        self.events.append(['shuffle', order])
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            for event in self.events:
+                f.write(json.dumps(event) + '\n')
+
+
+class ReplayError(Exception):
+    pass
+
+
+class ReplayDice:
+    """Plays back rolls and shuffles recorded by RecordingDice, in order.
+    Asking for anything other than what comes next in the recording, or
+    for more than it holds, raises ReplayError."""
+
+    def __init__(self, events):
+        self.events = events
+        self.position = 0
+
+    @staticmethod
+    def load(path):
+        with open(path) as f:
+            return ReplayDice([json.loads(line) for line in f if line.strip()])
+
+    def _next(self, kind, size):
+        if self.position == len(self.events):
+            raise ReplayError(f'Recording ended, wanted a {kind} of {size}')
+        event_kind, value = self.events[self.position]
+        if event_kind != kind or len(value) != size:
+            raise ReplayError(
+                f'Recording has a {event_kind} of {len(value)} at event '
+                f'{self.position}, wanted a {kind} of {size}')
+        self.position += 1
+        return value
+
+    def roll(self, num_dice):
+        return list(self._next('roll', num_dice))
+
+    def shuffle(self, items):
+        order = self._next('shuffle', len(items))
+        items[:] = [items[i] for i in order]
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+from random import Random
+
+from riskcli import Game, Player, deal_territories, gen_default_map
+from risklog import EventLogWriter
+from risktables import exchange_dice, sample_exchange
+
+
+COLORS = ['red', 'black', 'blue', 'green', 'yellow', 'pink']
+
+
+def enemy_neighbors(territory):
+    # Name order, not set order, so that seeded games are reproducible.
+    return [n for n in territory.neighbors if n.owner is not territory.owner]
+
+
+def is_border(territory):
+    owner = territory.owner
+    for n in territory.neighbors.iter_unordered():
+        if n.owner is not owner:
+            return True
+    return False
+
+
+class Policy:
+    # Base class for bots. The engine asks the policy for each decision of
+    # a turn; the default implementation never attacks or fortifies and
+    # piles all reinforcements on one border territory.
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def place_reinforcements(self, game, player, count):
+        # Return a list of (territory, num_armies) placements adding up to
+        # `count`.
+        borders = [t for t in player.territories if is_border(t)]
+        target = borders[0] if borders else next(iter(player.territories))
+        return [(target, count)]
+
+    def choose_attack(self, game, player):
+        # Return (source, target) to fight a battle, or None to stop.
+        return None
+
+    def occupy(self, game, player, source, target, min_armies):
+        # Number of armies to move into a conquered territory.
+        return source.num_armies - 1
+
+    def fortify(self, game, player):
+        # Return (source, target, num_armies) or None.
+        return None
+
+
+class RandomPolicy(Policy):
+    def place_reinforcements(self, game, player, count):
+        # Anywhere will do for a player with no border, which happens on
+        # maps that aren't connected.
+        candidates = [t for t in player.territories if is_border(t)] or \
+            list(player.territories)
+        placements = {}
+        for _ in range(count):
+            t = self.rng.choice(candidates)
+            placements[t] = placements.get(t, 0) + 1
+        return list(placements.items())
+
+    def choose_attack(self, game, player):
+        if self.rng.random() < 0.2:
+            return None
+        options = [(t, n) for t in player.territories if t.num_armies > 1
+                   for n in enemy_neighbors(t)]
+        if not options:
+            return None
+        return self.rng.choice(options)
+
+    def occupy(self, game, player, source, target, min_armies):
+        return self.rng.randint(min_armies, source.num_armies - 1)
+
+
+class AggressivePolicy(Policy):
+    # Reinforces the border territory with the best local odds, attacks
+    # whenever it outnumbers a neighbor and pulls idle armies to the front.
+
+    def place_reinforcements(self, game, player, count):
+        best = None
+        best_score = None
+        for t in player.territories:
+            enemies = enemy_neighbors(t)
+            if not enemies:
+                continue
+            score = t.num_armies - min(n.num_armies for n in enemies)
+            if best is None or score > best_score:
+                best = t
+                best_score = score
+        if best is None:
+            best = next(iter(player.territories))
+        return [(best, count)]
+
+    def choose_attack(self, game, player):
+        best = None
+        best_margin = 0
+        for t in player.territories:
+            if t.num_armies < 3:
+                continue
+            for n in enemy_neighbors(t):
+                margin = t.num_armies - n.num_armies
+                if margin > best_margin:
+                    best = (t, n)
+                    best_margin = margin
+        return best
+
+    def occupy(self, game, player, source, target, min_armies):
+        if is_border(source):
+            return max(min_armies, (source.num_armies - 1) // 2)
+        return source.num_armies - 1
+
+    def fortify(self, game, player):
+        for t in player.territories:
+            if t.num_armies < 2 or is_border(t):
+                continue
+            for n in t.neighbors:
+                if is_border(n):
+                    return t, n, t.num_armies - 1
+        return None
+
+
+POLICIES = {
+    'passive': Policy,
+    'random': RandomPolicy,
+    'aggressive': AggressivePolicy,
+    # imported on demand, the search modules depend on this one
+    'mcts': 'riskmcts.MCTSPolicy',
+    'planner': 'riskplan.PlannerPolicy',
+    'threat': 'riskplace.ThreatPolicy',
+}
+
+
+def get_policy(name):
+    policy = POLICIES[name]
+    if isinstance(policy, str):
+        module, _, cls = policy.rpartition('.')
+        policy = getattr(import_module(module), cls)
+    return policy
+
+
+class GameResult:
+    def __init__(self, winner, turns, continent_captures, territories=None,
+                 armies=None, continent_territories=None):
+        # winner is the seat index of the winning policy, or None if the
+        # game was cut off at the turn limit
+        self.winner = winner
+        self.turns = turns
+        # {continent name: [captures by seat 0, captures by seat 1, ...]}
+        self.continent_captures = continent_captures
+        # final position, per seat: territories and armies held, and
+        # {continent name: [territories held by seat 0, ...]}
+        self.territories = territories
+        self.armies = armies
+        self.continent_territories = continent_territories
+
+
+class HeadlessGame:
+    def __init__(self, policies, seed=None, game_map=None, max_turns=500,
+                 log_path=None):
+        self.rng = Random(seed)
+        if game_map is None:
+            game_map = gen_default_map()
+        players = [Player(f'player{i + 1}', COLORS[i % len(COLORS)])
+                   for i in range(len(policies))]
+        self.game = Game(players=players, game_map=game_map)
+        self.policies = {p: policy_cls(self.rng)
+                         for p, policy_cls in zip(players, policies)}
+        self.seats = {p: i for i, p in enumerate(players)}
+        self.max_turns = max_turns
+        self.turns = 0
+        self.continent_captures = {
+            c.name: [0] * len(players) for c in game_map.continents}
+        if log_path is not None:
+            self.game.log = EventLogWriter(log_path, self.game)
+        deal_territories(self.game, self.rng)
+
+    def alive(self):
+        return [p for p in self.game.players if len(p.territories) > 0]
+
+    def play(self):
+        while len(self.alive()) > 1 and self.turns < self.max_turns:
+            self.play_turn()
+        if self.game.log is not None:
+            self.game.log.close()
+        alive = self.alive()
+        winner = self.seats[alive[0]] if len(alive) == 1 else None
+        players = self.game.players
+        return GameResult(
+            winner, self.turns, self.continent_captures,
+            [len(p.territories) for p in players],
+            [p.count_all_armies() for p in players],
+            {c.name: [p.count_territories_in(c) for p in players]
+             for c in self.game.game_map.continents})
+
+    def play_turn(self):
+        game = self.game
+        player = game.next_player
+        policy = self.policies[player]
+        log = game.log
+        if log is not None:
+            log.turn(player, self.turns)
+
+        for t, n in policy.place_reinforcements(game, player,
+                                                player.reinforcements()):
+            t.num_armies += n
+            if log is not None:
+                log.reinforce(t, n)
+
+        while True:
+            choice = policy.choose_attack(game, player)
+            if choice is None:
+                break
+            source, target = choice
+            if (source.owner is not player or target.owner is player or
+                    target not in source.neighbors or
+                    source.num_armies < 2):
+                break
+            self.battle(player, policy, source, target)
+            if len(self.alive()) == 1:
+                break
+
+        move = policy.fortify(game, player)
+        if move is not None:
+            source, target, num_armies = move
+            if (source.owner is player and target.owner is player and
+                    target in source.neighbors and
+                    0 < num_armies < source.num_armies):
+                source.num_armies -= num_armies
+                target.num_armies += num_armies
+                if log is not None:
+                    log.move(source, target, num_armies)
+
+        self.turns += 1
+        self.advance()
+
+    def battle(self, player, policy, source, target):
+        attack_dice = min(3, source.num_armies - 1)
+        while source.num_armies > 1 and target.num_armies > 0:
+            attack_dice = min(3, source.num_armies - 1)
+            defend_dice = min(2, target.num_armies)
+            # one draw and a table lookup instead of rolling every die
+            attacker_loses, defender_loses, roll = sample_exchange(
+                attack_dice, defend_dice, self.rng)
+            if self.game.log is not None:
+                rattacker, rdefender = exchange_dice(roll, attack_dice,
+                                                     defend_dice)
+                self.game.log.exchange(source, target, rattacker, rdefender,
+                                       attacker_loses, defender_loses)
+            source.num_armies -= attacker_loses
+            target.num_armies -= defender_loses
+        if target.num_armies > 0:
+            return False
+
+        min_armies = min(attack_dice, source.num_armies - 1)
+        moved = policy.occupy(self.game, player, source, target, min_armies)
+        moved = max(min_armies, min(moved, source.num_armies - 1))
+        target.owner = player
+        source.num_armies -= moved
+        target.num_armies = moved
+        if self.game.log is not None:
+            self.game.log.conquer(player, source, target, moved)
+        continent = target.continent
+        if continent is not None and player.owns_continent(continent):
+            self.continent_captures[continent.name][self.seats[player]] += 1
+        return True
+
+    def advance(self):
+        players = self.game.players
+        i = players.index(self.game.next_player)
+        for k in range(1, len(players) + 1):
+            candidate = players[(i + k) % len(players)]
+            if len(candidate.territories) > 0:
+                self.game.next_player = candidate
+                return
+
+
+class Summary:
+    def __init__(self, num_seats, continent_names):
+        self.games = 0
+        self.wins = [0] * num_seats
+        self.draws = 0
+        self.total_turns = 0
+        self.max_turns = 0
+        self.continent_captures = {name: [0] * num_seats
+                                   for name in continent_names}
+        self.elapsed = 0.0
+        # the GameResults themselves, when play_games is asked to keep them
+        self.results = None
+
+    def add(self, result):
+        self.games += 1
+        if result.winner is None:
+            self.draws += 1
+        else:
+            self.wins[result.winner] += 1
+        self.total_turns += result.turns
+        self.max_turns = max(self.max_turns, result.turns)
+        for name, counts in result.continent_captures.items():
+            totals = self.continent_captures[name]
+            for i, count in enumerate(counts):
+                totals[i] += count
+
+    def merge(self, other):
+        self.games += other.games
+        self.draws += other.draws
+        self.total_turns += other.total_turns
+        self.max_turns = max(self.max_turns, other.max_turns)
+        for i, wins in enumerate(other.wins):
+            self.wins[i] += wins
+        for name, counts in other.continent_captures.items():
+            totals = self.continent_captures[name]
+            for i, count in enumerate(counts):
+                totals[i] += count
+
+    @property
+    def win_rates(self):
+        return [wins / self.games if self.games else 0.0
+                for wins in self.wins]
+
+    @property
+    def mean_turns(self):
+        return self.total_turns / self.games if self.games else 0.0
+
+    @property
+    def games_per_second(self):
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+
+def game_seed(seed, index):
+    # String seeds are hashed by Random, so neighbouring games get unrelated
+    # streams, and a game's outcome doesn't depend on which worker ran it.
+    return f'{seed}:{index}'
+
+
+def play_games(policies, seed, start, count, max_turns=500,
+               keep_results=False):
+    summary = None
+    for index in range(start, start + count):
+        game = HeadlessGame(policies, seed=game_seed(seed, index),
+                            max_turns=max_turns)
+        if summary is None:
+            summary = Summary(len(policies),
+                              [c.name for c in game.game.game_map.continents])
+            if keep_results:
+                summary.results = []
+        result = game.play()
+        summary.add(result)
+        if keep_results:
+            summary.results.append(result)
+    return summary
+
+
+def run_games(num_games, policies, seed=0, workers=None, chunk_size=100,
+              max_turns=500, export=None):
+    """Play `num_games` headless games and aggregate the results.
+
+    `policies` is a list of Policy subclasses, one per seat. Games are
+    played in chunks on a process pool; pass workers=1 to play in this
+    process instead. If `export` is given (see riskexport.GameExport), the
+    results of each chunk are handed to `export.add_games` in game order.
+    """
+    started = time.perf_counter()
+    chunks = [(start, min(chunk_size, num_games - start))
+              for start in range(0, num_games, chunk_size)]
+    summary = Summary(len(policies),
+                      [c.name for c in gen_default_map().continents])
+    keep_results = export is not None
+
+    def merge(start, chunk):
+        summary.merge(chunk)
+        if keep_results:
+            export.add_games(start, chunk.results)
+
+    if workers == 1:
+        for start, count in chunks:
+            merge(start, play_games(policies, seed, start, count, max_turns,
+                                    keep_results))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [(start, executor.submit(play_games, policies, seed,
+                                               start, count, max_turns,
+                                               keep_results))
+                       for start, count in chunks]
+            for start, future in futures:
+                merge(start, future.result())
+    summary.elapsed = time.perf_counter() - started
+    return summary
+
+
+def print_summary(summary, policy_names):
+    print(f'games: {summary.games} in {summary.elapsed:.2f}s '
+          f'({summary.games_per_second:.1f} games/sec)')
+    for i, (name, rate) in enumerate(zip(policy_names, summary.win_rates)):
+        print(f'  seat {i + 1} ({name}): {rate:.2%} wins')
+    print(f'  draws: {summary.draws}')
+    print(f'  turns: mean {summary.mean_turns:.1f}, max {summary.max_turns}')
+    print('  continent captures:')
+    for name, counts in summary.continent_captures.items():
+        print(f'    {name}: {counts}')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Play headless games between bot policies.')
+    parser.add_argument('policies', nargs='*', metavar='POLICY',
+                        help=f'one per seat, from {", ".join(POLICIES)} '
+                             f'(default: aggressive random)')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-turns', type=int, default=500)
+    parser.add_argument('--export', metavar='PATH',
+                        help='write one row per seat per game to a .parquet '
+                             'or .npz file')
+    args = parser.parse_args()
+    if not args.policies:
+        args.policies = ['aggressive', 'random']
+    for name in args.policies:
+        if name not in POLICIES:
+            parser.error(f'Unknown policy "{name}"')
+
+    policies = [get_policy(p) for p in args.policies]
+    if args.export:
+        from riskexport import GameExport
+        continents = [c.name for c in gen_default_map().continents]
+        with GameExport(args.export, continents) as export:
+            summary = run_games(args.games, policies, seed=args.seed,
+                                workers=args.workers,
+                                max_turns=args.max_turns, export=export)
+    else:
+        summary = run_games(args.games, policies, seed=args.seed,
+                            workers=args.workers, max_turns=args.max_turns)
+    print_summary(summary, args.policies)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+import argparse
+import zipfile
+
+import numpy as np
+
+from risksim import make_rng, simulate_battles
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+BATTLE_COLUMNS = [
+    ('attackers', 'i4'),
+    ('defenders', 'i4'),
+    ('attackers_left', 'i4'),
+    ('defenders_left', 'i4'),
+    ('attacker_won', '?'),
+]
+
+
+def game_columns(continent_names):
+    # One row per seat per game, so that every column is a plain scalar.
+    return [
+        ('game', 'i8'),
+        ('seat', 'u1'),
+        ('won', '?'),
+        ('turns', 'i4'),
+        ('territories', 'i2'),
+        ('armies', 'i4'),
+    ] + [(f'territories_{column_name(name)}', 'i2')
+         for name in continent_names] + \
+        [(f'captures_{column_name(name)}', 'i4')
+         for name in continent_names]
+
+
+def column_name(name):
+    return name.lower().replace(' ', '_')
+
+
+def default_format(path):
+    if path.endswith('.parquet'):
+        return 'parquet'
+    if path.endswith('.npz'):
+        return 'npz'
+    return 'parquet' if pyarrow is not None else 'npz'
+
+
+class NpzChunks:
+    # Each chunk is stored as one `<column>.<chunk>.npy` member per column,
+    # so the file is an ordinary .npz that np.load can open, but it is
+    # written a chunk at a time instead of from arrays held in memory.
+    # Chunks have to match `columns`, as the Parquet writer's schema
+    # enforces there, so that every chunk reads back the same way.
+    def __init__(self, path, columns):
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        self._zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED,
+                                    allowZip64=True)
+        self._chunks = 0
+
+    def write(self, arrays):
+        found = [(name, array.dtype) for name, array in arrays.items()]
+        if found != self.columns:
+            raise ValueError(f'Chunk columns {found} don\'t match '
+                             f'{self.columns}')
+        for name, array in arrays.items():
+            with self._zip.open(f'{name}.{self._chunks:06d}.npy', 'w',
+                                force_zip64=True) as f:
+                np.lib.format.write_array(f, array, allow_pickle=False)
+        self._chunks += 1
+
+    def close(self):
+        self._zip.close()
+
+
+class ParquetChunks:
+    def __init__(self, path, columns):
+        schema = pyarrow.schema([(name, pyarrow.from_numpy_dtype(
+            np.dtype(dtype))) for name, dtype in columns])
+        self._writer = pyarrow.parquet.ParquetWriter(path, schema)
+
+    def write(self, arrays):
+        self._writer.write_table(pyarrow.table(arrays))
+
+    def close(self):
+        self._writer.close()
+
+
+class ColumnWriter:
+    """Stream rows to a columnar file without keeping them in memory.
+
+    `columns` is a list of (name, NumPy dtype). Rows are buffered in
+    preallocated arrays of `chunk_rows` rows and written out one chunk at a
+    time, either to Parquet (needs pyarrow) or to a chunked .npz file.
+    """
+
+    def __init__(self, path, columns, chunk_rows=65536, format=None):
+        self.path = path
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        self.chunk_rows = chunk_rows
+        self.format = format or default_format(path)
+        if self.format == 'parquet':
+            if pyarrow is None:
+                raise RuntimeError('Parquet output needs pyarrow; write '
+                                   'to a .npz file instead')
+            self._out = ParquetChunks(path, self.columns)
+        elif self.format == 'npz':
+            self._out = NpzChunks(path, self.columns)
+        else:
+            raise ValueError(f'Unknown format "{self.format}"')
+        self._buffers = [np.empty(chunk_rows, dtype)
+                         for _, dtype in self.columns]
+        self._filled = 0
+        self.rows = 0
+
+    def append(self, *values):
+        filled = self._filled
+        for buffer, value in zip(self._buffers, values):
+            buffer[filled] = value
+        self._filled = filled + 1
+        self.rows += 1
+        if self._filled == self.chunk_rows:
+            self.flush()
+
+    def extend(self, *arrays):
+        # Bulk version of append: one array (or scalar) per column.
+        size = max((np.size(a) for a in arrays), default=0)
+        arrays = [np.broadcast_to(a, (size,)) for a in arrays]
+        done = 0
+        while done < size:
+            take = min(size - done, self.chunk_rows - self._filled)
+            for buffer, array in zip(self._buffers, arrays):
+                buffer[self._filled:self._filled + take] = \
+                    array[done:done + take]
+            self._filled += take
+            self.rows += take
+            done += take
+            if self._filled == self.chunk_rows:
+                self.flush()
+
+    def flush(self):
+        if self._filled:
+            self._out.write({name: buffer[:self._filled]
+                             for (name, _), buffer in zip(self.columns,
+                                                          self._buffers)})
+            self._filled = 0
+
+    def close(self):
+        self.flush()
+        self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_chunks(path):
+    # Yields {column: array} for each chunk of a file written by
+    # ColumnWriter.
+    if default_format(path) == 'parquet':
+        if pyarrow is None:
+            raise RuntimeError('Reading Parquet needs pyarrow')
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches():
+            yield {name: column.to_numpy(zero_copy_only=False)
+                   for name, column in zip(batch.schema.names,
+                                           batch.columns)}
+        return
+    with np.load(path) as data:
+        chunks = {}
+        for key in data.files:
+            name, _, chunk = key.rpartition('.')
+            chunks.setdefault(int(chunk), []).append(name)
+        for chunk in sorted(chunks):
+            yield {name: data[f'{name}.{chunk:06d}']
+                   for name in chunks[chunk]}
+
+
+def read_columns(path):
+    chunks = list(iter_chunks(path))
+    if not chunks:
+        return {}
+    return {name: np.concatenate([chunk[name] for chunk in chunks])
+            for name in chunks[0]}
+
+
+class GameExport:
+    # Sink for riskengine.run_games: one row per seat of every game.
+    def __init__(self, path, continent_names, chunk_rows=65536):
+        self.continent_names = list(continent_names)
+        self.writer = ColumnWriter(path, game_columns(continent_names),
+                                   chunk_rows)
+
+    def add_games(self, start, results):
+        for index, result in enumerate(results, start):
+            for seat in range(len(result.territories)):
+                self.writer.append(
+                    index, seat, result.winner == seat, result.turns,
+                    result.territories[seat], result.armies[seat],
+                    *[result.continent_territories[name][seat]
+                      for name in self.continent_names],
+                    *[result.continent_captures[name][seat]
+                      for name in self.continent_names])
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_battles(path, count, max_attackers, max_defenders, seed=None,
+                   batch_size=1000000, chunk_rows=1 << 20):
+    """Simulate `count` battles with uniformly drawn army counts.
+
+    Battles are simulated and written `batch_size` at a time, so memory use
+    doesn't grow with `count`.
+    """
+    rng = make_rng(seed)
+    with ColumnWriter(path, BATTLE_COLUMNS, chunk_rows) as writer:
+        done = 0
+        while done < count:
+            size = min(batch_size, count - done)
+            attackers = rng.integers(1, max_attackers + 1, size,
+                                     dtype=np.int32)
+            defenders = rng.integers(1, max_defenders + 1, size,
+                                     dtype=np.int32)
+            a, d = simulate_battles(attackers, defenders, size, rng)
+            writer.extend(attackers, defenders, a, d, a > 0)
+            done += size
+    return writer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export simulated battles, or describe an export.')
+    sub = parser.add_subparsers(dest='command')
+    battles = sub.add_parser('battles', help='simulate and export battles')
+    battles.add_argument('output', help='.parquet or .npz file')
+    battles.add_argument('--count', type=int, default=1000000)
+    battles.add_argument('--max-attackers', type=int, default=20)
+    battles.add_argument('--max-defenders', type=int, default=20)
+    battles.add_argument('--seed', type=int, default=0)
+    info = sub.add_parser('info', help='print the columns of an export')
+    info.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'battles':
+        rows = export_battles(args.output, args.count, args.max_attackers,
+                              args.max_defenders, args.seed)
+        print(f'{rows} battles written to {args.output}')
+    elif args.command == 'info':
+        rows = 0
+        chunks = 0
+        columns = {}
+        for chunk in iter_chunks(args.path):
+            chunks += 1
+            rows += len(next(iter(chunk.values())))
+            columns = {name: array.dtype for name, array in chunk.items()}
+        print(f'{args.path}: {rows} rows in {chunks} chunks')
+        for name, dtype in columns.items():
+            print(f'  {name}: {dtype}')
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_right
+
+from riskstate import GameState, NO_OWNER
+
+
+# Every record is the same 16 bytes, so record k starts at byte 16 * k:
+#
+#   kind     uint8
+#   player   uint8    player index, NONE for no player
+#   a, b     uint16   territory indexes (source and target)
+#   c        uint16   packed dice for EXCHANGE
+#   x, y     int32    kind-specific numbers
+#
+# HEADER          x = number of territories, y = number of players
+# TURN            player starts turn number x
+# PLACE           territory a goes to player with x armies
+# REINFORCE       x armies added to territory a
+# EXCHANGE        a attacks b with dice c; attacker loses x, defender y
+# CONQUER         player takes b, moving x armies in from a
+# MOVE            x armies moved from a to b
+# SNAPSHOT        the next x records are STATE records describing every
+#                 territory at the start of turn y; player is to move
+# STATE           territory a is owned by player with x armies
+RECORD = struct.Struct('<BBHHHii')
+
+HEADER = 0
+TURN = 1
+PLACE = 2
+REINFORCE = 3
+EXCHANGE = 4
+CONQUER = 5
+MOVE = 6
+SNAPSHOT = 7
+STATE = 8
+
+NONE = 0xFF
+NO_TERRITORY = 0xFFFF
+
+# Territory and player indexes have to fit their fields and stay clear of
+# the values meaning "none".
+MAX_TERRITORIES = NO_TERRITORY
+MAX_PLAYERS = NONE
+
+INDEX = struct.Struct('<qi')
+
+
+def pack_dice(rattacker, rdefender):
+    packed = 0
+    for k, die in enumerate(rattacker):
+        packed |= die << (3 * k)
+    for k, die in enumerate(rdefender):
+        packed |= die << (9 + 3 * k)
+    return packed
+
+
+def unpack_dice(packed):
+    rattacker = [(packed >> (3 * k)) & 7 for k in range(3)]
+    rdefender = [(packed >> (9 + 3 * k)) & 7 for k in range(2)]
+    return ([d for d in rattacker if d], [d for d in rdefender if d])
+
+
+class EventLogWriter:
+    """Append-only record of everything that happens to a Game.
+
+    A log holds one game, so an existing file at `path` is replaced.
+    A snapshot of every territory is written at the first turn boundary
+    after `snapshot_every` records, and its position is appended to the
+    `<path>.idx` index so readers can start replaying from there.
+    """
+
+    def __init__(self, path, game, snapshot_every=10000, buffer_size=4096):
+        self.path = path
+        self.game = game
+        self.snapshot_every = snapshot_every
+        self.buffer_size = buffer_size
+        num_territories = len(game.game_map.territories)
+        if num_territories > MAX_TERRITORIES:
+            raise ValueError(f'Event logs hold at most {MAX_TERRITORIES} '
+                             f'territories, the map has {num_territories}')
+        if len(game.players) > MAX_PLAYERS:
+            raise ValueError(f'Event logs hold at most {MAX_PLAYERS} '
+                             f'players, the game has {len(game.players)}')
+        self._p_index = {p: i for i, p in enumerate(game.players)}
+        self._file = open(path, 'wb')
+        self._index = open(f'{path}.idx', 'wb')
+        self._buffer = bytearray()
+        self._pending = 0
+        self.count = 0
+        self._since_snapshot = 0
+        self.turn_number = 0
+        self._write(HEADER, NONE, 0, 0, 0, num_territories, len(game.players))
+
+    def _write(self, kind, player, a, b, c, x, y):
+        self._buffer += RECORD.pack(kind, player, a, b, c, x, y)
+        self._pending += 1
+        self.count += 1
+        self._since_snapshot += 1
+        if self._pending >= self.buffer_size:
+            self.flush()
+
+    def _player(self, player):
+        return NONE if player is None else self._p_index[player]
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+            self._pending = 0
+        self._file.flush()
+        self._index.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def turn(self, player, turn_number):
+        self.turn_number = turn_number
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        self._write(TURN, self._player(player), 0, 0, 0, turn_number, 0)
+
+    def snapshot(self):
+        territories = self.game.game_map.territories
+        position = self.count
+        self._write(SNAPSHOT, self._player(self.game.next_player), 0, 0, 0,
+                    len(territories), self.turn_number)
+        for t in territories:
+            self._write(STATE, self._player(t.owner), t.index, 0, 0,
+                        t.num_armies, 0)
+        self._index.write(INDEX.pack(position, self.turn_number))
+        self._since_snapshot = 0
+
+    def place(self, territory, player, num_armies):
+        self._write(PLACE, self._player(player), territory.index, 0, 0,
+                    num_armies, 0)
+
+    def reinforce(self, territory, num_armies):
+        self._write(REINFORCE, NONE, territory.index, 0, 0, num_armies, 0)
+
+    def exchange(self, source, target, rattacker, rdefender, attacker_loses,
+                 defender_loses):
+        self._write(EXCHANGE, NONE,
+                    NO_TERRITORY if source is None else source.index,
+                    NO_TERRITORY if target is None else target.index,
+                    pack_dice(rattacker, rdefender), attacker_loses,
+                    defender_loses)
+
+    def conquer(self, player, source, target, num_armies):
+        self._write(CONQUER, self._player(player), source.index,
+                    target.index, 0, num_armies, 0)
+
+    def move(self, source, target, num_armies):
+        self._write(MOVE, NONE, source.index, target.index, 0, num_armies, 0)
+
+
+class EventLogReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < RECORD.size:
+                raise ValueError(f'{path} is empty')
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # A torn final record from a crash is ignored; everything before it
+        # is good.
+        self._length = len(self.data) // RECORD.size
+        kind, _, _, _, _, num_territories, num_players = \
+            RECORD.unpack_from(self.data)
+        if kind != HEADER:
+            raise ValueError(f'{path} is not an event log')
+        self.num_territories = num_territories
+        self.num_players = num_players
+        self.snapshots, self.snapshot_turns = self._load_index()
+
+    def __len__(self):
+        return self._length
+
+    def close(self):
+        self.data.close()
+
+    def _load_index(self):
+        positions = []
+        turns = []
+        index_path = f'{self.path}.idx'
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                data = f.read()
+            for position, turn in INDEX.iter_unpack(
+                    data[:len(data) - len(data) % INDEX.size]):
+                if position + 1 + self.num_territories <= len(self):
+                    positions.append(position)
+                    turns.append(turn)
+        else:
+            # No index, find the snapshots by scanning the kind bytes.
+            for position in range(len(self)):
+                if self.data[position * RECORD.size] == SNAPSHOT:
+                    positions.append(position)
+                    turns.append(RECORD.unpack_from(
+                        self.data, position * RECORD.size)[6])
+        return positions, turns
+
+    def records(self, start=0, stop=None):
+        if stop is None:
+            stop = len(self)
+        view = memoryview(self.data)[start * RECORD.size:stop * RECORD.size]
+        return RECORD.iter_unpack(view)
+
+    def events(self, start=0, stop=None):
+        # Records as (kind, player, a, b, c, x, y) tuples, without the
+        # contents of snapshots.
+        skip = 0
+        for record in self.records(start, stop):
+            if skip:
+                skip -= 1
+                continue
+            if record[0] == SNAPSHOT:
+                skip = record[5]
+            yield record
+
+    def state_at(self, game_map, players, position=None, turn=None):
+        """Replay the log into a GameState.
+
+        Stops before record `position`, or before turn `turn` begins, or at
+        the end of the log. Starts from the latest snapshot that comes
+        before that point.
+        """
+        if position is None:
+            position = len(self)
+        if turn is not None:
+            i = bisect_right(self.snapshot_turns, turn) - 1
+        else:
+            i = bisect_right(self.snapshots, position - 1) - 1
+        while i >= 0 and self.snapshots[i] >= position:
+            i -= 1
+        state = GameState(game_map, players)
+        start = 1
+        if i >= 0:
+            start = self._load_snapshot(state, self.snapshots[i])
+        owners = state.owners
+        armies = state.armies
+        skip = 0
+        for kind, player, a, b, c, x, y in self.records(start, position):
+            if skip:
+                skip -= 1
+            elif kind == EXCHANGE:
+                if a != NO_TERRITORY:
+                    armies[a] -= x
+                if b != NO_TERRITORY:
+                    armies[b] -= y
+            elif kind == CONQUER:
+                owners[b] = player
+                armies[a] -= x
+                armies[b] = x
+            elif kind == MOVE:
+                armies[a] -= x
+                armies[b] += x
+            elif kind == REINFORCE:
+                armies[a] += x
+            elif kind == PLACE:
+                owners[a] = NO_OWNER if player == NONE else player
+                armies[a] = x
+            elif kind == TURN:
+                state.next_player = player
+                if turn is not None and x >= turn:
+                    break
+            elif kind == SNAPSHOT:
+                skip = x
+        return state
+
+    def _load_snapshot(self, state, position):
+        _, player, _, _, _, count, _ = RECORD.unpack_from(
+            self.data, position * RECORD.size)
+        state.next_player = player
+        owners = array('h', [NO_OWNER]) * count
+        armies = array('i', [0]) * count
+        end = position + 1 + count
+        for _, owner, a, _, _, x, _ in self.records(position + 1, end):
+            owners[a] = NO_OWNER if owner == NONE else owner
+            armies[a] = x
+        state.owners = owners
+        state.armies = armies
+        return end
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import chain, repeat
+from operator import add, eq, mul, sub
+from random import Random
+
+from riskcli import MapTemplate
+
+
+# Layout of a compiled map (all integers are 32-bit in the byte order given
+# in the header; every section starts on a 4-byte boundary):
+#
+#   header            MAGIC, byte order, counts (see HEADER)
+#   int32[n + 1]      adjacency offsets
+#   int32[e]          adjacency
+#   int32[k]          continent bonuses
+#   int32[k + 1]      continent member offsets
+#   int32[m]          continent members
+#   int32[n + k + 1]  offsets of the names in the name blob
+#   bytes             name blob: territory names, then continent names, UTF-8
+MAGIC = b'RISKMAP1'
+HEADER = struct.Struct('<8s4s5i')
+LITTLE = b'LE\0\0'
+BIG = b'BE\0\0'
+
+
+class MapFormatError(ValueError):
+    pass
+
+
+def template_from_lists(names, neighbors, continents):
+    # `neighbors` is a list of neighbor names per territory and may list an
+    # edge on one side only; `continents` is a list of (name, bonus,
+    # territory names).
+    index = {}
+    for i, name in enumerate(names):
+        if name in index:
+            raise MapFormatError(f'Duplicate territory "{name}"')
+        index[name] = i
+
+    def lookup(name, where):
+        if name not in index:
+            raise MapFormatError(f'Unknown territory "{name}" in {where}')
+        return index[name]
+
+    adjacency_sets = [set() for _ in names]
+    for i, nnames in enumerate(neighbors):
+        for nname in nnames:
+            j = lookup(nname, f'neighbors of "{names[i]}"')
+            adjacency_sets[i].add(j)
+            adjacency_sets[j].add(i)
+    offsets = array('i', [0])
+    adjacency = array('i')
+    for s in adjacency_sets:
+        adjacency.extend(sorted(s))
+        offsets.append(len(adjacency))
+
+    indexed_continents = [
+        (name, bonus, [lookup(tname, f'continent "{name}"')
+                       for tname in tnames])
+        for name, bonus, tnames in continents]
+    template = MapTemplate(names, offsets, adjacency, indexed_continents)
+    validate(template)
+    return template
+
+
+def validate(template):
+    n = len(template.names)
+    offsets = template.adjacency_offsets
+    adjacency = template.adjacency
+    if len(offsets) != n + 1 or offsets[0] != 0 or \
+            offsets[n] != len(adjacency):
+        raise MapFormatError('Malformed adjacency table')
+    if len(set(template.names)) != n:
+        raise MapFormatError('Territory names are not unique')
+
+    neighbors = []
+    for i in range(n):
+        row = adjacency[offsets[i]:offsets[i + 1]]
+        if any(not 0 <= j < n for j in row):
+            raise MapFormatError(
+                f'"{template.names[i]}" has a neighbor out of range')
+        row = set(row)
+        if i in row:
+            raise MapFormatError(f'"{template.names[i]}" borders itself')
+        neighbors.append(row)
+    for i, row in enumerate(neighbors):
+        for j in row:
+            if i not in neighbors[j]:
+                raise MapFormatError(
+                    f'"{template.names[i]}" borders "{template.names[j]}" '
+                    f'but not the other way around')
+
+    if n:
+        seen = {0}
+        frontier = [0]
+        while frontier:
+            for j in neighbors[frontier.pop()]:
+                if j not in seen:
+                    seen.add(j)
+                    frontier.append(j)
+        if len(seen) != n:
+            missing = next(template.names[i] for i in range(n)
+                           if i not in seen)
+            raise MapFormatError(
+                f'Map is not connected: "{missing}" can\'t be reached from '
+                f'"{template.names[0]}"')
+
+    owner = {}
+    for name, _, members in template.continents:
+        for i in members:
+            if not 0 <= i < n:
+                raise MapFormatError(
+                    f'Continent "{name}" has a territory out of range')
+            if i in owner:
+                raise MapFormatError(
+                    f'"{template.names[i]}" is in both "{owner[i]}" and '
+                    f'"{name}"')
+            owner[i] = name
+
+
+def load_json(path):
+    # {"territories": [{"name": ..., "neighbors": [...]}, ...],
+    #  "continents": [{"name": ..., "bonus": ..., "territories": [...]}]}
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    try:
+        territories = data['territories']
+        return template_from_lists(
+            [t['name'] for t in territories],
+            [t.get('neighbors', []) for t in territories],
+            [(c['name'], c.get('bonus'), c['territories'])
+             for c in data.get('continents', [])])
+    except (KeyError, TypeError) as ex:
+        raise MapFormatError(f'Malformed map file {path}: {ex!r}')
+
+
+def load_csv(path, continents_path=None):
+    # Adjacency matrix as in tools/territories.csv: a header row of names,
+    # then one row per territory with a non-blank cell for every neighbor.
+    # Blank separator columns and '-' cells are ignored. A matrix may fill
+    # in one triangle only; if it fills in both they have to agree.
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = [row for row in csv.reader(f)]
+    if not rows:
+        raise MapFormatError(f'{path} is empty')
+    columns = rows[0]
+    names = [row[0].strip() for row in rows[1:] if row and row[0].strip()]
+    declared = {name: set() for name in names}
+    for row in rows[1:]:
+        if not row or not row[0].strip():
+            continue
+        name = row[0].strip()
+        for cell, other in zip(row[1:], columns[1:]):
+            other = other.strip()
+            if other and cell.strip() and cell.strip() != '-':
+                if other not in declared:
+                    raise MapFormatError(
+                        f'Unknown territory "{other}" in header of {path}')
+                declared[name].add(other)
+    both_sides = any(a in declared[b] for a in names for b in declared[a])
+    if both_sides:
+        for a in names:
+            for b in declared[a]:
+                if a not in declared[b]:
+                    raise MapFormatError(
+                        f'Adjacency matrix is not symmetric: "{a}" lists '
+                        f'"{b}" but not the other way around')
+
+    continents = []
+    if continents_path is not None:
+        continents = load_continents_csv(continents_path)
+    return template_from_lists(names, [sorted(declared[name])
+                                       for name in names], continents)
+
+
+def load_continents_csv(path):
+    # One row per territory: continent name, bonus, territory name.
+    continents = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip():
+                continue
+            if len(row) != 3:
+                raise MapFormatError(f'Expected continent,bonus,territory '
+                                     f'in {path}, got {row}')
+            name, bonus, territory = (cell.strip() for cell in row)
+            entry = continents.setdefault(name, [int(bonus), []])
+            if entry[0] != int(bonus):
+                raise MapFormatError(
+                    f'Continent "{name}" has more than one bonus')
+            entry[1].append(territory)
+    return [(name, bonus, members)
+            for name, (bonus, members) in continents.items()]
+
+
+def write_json(template, path):
+    names = template.names
+    offsets = template.adjacency_offsets
+    data = {
+        'territories': [
+            {'name': name,
+             'neighbors': [names[j] for j in
+                           template.adjacency[offsets[i]:offsets[i + 1]]]}
+            for i, name in enumerate(names)],
+        'continents': [
+            {'name': name, 'bonus': bonus,
+             'territories': [names[i] for i in members]}
+            for name, bonus, members in template.continents],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def compile_map(template, path):
+    n = len(template.names)
+    k = len(template.continents)
+    bonuses = array('i', (0 if bonus is None else bonus
+                          for _, bonus, _ in template.continents))
+    member_offsets = array('i', [0])
+    members = array('i')
+    for _, _, indexes in template.continents:
+        members.extend(indexes)
+        member_offsets.append(len(members))
+    encoded = [name.encode('utf-8') for name in template.names] + \
+        [name.encode('utf-8') for name, _, _ in template.continents]
+    name_offsets = array('i', [0])
+    for name in encoded:
+        name_offsets.append(name_offsets[-1] + len(name))
+
+    byte_order = LITTLE if sys.byteorder == 'little' else BIG
+    # one per process, so processes compiling the same map at once don't
+    # write into each other's file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, byte_order, n, len(template.adjacency),
+                            k, len(members), name_offsets[-1]))
+        for section in [array('i', template.adjacency_offsets),
+                        array('i', template.adjacency), bonuses,
+                        member_offsets, members, name_offsets]:
+            section.tofile(f)
+        f.write(b''.join(encoded))
+    os.replace(tmp_path, path)
+
+
+def check_compiled(path, n, offsets, adjacency, member_offsets, members):
+    # The checks of validate() that catch a damaged compiled file, done in
+    # bulk so loading stays fast: the tables are in range and every border
+    # is listed on both sides. Connectivity and the names were checked when
+    # the map was compiled.
+    for table_offsets, table, size in [(offsets, adjacency, n),
+                                       (member_offsets, members, n)]:
+        table_offsets = table_offsets.tolist()
+        if table_offsets[0] != 0 or table_offsets[-1] != len(table) or \
+                table_offsets != sorted(table_offsets):
+            raise MapFormatError(f'{path} has malformed offsets')
+        if len(table) and (min(table) < 0 or max(table) >= size):
+            raise MapFormatError(f'{path} has a territory out of range')
+    # Border i-j as the number i * n + j, with map() doing the arithmetic.
+    adjacency = adjacency.tolist()
+    offsets = offsets.tolist()
+    sources = list(chain.from_iterable(map(
+        repeat, range(n), map(sub, offsets[1:], offsets[:-1]))))
+    if any(map(eq, sources, adjacency)):
+        raise MapFormatError(f'{path} has a territory bordering itself')
+    if sorted(map(add, map(mul, sources, repeat(n)), adjacency)) != \
+            sorted(map(add, map(mul, adjacency, repeat(n)), sources)):
+        raise MapFormatError(f'{path} has a border listed on one side only')
+
+
+def load_compiled(path):
+    with open(path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise MapFormatError(f'{path} is empty')
+    if len(buf) < HEADER.size:
+        raise MapFormatError(f'{path} is not a compiled map')
+    magic, byte_order, n, e, k, m, blob_size = HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise MapFormatError(f'{path} is not a compiled map')
+    sizes = [n + 1, e, k, k + 1, m, n + k + 1]
+    if len(buf) != HEADER.size + 4 * sum(sizes) + blob_size:
+        raise MapFormatError(f'{path} is truncated or corrupt')
+
+    native = byte_order == (LITTLE if sys.byteorder == 'little' else BIG)
+    sections = []
+    position = HEADER.size
+    view = memoryview(buf)
+    for size in sizes:
+        chunk = view[position:position + 4 * size]
+        if native:
+            # No copy and no parsing: the tables are views into the map.
+            sections.append(chunk.cast('i'))
+        else:
+            section = array('i', chunk.tobytes())
+            section.byteswap()
+            sections.append(section)
+        position += 4 * size
+    offsets, adjacency, bonuses, member_offsets, members, name_offsets = \
+        sections
+    check_compiled(path, n, offsets, adjacency, member_offsets, members)
+    blob = view[position:position + blob_size]
+    names = [str(blob[name_offsets[i]:name_offsets[i + 1]], 'utf-8')
+             for i in range(n + k)]
+    continents = [(names[n + c], bonuses[c],
+                   members[member_offsets[c]:member_offsets[c + 1]])
+                  for c in range(k)]
+    return MapTemplate(names[:n], offsets, adjacency, continents)
+
+
+def load_map(path, cache=True):
+    """Load a map template from a .json, .csv or compiled .rmap file.
+
+    Text maps are compiled to `<path>.rmap` next to the source the first
+    time they are loaded, and later loads read the compiled file as long
+    as it is newer than the source.
+    """
+    if path.endswith('.rmap'):
+        return load_compiled(path)
+    compiled = f'{path}.rmap'
+    if cache and os.path.exists(compiled) and \
+            os.path.getmtime(compiled) >= os.path.getmtime(path):
+        try:
+            return load_compiled(compiled)
+        except MapFormatError:
+            # a damaged cache is rebuilt from the source below
+            pass
+    if path.endswith('.json'):
+        template = load_json(path)
+    elif path.endswith('.csv'):
+        template = load_csv(path)
+    else:
+        raise MapFormatError(f'Don\'t know how to load {path}')
+    if cache:
+        try:
+            compile_map(template, compiled)
+        except OSError:
+            pass
+    return template
+
+
+def generate_map(num_territories, seed=0, mean_degree=4.0, max_degree=8,
+                 continent_size=7):
+    """Generate a random map that could be drawn on paper.
+
+    Territories sit on a square grid, each bordering the ones beside,
+    above, below and on one diagonal, so borders never cross. A random
+    spanning tree of those keeps the map connected, and other borders are
+    kept at random to average `mean_degree` neighbors, none getting more
+    than `max_degree` unless the map can't be connected otherwise (planar
+    maps can't average more than 6). Continents
+    of about `continent_size` territories grow from random seeds, and
+    their bonus grows with their size and with how many of their
+    territories border another continent, roughly as in the classic map.
+
+    The same arguments always give the same MapTemplate.
+    """
+    if num_territories < 1:
+        raise ValueError(f'A map needs at least one territory, not '
+                         f'{num_territories}')
+    if mean_degree < 0:
+        raise ValueError(f'mean_degree must not be negative, not '
+                         f'{mean_degree}')
+    if max_degree < 1:
+        raise ValueError(f'max_degree must be at least 1, not {max_degree}')
+    if continent_size < 1:
+        raise ValueError(f'continent_size must be at least 1, not '
+                         f'{continent_size}')
+    rng = Random(seed)
+    n = num_territories
+    width = max(1, int(n ** 0.5 + 0.5))
+    edges = []
+    for i in range(n):
+        row, column = divmod(i, width)
+        right = column + 1 < width and i + 1 < n
+        if right:
+            edges.append((i, i + 1))
+        if i + width < n:
+            edges.append((i, i + width))
+        if right and i + width + 1 < n:
+            if rng.random() < 0.5:
+                edges.append((i, i + width + 1))
+            else:
+                edges.append((i + 1, i + width))
+    rng.shuffle(edges)
+
+    # Kruskal's algorithm over the shuffled borders: a random spanning tree
+    parent = list(range(n))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    neighbors = [[] for _ in range(n)]
+    extra = []
+    crowded = []
+    for i, j in edges:
+        a, b = root(i), root(j)
+        if a == b:
+            extra.append((i, j))
+        elif len(neighbors[i]) >= max_degree or \
+                len(neighbors[j]) >= max_degree:
+            crowded.append((i, j))
+        else:
+            parent[a] = b
+            neighbors[i].append(j)
+            neighbors[j].append(i)
+    # only if there's no other way to connect the map
+    for i, j in crowded:
+        a, b = root(i), root(j)
+        if a != b:
+            parent[a] = b
+            neighbors[i].append(j)
+            neighbors[j].append(i)
+    # the rest are still in random order
+    wanted = round(mean_degree * n / 2) - (n - 1)
+    for i, j in extra:
+        if wanted <= 0:
+            break
+        if len(neighbors[i]) < max_degree and \
+                len(neighbors[j]) < max_degree:
+            neighbors[i].append(j)
+            neighbors[j].append(i)
+            wanted -= 1
+
+    offsets = array('i', [0])
+    adjacency = array('i')
+    for row in neighbors:
+        adjacency.extend(sorted(row))
+        offsets.append(len(adjacency))
+
+    # Continents grow outward from their seeds one territory at a time,
+    # picking which continent grows next at random, so they stay connected.
+    num_continents = max(1, round(n / continent_size))
+    continent_of = [-1] * n
+    frontiers = []
+    for c, i in enumerate(rng.sample(range(n), num_continents)):
+        continent_of[i] = c
+        frontiers.append([i])
+    growing = list(range(num_continents))
+    while growing:
+        k = rng.randrange(len(growing))
+        frontier = frontiers[growing[k]]
+        f = rng.randrange(len(frontier))
+        i = frontier[f]
+        free = [j for j in neighbors[i] if continent_of[j] < 0]
+        if not free:
+            frontier[f] = frontier[-1]
+            frontier.pop()
+            if not frontier:
+                growing[k] = growing[-1]
+                growing.pop()
+            continue
+        j = rng.choice(free)
+        continent_of[j] = growing[k]
+        frontier.append(j)
+
+    members = [[] for _ in range(num_continents)]
+    borders = [0] * num_continents
+    for i in range(n):
+        c = continent_of[i]
+        members[c].append(i)
+        if any(continent_of[j] != c for j in neighbors[i]):
+            borders[c] += 1
+    digits = len(str(n - 1))
+    names = [f'T{i:0{digits}d}' for i in range(n)]
+    continents = [
+        (f'C{c}', max(1, round((len(m) + 2 * borders[c]) / 4)), m)
+        for c, m in enumerate(members)]
+    return MapTemplate(names, offsets, adjacency, continents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and compile maps.')
+    sub = parser.add_subparsers(dest='command')
+    check = sub.add_parser('check', help='validate a map file')
+    check.add_argument('path')
+    comp = sub.add_parser('compile', help='compile a map to binary form')
+    comp.add_argument('path')
+    comp.add_argument('output', nargs='?')
+    comp.add_argument('--continents', help='continents CSV for a CSV map')
+    export = sub.add_parser('export-default',
+                            help='write the classic map as JSON')
+    export.add_argument('output')
+    generate = sub.add_parser('generate',
+                              help='write a random map as JSON, or compiled '
+                                   'if the output ends in .rmap')
+    generate.add_argument('territories', type=int)
+    generate.add_argument('output')
+    generate.add_argument('--seed', type=int, default=0)
+    generate.add_argument('--mean-degree', type=float, default=4.0)
+    generate.add_argument('--max-degree', type=int, default=8)
+    generate.add_argument('--continent-size', type=int, default=7)
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        template = load_map(args.path, cache=False)
+        print(f'{args.path}: {len(template.names)} territories, '
+              f'{len(template.adjacency) // 2} borders, '
+              f'{len(template.continents)} continents')
+    elif args.command == 'compile':
+        if args.path.endswith('.csv'):
+            template = load_csv(args.path, args.continents)
+        else:
+            template = load_map(args.path, cache=False)
+        compile_map(template, args.output or f'{args.path}.rmap')
+    elif args.command == 'export-default':
+        from riskcli import gen_default_map
+        write_json(gen_default_map().to_template(), args.output)
+    elif args.command == 'generate':
+        try:
+            template = generate_map(args.territories, args.seed,
+                                    args.mean_degree, args.max_degree,
+                                    args.continent_size)
+        except ValueError as ex:
+            parser.error(str(ex))
+        if args.output.endswith('.rmap'):
+            compile_map(template, args.output)
+        else:
+            write_json(template, args.output)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
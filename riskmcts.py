@@ -0,0 +1,368 @@
+import math
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import lru_cache
+from random import Random
+
+from riskengine import AggressivePolicy
+from riskodds import battle_odds
+from riskstate import GameState
+
+
+END_TURN = ('end',)
+
+
+@lru_cache(maxsize=4096)
+def battle_outcomes(attackers, defenders):
+    # Chance node of a whole battle: (cumulative probabilities, outcomes),
+    # where an outcome is (attackers left, defenders left).
+    odds = battle_odds(attackers, defenders)
+    outcomes = [(k, 0) for k in range(1, attackers + 1)] + \
+        [(0, k) for k in range(1, defenders + 1)]
+    probs = list(odds.attacker_survivors[1:]) + \
+        list(odds.defender_survivors[1:])
+    cumulative = []
+    total = 0.0
+    for p in probs:
+        total += p
+        cumulative.append(total)
+    return cumulative, outcomes
+
+
+class ZobristKeys:
+    # Random 64-bit keys for (territory, owner, armies) and for the player
+    # to move, generated on first use so army counts aren't capped.
+    def __init__(self, seed=0):
+        self._rng = Random(seed)
+        self._keys = {}
+
+    def __call__(self, *key):
+        value = self._keys.get(key)
+        if value is None:
+            value = self._keys[key] = self._rng.getrandbits(64)
+        return value
+
+
+class SearchState:
+    def __init__(self, state, keys, neighbors, continents, hash_=None):
+        self.state = state
+        self.keys = keys
+        # plain lists of neighbor indexes and continent (bonus, members),
+        # shared by all copies
+        self.neighbors = neighbors
+        self.continents = continents
+        if hash_ is None:
+            hash_ = keys('player', state.next_player)
+            for i, (owner, armies) in enumerate(zip(state.owners,
+                                                    state.armies)):
+                hash_ ^= keys(i, owner, armies)
+        self.hash = hash_
+
+    @staticmethod
+    def from_state(state, keys):
+        game_map = state.game_map
+        neighbors = [list(game_map.neighbor_indexes(i))
+                     for i in range(len(game_map.territories))]
+        continents = [(c.bonus or 0, [t.index for t in c.territories])
+                      for c in game_map.continents]
+        return SearchState(state, keys, neighbors, continents)
+
+    def copy(self):
+        return SearchState(self.state.copy(), self.keys, self.neighbors,
+                           self.continents, self.hash)
+
+    def set(self, index, owner, armies):
+        state = self.state
+        self.hash ^= self.keys(index, state.owners[index],
+                               state.armies[index])
+        self.hash ^= self.keys(index, owner, armies)
+        state.owners[index] = owner
+        state.armies[index] = armies
+
+    def attacks(self, player):
+        owners = self.state.owners
+        armies = self.state.armies
+        return [('attack', i, j)
+                for i, owner in enumerate(owners)
+                if owner == player and armies[i] > 1
+                for j in self.neighbors[i] if owners[j] != player]
+
+    def fortifications(self, player):
+        # Only whole-stack moves from interior territories to a border;
+        # anything finer blows up the branching factor for little gain.
+        owners = self.state.owners
+        armies = self.state.armies
+        moves = []
+        for i, owner in enumerate(owners):
+            if owner != player or armies[i] < 2 or self.is_border(i):
+                continue
+            for j in self.neighbors[i]:
+                if owners[j] == player and self.is_border(j):
+                    moves.append(('fortify', i, j, armies[i] - 1))
+        return moves
+
+    def is_border(self, index):
+        owners = self.state.owners
+        owner = owners[index]
+        for j in self.neighbors[index]:
+            if owners[j] != owner:
+                return True
+        return False
+
+    def battle(self, source, target, rng):
+        armies = self.state.armies
+        cumulative, outcomes = battle_outcomes(armies[source] - 1,
+                                               armies[target])
+        i = min(bisect_right(cumulative, rng.random()), len(outcomes) - 1)
+        attackers_left, defenders_left = outcomes[i]
+        player = self.state.owners[source]
+        if attackers_left:
+            self.set(target, player, attackers_left)
+        else:
+            self.set(target, self.state.owners[target], defenders_left)
+        self.set(source, player, 1)
+
+    def apply(self, action, rng):
+        kind = action[0]
+        if kind == 'attack':
+            self.battle(action[1], action[2], rng)
+        elif kind == 'fortify':
+            _, source, target, num_armies = action
+            owners = self.state.owners
+            armies = self.state.armies
+            self.set(source, owners[source], armies[source] - num_armies)
+            self.set(target, owners[target], armies[target] + num_armies)
+
+    def reinforcements(self, player):
+        owners = self.state.owners
+        count = owners.count(player)
+        bonus = sum(b for b, members in self.continents
+                    if members and all(owners[i] == player
+                                       for i in members))
+        return max(3, count // 3) + bonus
+
+    def alive(self):
+        return {owner for owner in self.state.owners if owner >= 0}
+
+    def next_alive(self, player):
+        alive = self.alive()
+        n = self.state.num_players
+        for k in range(1, n + 1):
+            candidate = (player + k) % n
+            if candidate in alive:
+                return candidate
+        return player
+
+    def play_default_turn(self, player, rng, max_battles=20):
+        # Cheap greedy turn used for rollouts: reinforce the strongest
+        # border territory and attack while clearly ahead.
+        owners = self.state.owners
+        armies = self.state.armies
+        best = None
+        best_score = None
+        for i, owner in enumerate(owners):
+            if owner != player:
+                continue
+            enemies = [armies[j] for j in self.neighbors[i]
+                       if owners[j] != player]
+            if enemies:
+                score = armies[i] - min(enemies)
+                if best is None or score > best_score:
+                    best = i
+                    best_score = score
+        if best is None:
+            return
+        self.set(best, player, armies[best] + self.reinforcements(player))
+        for _ in range(max_battles):
+            options = [(armies[i] - armies[j], i, j)
+                       for _, i, j in self.attacks(player)
+                       if armies[i] > armies[j] + 1]
+            if not options:
+                break
+            _, i, j = max(options)
+            self.battle(i, j, rng)
+
+    def evaluate(self, player):
+        owners = self.state.owners
+        armies = self.state.armies
+        mine = owners.count(player)
+        if mine == 0:
+            return 0.0
+        if mine == len(owners):
+            return 1.0
+        my_armies = sum(a for o, a in zip(owners, armies) if o == player)
+        return 0.5 * mine / len(owners) + 0.5 * my_armies / sum(armies)
+
+
+class Node:
+    def __init__(self, actions):
+        self.actions = actions
+        self.visits = 0
+        # action -> [visits, total value]
+        self.stats = {}
+
+
+class Decision:
+    def __init__(self, action, root, iterations, nodes, elapsed, tt_size,
+                 tt_hits):
+        self.action = action
+        self.visits = root.stats.get(action, [0, 0.0])[0]
+        self.value = (root.stats[action][1] / self.visits
+                      if self.visits else 0.0)
+        self.iterations = iterations
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.tt_size = tt_size
+        self.tt_hits = tt_hits
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+
+class MCTS:
+    """Monte Carlo Tree Search over one player's attack and fortify moves.
+
+    Attacks are whole battles whose result is drawn from the exact
+    distribution in riskodds, so every attack is a chance node. Tree nodes
+    live in a transposition table keyed by a Zobrist hash of every
+    territory's owner and army count, evicting the least recently used
+    entry once `max_nodes` is reached.
+    """
+
+    def __init__(self, seed=None, exploration=1.4, max_nodes=100000,
+                 rollout_turns=2, max_depth=40):
+        self.rng = Random(seed)
+        self.keys = ZobristKeys(self.rng.getrandbits(64))
+        self.exploration = exploration
+        self.max_nodes = max_nodes
+        self.rollout_turns = rollout_turns
+        self.max_depth = max_depth
+        self.table = OrderedDict()
+        self.tt_hits = 0
+
+    def lookup(self, search_state, player):
+        key = search_state.hash
+        node = self.table.get(key)
+        if node is not None:
+            self.table.move_to_end(key)
+            self.tt_hits += 1
+            return node, False
+        node = Node(search_state.attacks(player) +
+                    search_state.fortifications(player) + [END_TURN])
+        self.table[key] = node
+        if len(self.table) > self.max_nodes:
+            self.table.popitem(last=False)
+        return node, True
+
+    def select(self, node):
+        best = None
+        best_score = None
+        log_visits = math.log(node.visits + 1)
+        for action in node.actions:
+            stats = node.stats.get(action)
+            if stats is None:
+                return action
+            n, w = stats
+            score = w / n + self.exploration * math.sqrt(log_visits / n)
+            if best is None or score > best_score:
+                best = action
+                best_score = score
+        return best
+
+    def rollout(self, search_state, player):
+        current = search_state.next_alive(player)
+        for _ in range(self.rollout_turns * search_state.state.num_players):
+            if len(search_state.alive()) < 2:
+                break
+            search_state.play_default_turn(current, self.rng)
+            current = search_state.next_alive(current)
+        return search_state.evaluate(player)
+
+    def iterate(self, root_state, player):
+        search_state = root_state.copy()
+        path = []
+        nodes = 0
+        while True:
+            node, created = self.lookup(search_state, player)
+            nodes += 1
+            if created or len(path) >= self.max_depth:
+                value = self.rollout(search_state, player)
+                break
+            action = self.select(node)
+            path.append((node, action))
+            search_state.apply(action, self.rng)
+            if action[0] != 'attack':
+                value = self.rollout(search_state, player)
+                break
+        for node, action in path:
+            node.visits += 1
+            stats = node.stats.setdefault(action, [0, 0.0])
+            stats[0] += 1
+            stats[1] += value
+        return nodes
+
+    def decide(self, state, time_budget=0.2, max_iterations=None):
+        """Pick a move for `state.next_player` within `time_budget` seconds.
+
+        Returns a Decision whose action is ('attack', source, target),
+        ('fortify', source, target, num_armies) or END_TURN, with territory
+        indexes as in `state.game_map`.
+        """
+        started = time.perf_counter()
+        deadline = started + time_budget
+        player = state.next_player
+        root_state = SearchState.from_state(state, self.keys)
+        hits_before = self.tt_hits
+        iterations = 0
+        nodes = 0
+        while time.perf_counter() < deadline:
+            if max_iterations is not None and iterations >= max_iterations:
+                break
+            nodes += self.iterate(root_state, player)
+            iterations += 1
+        root, _ = self.lookup(root_state, player)
+        if root.stats:
+            action = max(root.stats, key=lambda a: root.stats[a][0])
+        else:
+            action = END_TURN
+        return Decision(action, root, iterations, nodes,
+                        time.perf_counter() - started, len(self.table),
+                        self.tt_hits - hits_before)
+
+
+class MCTSPolicy(AggressivePolicy):
+    # Engine policy that asks MCTS for every attack and for the final
+    # fortify move. Reinforcement placement is inherited.
+    time_budget = 0.05
+
+    def __init__(self, rng):
+        super().__init__(rng)
+        self.search = MCTS(seed=rng.getrandbits(64))
+        self.pending_fortify = None
+
+    def _decide(self, game, player):
+        state = GameState.from_game(game)
+        state.next_player = game.players.index(player)
+        return self.search.decide(state, self.time_budget).action
+
+    def choose_attack(self, game, player):
+        self.pending_fortify = None
+        action = self._decide(game, player)
+        territories = game.game_map.territories
+        if action[0] == 'attack':
+            return territories[action[1]], territories[action[2]]
+        if action[0] == 'fortify':
+            self.pending_fortify = (territories[action[1]],
+                                    territories[action[2]], action[3])
+        return None
+
+    def occupy(self, game, player, source, target, min_armies):
+        # the search assumes the whole stack moves in
+        return source.num_armies - 1
+
+    def fortify(self, game, player):
+        move = self.pending_fortify
+        self.pending_fortify = None
+        return move
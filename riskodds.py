@@ -0,0 +1,102 @@
+from functools import lru_cache
+from itertools import product
+
+
+MAX_ATTACK_DICE = 3
+MAX_DEFEND_DICE = 2
+
+
+@lru_cache(maxsize=None)
+def exchange_outcomes(attack_dice, defend_dice):
+    # Enumerate every roll of the dice for a single exchange and count how
+    # often each (attacker_loses, defender_loses) result comes up. Ties go to
+    # the defender, exactly as in cmd_attack.
+    counts = {}
+    faces = range(1, 7)
+    for dice in product(faces, repeat=attack_dice + defend_dice):
+        rattacker = sorted(dice[:attack_dice], reverse=True)
+        rdefender = sorted(dice[attack_dice:], reverse=True)
+        attacker_loses = 0
+        defender_loses = 0
+        for a, d in zip(rattacker, rdefender):
+            if d >= a:
+                attacker_loses += 1
+            else:
+                defender_loses += 1
+        key = (attacker_loses, defender_loses)
+        counts[key] = counts.get(key, 0) + 1
+    total = 6 ** (attack_dice + defend_dice)
+    return tuple((al, dl, count / total)
+                 for (al, dl), count in sorted(counts.items()))
+
+
+class BattleOdds:
+    def __init__(self, attackers, defenders, attacker_survivors,
+                 defender_survivors):
+        self.attackers = attackers
+        self.defenders = defenders
+        # attacker_survivors[k] is the probability that the attacker takes
+        # the territory with k armies left; defender_survivors[k] is the
+        # probability that the defender holds with k armies left. Index 0 of
+        # each is always 0.
+        self.attacker_survivors = attacker_survivors
+        self.defender_survivors = defender_survivors
+
+    @property
+    def win_probability(self):
+        return sum(self.attacker_survivors)
+
+    @property
+    def loss_probability(self):
+        return sum(self.defender_survivors)
+
+    @property
+    def expected_attacker_survivors(self):
+        return sum(k * p for k, p in enumerate(self.attacker_survivors))
+
+    @property
+    def expected_defender_survivors(self):
+        return sum(k * p for k, p in enumerate(self.defender_survivors))
+
+
+@lru_cache(maxsize=4096)
+def battle_odds(attackers, defenders):
+    """Exact outcome distribution of a whole battle.
+
+    `attackers` is the number of armies committed to the attack (not
+    counting the one that has to stay behind), `defenders` the number of
+    armies in the defending territory. Exchanges are repeated with as many
+    dice as each side can roll until one side has no armies left.
+    """
+    if attackers < 0 or defenders < 0:
+        raise ValueError('Army counts must not be negative')
+
+    outcomes = {}
+    for na in range(1, MAX_ATTACK_DICE + 1):
+        for nd in range(1, MAX_DEFEND_DICE + 1):
+            outcomes[na, nd] = exchange_outcomes(na, nd)
+
+    # prob[a][d] is the probability of the battle ever reaching a state with
+    # `a` attackers and `d` defenders. Every exchange strictly lowers a + d,
+    # so one sweep from the top corner down settles every state.
+    prob = [[0.0] * (defenders + 1) for _ in range(attackers + 1)]
+    prob[attackers][defenders] = 1.0
+    for a in range(attackers, 0, -1):
+        na = min(a, MAX_ATTACK_DICE)
+        rows = [prob[a - al] for al in range(na + 1)]
+        row = rows[0]
+        # Hoist the row lookups out of the inner loop; this is the hot spot.
+        steps = {nd: [(rows[al], dl, p) for al, dl, p in outcomes[na, nd]]
+                 for nd in range(1, MAX_DEFEND_DICE + 1)}
+        for d in range(defenders, 0, -1):
+            mass = row[d]
+            if not mass:
+                continue
+            for target, dl, p in steps[min(d, MAX_DEFEND_DICE)]:
+                target[d - dl] += mass * p
+
+    attacker_survivors = (0.0,) + tuple(prob[a][0]
+                                        for a in range(1, attackers + 1))
+    defender_survivors = (0.0,) + tuple(prob[0][1:])
+    return BattleOdds(attackers, defenders, attacker_survivors,
+                      defender_survivors)
@@ -0,0 +1,148 @@
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+from riskengine import AggressivePolicy
+from riskstate import GameState
+
+
+# Weights of the parts of a territory's score, see threat_scores.
+THREAT_WEIGHT = 1.0
+OPPORTUNITY_WEIGHT = 0.5
+CONTINENT_WEIGHT = 0.25
+
+
+class MapArrays:
+    # NumPy view of a map's topology: every directed edge as (source,
+    # target), plus continent membership and bonuses. Built once per map
+    # from the CSR tables, in time linear in the size of the map.
+    def __init__(self, game_map):
+        offsets = np.asarray(game_map.adjacency_offsets, dtype=np.int64)
+        n = len(offsets) - 1
+        self.num_territories = n
+        self.sources = np.repeat(np.arange(n), np.diff(offsets))
+        self.targets = np.asarray(game_map.adjacency, dtype=np.int64)
+        num_continents = len(game_map.continents)
+        # territories outside any continent go in an extra, bonus-less one
+        continent_of = np.asarray(game_map.continent_of, dtype=np.int64)
+        self.continent_of = np.where(continent_of < 0, num_continents,
+                                     continent_of)
+        self.bonuses = np.array([c.bonus or 0 for c in game_map.continents] +
+                                [0], dtype=np.float64)
+        self.continent_sizes = np.bincount(self.continent_of,
+                                           minlength=num_continents + 1)
+
+
+_arrays = WeakKeyDictionary()
+
+
+def map_arrays(game_map):
+    arrays = _arrays.get(game_map)
+    if arrays is None:
+        arrays = _arrays[game_map] = MapArrays(game_map)
+    return arrays
+
+
+def state_arrays(state):
+    # The owners and armies of a GameState as NumPy arrays, without copying.
+    return (np.frombuffer(state.owners, dtype=np.int16),
+            np.frombuffer(state.armies, dtype=np.int32))
+
+
+def reinforcement_counts(state):
+    """Reinforcements due to every player, as an array indexed by player:
+    a third of their territories (at least 3) plus the bonus of every
+    continent they own outright."""
+    arrays = map_arrays(state.game_map)
+    owners, _ = state_arrays(state)
+    num_players = state.num_players
+    owned = owners >= 0
+    territories = np.bincount(owners[owned], minlength=num_players)
+    # held[c, p]: territories of continent c held by player p
+    held = np.bincount(arrays.continent_of[owned] * num_players +
+                       owners[owned],
+                       minlength=len(arrays.bonuses) * num_players)
+    held = held.reshape(len(arrays.bonuses), num_players)
+    complete = (held == arrays.continent_sizes[:, None]) & \
+        (arrays.continent_sizes[:, None] > 0)
+    bonus = arrays.bonuses @ complete
+    return np.maximum(3, territories // 3) + bonus.astype(np.int64)
+
+
+def threat_scores(state, player):
+    """Score every territory of `player` for reinforcement.
+
+    Returns (scores, border): `border` marks the player's territories with
+    an enemy neighbor, and only those get a positive score, made of
+
+    - threat: enemy armies next door per army already there,
+    - opportunity: how many weak enemy territories could be attacked (an
+      empty one counts like one with a single army),
+    - continent: the bonus of the territory's continent, times the share
+      of it the player already holds.
+
+    Everything is computed in one pass over the edge arrays, so the cost
+    is linear in the number of borders.
+    """
+    arrays = map_arrays(state.game_map)
+    owners, armies = state_arrays(state)
+    n = arrays.num_territories
+    mine = owners == player
+    sources = arrays.sources
+    targets = arrays.targets
+    front = mine[sources] & ~mine[targets]
+    front_sources = sources[front]
+    enemy_armies = armies[targets[front]].astype(np.float64)
+    threat = np.bincount(front_sources, weights=enemy_armies, minlength=n)
+    opportunity = np.bincount(front_sources,
+                              weights=1.0 / np.maximum(enemy_armies, 1),
+                              minlength=n)
+    border = mine & (np.bincount(front_sources, minlength=n) > 0)
+
+    held = np.bincount(arrays.continent_of[mine],
+                       minlength=len(arrays.bonuses))
+    share = held / np.maximum(arrays.continent_sizes, 1)
+    continent = (arrays.bonuses * share)[arrays.continent_of]
+
+    scores = (THREAT_WEIGHT * threat / np.maximum(armies, 1) +
+              OPPORTUNITY_WEIGHT * opportunity +
+              CONTINENT_WEIGHT * continent)
+    return np.where(border, scores, 0.0), border
+
+
+def recommend_placements(state, player, count=None, spread=2):
+    """Split `count` reinforcements (by default, what `player` is due)
+    between the `spread` best scoring border territories, in proportion to
+    their scores. Returns a list of (territory index, armies)."""
+    if count is None:
+        count = int(reinforcement_counts(state)[player])
+    scores, border = threat_scores(state, player)
+    if not border.any():
+        owned = np.flatnonzero(np.frombuffer(state.owners, dtype=np.int16)
+                               == player)
+        return [(int(owned[0]), count)] if len(owned) and count else []
+    k = min(spread, int(border.sum()))
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best], kind='stable')]
+    total = scores[best].sum()
+    if total > 0:
+        weights = scores[best] / total
+    else:
+        weights = np.full(k, 1.0 / k)
+    shares = np.floor(weights * count).astype(np.int64)
+    # largest remainders get the armies lost to rounding down
+    for i in np.argsort(-(weights * count - shares),
+                        kind='stable')[:count - shares.sum()]:
+        shares[i] += 1
+    return [(int(i), int(s)) for i, s in zip(best, shares) if s]
+
+
+class ThreatPolicy(AggressivePolicy):
+    # AggressivePolicy with reinforcements placed by recommend_placements,
+    # all on the territory that needs them most.
+
+    def place_reinforcements(self, game, player, count):
+        state = GameState.from_game(game)
+        territories = game.game_map.territories
+        return [(territories[i], n) for i, n in recommend_placements(
+            state, game.players.index(player), count, spread=1)]
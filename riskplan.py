@@ -0,0 +1,278 @@
+import time
+
+import numpy as np
+
+from riskcli import Continent
+from riskengine import AggressivePolicy, enemy_neighbors
+from riskodds import battle_odds
+
+
+# _matrices[d] is the transition matrix of a battle against `d` defenders:
+# row a holds the chances of taking the territory with each number of
+# attackers left to attack again, i.e. survivors - 1, when attacking with
+# `a`. Matrices grow on demand and smaller queries use their top-left
+# corner, so they are shared by every query.
+_matrices = {}
+
+
+def transition_matrix(attackers, defenders):
+    size = attackers + 1
+    matrix = _matrices.get(defenders)
+    if matrix is None or len(matrix) < size:
+        capacity = max(size, 2 * len(matrix) if matrix is not None else 16)
+        matrix = np.zeros((capacity, capacity))
+        for a in range(1, capacity):
+            survivors = battle_odds(a, defenders).attacker_survivors
+            matrix[a, :a] = survivors[1:]
+        _matrices[defenders] = matrix
+    return matrix[:size, :size]
+
+
+class AttackPlan:
+    def __init__(self, source, path, distribution, nodes, elapsed):
+        self.source = source
+        # territories to conquer, in order
+        self.path = path
+        # distribution[k] is the chance of ending with the whole path taken
+        # and k armies free to attack from the last territory, i.e. k + 1
+        # armies in it
+        self.distribution = distribution
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def probability(self):
+        return float(self.distribution.sum())
+
+    @property
+    def expected_armies(self):
+        # Armies in the last territory, counting failure as none.
+        return float(self.distribution @ np.arange(1, len(self.distribution)
+                                                   + 1))
+
+
+def _weights(top, objective):
+    if objective == 'probability':
+        return np.ones(top + 1)
+    return np.arange(1, top + 2, dtype=float)
+
+
+def _bound_weights(top, objective, defenders, cache):
+    # Weights w such that distribution @ w bounds the value of any chain
+    # that still has to take territories with `defenders` armies: take just
+    # those, strongest first. Battles against more defenders or with fewer
+    # attackers never go better, so detours only lose value, and checking
+    # every order of up to five battles shows strongest first is never
+    # beaten.
+    key = tuple(sorted(defenders, reverse=True))
+    weights = cache.get(key)
+    if weights is None:
+        if key:
+            weights = transition_matrix(top, key[0]) @ _bound_weights(
+                top, objective, key[1:], cache)
+        else:
+            weights = _weights(top, objective)
+        cache[key] = weights
+    return weights
+
+
+def plan_attack(source, targets, objective='probability', time_budget=None,
+                num_armies=None):
+    """Find the chain of attacks from `source` that takes every territory
+    in `targets` not already owned by the source's owner.
+
+    `targets` is a Continent or an iterable of Territory. Each battle is
+    fought with everything but the army left behind, and the survivors
+    move on. The chain may pass through other enemy territories to get
+    there. `objective` is 'probability' to maximize the chance of taking
+    every target, or 'armies' to maximize the armies expected to be left
+    at the end. `num_armies` overrides the armies in `source`, e.g. to
+    plan with reinforcements that haven't been placed yet.
+
+    Returns the best AttackPlan, or None if no chain reaches every target.
+    With a `time_budget` in seconds, the best plan found so far is
+    returned once it runs out, as soon as there is one.
+    """
+    if objective not in ['probability', 'armies']:
+        raise ValueError(f'Unknown objective "{objective}"')
+    started = time.perf_counter()
+    deadline = None if time_budget is None else started + time_budget
+    player = source.owner
+    game_map = source._map
+    territories = game_map.territories
+    if isinstance(targets, Continent):
+        targets = targets.territories
+    # The board doesn't change while planning, so work on plain lists of
+    # indexes: enemy territories with their neighbors and defenders.
+    hostile = [t.owner is not player for t in territories]
+    defenders = [t.num_armies for t in territories]
+    neighbors = [[j for j in game_map.neighbor_indexes(i) if hostile[j]]
+                 for i in range(len(territories))]
+    goal = {t.index for t in targets if t.owner is not player}
+    if num_armies is None:
+        num_armies = source.num_armies
+    attackers = num_armies - 1
+    start = np.zeros(attackers + 1)
+    start[attackers] = 1.0
+    if not goal:
+        return AttackPlan(source, [], start, 0, 0.0)
+
+    best = [None, 0.0]
+    bounds = {}
+    # (territory, territories taken) -> survival function of the best
+    # distribution seen on arrival there
+    seen_states = {}
+    path = []
+    visited = {source.index}
+    nodes = 0
+
+    def reachable(i, remaining):
+        # Can every remaining target still be reached through enemy
+        # territories that haven't been taken yet? And as a chain can't
+        # branch, a target with only one way in and none out has to come
+        # last, so there can't be two of them.
+        dead_ends = 0
+        for j in goal:
+            if j in visited:
+                continue
+            exits = 0
+            for k in neighbors[j]:
+                if k == i or k not in visited:
+                    exits += 1
+                    if exits == 2:
+                        break
+            if exits < 2:
+                dead_ends += 1
+                if dead_ends == 2:
+                    return False
+        seen = {i}
+        frontier = [i]
+        found = 0
+        while frontier:
+            for j in neighbors[frontier.pop()]:
+                if j in seen or j in visited:
+                    continue
+                seen.add(j)
+                frontier.append(j)
+                if j in goal:
+                    found += 1
+                    if found == remaining:
+                        return True
+        return False
+
+    def search(i, distribution, remaining):
+        nonlocal nodes
+        nodes += 1
+        if remaining == 0:
+            value = distribution @ _weights(attackers, objective)
+            if value > best[1]:
+                best[0] = (list(path), distribution)
+                best[1] = value
+            return
+        if deadline is not None and best[0] is not None and \
+                time.perf_counter() > deadline:
+            return
+        key = (i, frozenset(visited))
+        survival = np.cumsum(distribution[::-1])
+        previous = seen_states.get(key)
+        if previous is not None:
+            # Another order of the same battles got here with at least as
+            # many armies, whatever the threshold: nothing to gain.
+            if (survival <= previous + 1e-12).all():
+                return
+            if (previous <= survival).all():
+                seen_states[key] = survival
+        else:
+            seen_states[key] = survival
+        if not reachable(i, remaining):
+            return
+        left = [j for j in goal if j not in visited]
+        options = []
+        for j in neighbors[i]:
+            if j in visited:
+                continue
+            after = distribution @ transition_matrix(attackers, defenders[j])
+            bound = after @ _bound_weights(
+                attackers, objective,
+                [defenders[k] for k in left if k != j], bounds)
+            if bound > best[1]:
+                options.append((bound, j, after))
+        # Most promising first: good plans early make for tight bounds.
+        options.sort(key=lambda option: -option[0])
+        for bound, j, after in options:
+            if bound <= best[1]:
+                break
+            visited.add(j)
+            path.append(j)
+            search(j, after, remaining - (j in goal))
+            path.pop()
+            visited.discard(j)
+
+    if start @ _bound_weights(attackers, objective,
+                              [defenders[j] for j in goal], bounds) > 0:
+        search(source.index, start, len(goal))
+    elapsed = time.perf_counter() - started
+    if best[0] is None:
+        return None
+    found_path, distribution = best[0]
+    return AttackPlan(source, [territories[j] for j in found_path],
+                      distribution, nodes, elapsed)
+
+
+class PlannerPolicy(AggressivePolicy):
+    # Picks the continent it has the best chance of taking this turn, puts
+    # every reinforcement on the territory to attack from and follows the
+    # planned chain. Otherwise it plays like AggressivePolicy.
+    time_budget = 0.02
+    min_probability = 0.5
+
+    def __init__(self, rng):
+        super().__init__(rng)
+        self.route = []
+        self.position = None
+
+    def best_plan(self, game, player, count):
+        best = None
+        best_score = 0.0
+        for c in game.game_map.continents:
+            if player.owns_continent(c):
+                continue
+            sources = {n for t in c.territories if t.owner is not player
+                       for n in t.neighbors.iter_unordered()
+                       if n.owner is player}
+            if not sources:
+                continue
+            source = max(sources, key=lambda t: (t.num_armies, t.name))
+            plan = plan_attack(source, c, time_budget=self.time_budget,
+                               num_armies=source.num_armies + count)
+            if plan is None or plan.probability < self.min_probability:
+                continue
+            score = plan.probability * ((c.bonus or 0) + 1)
+            if score > best_score:
+                best = plan
+                best_score = score
+        return best
+
+    def place_reinforcements(self, game, player, count):
+        plan = self.best_plan(game, player, count)
+        if plan is None:
+            self.route = []
+            return super().place_reinforcements(game, player, count)
+        self.route = list(plan.path)
+        self.position = plan.source
+        return [(plan.source, count)]
+
+    def choose_attack(self, game, player):
+        while self.route and self.route[0].owner is player:
+            self.position = self.route.pop(0)
+        if self.route and self.position.owner is player and \
+                self.position.num_armies > 1 and \
+                self.route[0] in enemy_neighbors(self.position):
+            return self.position, self.route[0]
+        self.route = []
+        return super().choose_attack(game, player)
+
+    def occupy(self, game, player, source, target, min_armies):
+        if self.route and target is self.route[0]:
+            return source.num_armies - 1
+        return super().occupy(game, player, source, target, min_armies)
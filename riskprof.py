@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from importlib import import_module
+from time import perf_counter_ns
+
+
+# What `enable` instruments by default, as (module, attribute path). A
+# property is instrumented through its setter, which is where the work is
+# for Territory.owner.
+HOT_PATHS = [
+    ('riskcli', 'roll'),
+    ('riskcli', 'resolve_exchange'),
+    ('riskcli', 'Territory.owner'),
+    ('riskcli', 'Territory.num_armies'),
+    ('riskcli', 'Player.Territories.add'),
+    ('riskcli', 'Player.Territories.remove'),
+    ('riskcli', 'SortedByName.__iter__'),
+    ('riskcli', 'Map._territory_gained'),
+    ('riskcli', 'Map._territory_lost'),
+    ('riskengine', 'sample_exchange'),
+    ('riskengine', 'HeadlessGame.battle'),
+    ('riskengine', 'HeadlessGame.play_turn'),
+]
+
+
+class Stat:
+    # Call count, total time and a histogram of call times in power-of-two
+    # buckets of nanoseconds: bucket k counts calls that took less than
+    # 2 ** k ns (and at least 2 ** (k - 1)).
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total_ns = 0
+        self.histogram = [0] * 64
+
+    def record(self, elapsed_ns):
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        self.histogram[elapsed_ns.bit_length()] += 1
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of calls.
+        wanted = fraction * self.calls
+        seen = 0
+        for k, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= wanted:
+                return 2 ** k
+        return 0
+
+    def to_dict(self):
+        last = max((k for k, count in enumerate(self.histogram) if count),
+                   default=-1)
+        return {'calls': self.calls, 'total_ns': self.total_ns,
+                'p50_ns': self.percentile(0.5),
+                'p99_ns': self.percentile(0.99),
+                'histogram': self.histogram[:last + 1]}
+
+
+def _timed(fn, stat):
+    def wrapper(*args, **kwargs):
+        started = perf_counter_ns()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stat.record(perf_counter_ns() - started)
+    wrapper.__wrapped__ = fn
+    wrapper.__name__ = fn.__name__
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+# timing wrappers are left out of sampled stacks
+_WRAPPER_CODE = _timed(len, None).__code__
+
+
+class Instrumentation:
+    """Counters and timing histograms for selected functions.
+
+    Nothing is touched until `enable`, which swaps the functions for timing
+    wrappers; `disable` puts the originals back, so code that isn't being
+    measured runs exactly as it would without this module.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self._originals = []
+
+    @property
+    def enabled(self):
+        return bool(self._originals)
+
+    def instrument(self, module, path):
+        name = f'{module}.{path}'
+        owner = import_module(module)
+        *parents, attr = path.split('.')
+        for parent in parents:
+            owner = getattr(owner, parent)
+        original = owner.__dict__[attr] if isinstance(owner, type) else \
+            getattr(owner, attr)
+        stat = self.stats.setdefault(name, Stat(name))
+        if isinstance(original, property):
+            replacement = property(original.fget,
+                                   _timed(original.fset, stat),
+                                   original.fdel, original.__doc__)
+        else:
+            replacement = _timed(original, stat)
+        setattr(owner, attr, replacement)
+        self._originals.append((owner, attr, original))
+
+    def enable(self, targets=HOT_PATHS):
+        if self.enabled:
+            return
+        for module, path in targets:
+            self.instrument(module, path)
+
+    def disable(self):
+        for owner, attr, original in reversed(self._originals):
+            setattr(owner, attr, original)
+        self._originals = []
+
+    def reset(self):
+        # In place: the installed wrappers hold on to their Stat.
+        for stat in self.stats.values():
+            stat.__init__(stat.name)
+
+    def report(self):
+        return {name: stat.to_dict() for name, stat in self.stats.items()
+                if stat.calls}
+
+
+instrumentation = Instrumentation()
+
+
+def enable(targets=HOT_PATHS):
+    instrumentation.enable(targets)
+
+
+def disable():
+    instrumentation.disable()
+
+
+def print_stats(stats=None):
+    stats = instrumentation.stats if stats is None else stats
+    rows = sorted((s for s in stats.values() if s.calls),
+                  key=lambda s: -s.total_ns)
+    if not rows:
+        print('    No calls recorded.')
+        return
+    print(f'    {"function":40s} {"calls":>10s} {"total ms":>10s} '
+          f'{"mean us":>9s} {"p50 us":>8s} {"p99 us":>8s}')
+    for s in rows:
+        print(f'    {s.name:40s} {s.calls:10d} {s.total_ns / 1e6:10.2f} '
+              f'{s.total_ns / s.calls / 1e3:9.2f} '
+              f'{s.percentile(0.5) / 1e3:8.2f} '
+              f'{s.percentile(0.99) / 1e3:8.2f}')
+
+
+class Sampler:
+    # Samples the stack of one thread every `interval` seconds from a
+    # background thread and counts how often each stack was seen.
+    def __init__(self, interval=0.001, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                if code is _WRAPPER_CODE:
+                    frame = frame.f_back
+                    continue
+                names.append(f'{os.path.basename(code.co_filename)}:'
+                             f'{code.co_name}')
+                frame = frame.f_back
+            if names:
+                stack = ';'.join(reversed(names))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class JsonExporter:
+    def write(self, path, stats, stacks):
+        with open(path, 'w') as f:
+            json.dump({'functions': stats, 'samples': stacks}, f, indent=2)
+
+
+class CollapsedStackExporter:
+    # One "frame;frame;frame count" line per distinct stack, as read by
+    # flamegraph.pl, speedscope and friends.
+
+    def write(self, path, stats, stacks):
+        with open(path, 'w') as f:
+            for stack, count in sorted(stacks.items()):
+                f.write(f'{stack} {count}\n')
+
+
+EXPORTERS = {
+    'json': JsonExporter,
+    'collapsed': CollapsedStackExporter,
+}
+
+
+def profile_games(num_games, policies, seed=0, interval=0.001):
+    # Plays games in this process with instrumentation and the sampler on.
+    # Returns (stats report, sampled stacks).
+    from riskengine import play_games
+
+    instrumentation.stats = {}
+    enable()
+    try:
+        with Sampler(interval) as sampler:
+            play_games(policies, seed, 0, num_games)
+    finally:
+        disable()
+    return instrumentation.report(), sampler.stacks
+
+
+def main():
+    from riskengine import POLICIES, get_policy
+
+    parser = argparse.ArgumentParser(
+        description='Profile headless games: time the hot paths and sample '
+                    'stacks.')
+    parser.add_argument('policies', nargs='*', metavar='POLICY')
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--interval', type=float, default=0.001,
+                        help='seconds between stack samples')
+    parser.add_argument('--format', choices=sorted(EXPORTERS),
+                        default='json')
+    parser.add_argument('--output', help='report file (default: print the '
+                                         'timings only)')
+    args = parser.parse_args()
+    if not args.policies:
+        args.policies = ['aggressive', 'random']
+    for name in args.policies:
+        if name not in POLICIES:
+            parser.error(f'Unknown policy "{name}"')
+
+    started = time.perf_counter()
+    stats, stacks = profile_games(args.games,
+                                  [get_policy(p) for p in args.policies],
+                                  args.seed, args.interval)
+    print(f'{args.games} games in {time.perf_counter() - started:.2f}s, '
+          f'{sum(stacks.values())} stack samples')
+    print_stats(instrumentation.stats)
+    if args.output:
+        EXPORTERS[args.format]().write(args.output, stats, stacks)
+        print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import io
+import time
+from contextlib import redirect_stdout
+from random import Random
+
+from riskcli import UnknownCommand, print_info, run_command
+
+
+PROMPT = '> '
+# Every response ends with the prompt on a line of its own, which is how
+# clients know the command has finished.
+END_OF_RESPONSE = b'\n' + PROMPT.encode()
+MAX_LINE = 4096
+
+# Commands run on the event loop, so one huge roll or odds table would
+# stall every session. These are the largest numbers a client may pass,
+# per command and argument.
+MAX_DICE = 100
+MAX_ODDS_ARMIES = 500
+ARGUMENT_LIMITS = {
+    'roll': [MAX_DICE],
+    'attack': [MAX_DICE, MAX_DICE],
+    'odds': [MAX_ODDS_ARMIES, MAX_ODDS_ARMIES],
+}
+
+
+class Session:
+    # One connection and its game. Commands run synchronously on the event
+    # loop, so capturing their output through a redirected sys.stdout can't
+    # mix the output of two sessions.
+    def __init__(self, max_suggest_ms=200):
+        self.game = None
+        self.max_suggest_ms = max_suggest_ms
+
+    def info(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            print_info(self.game)
+        return out.getvalue()
+
+    def execute(self, line):
+        parts = line.split()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            try:
+                self._execute(parts)
+            except UnknownCommand as ex:
+                print(ex)
+            except Exception as ex:
+                print(f'Error: {ex!r}')
+            print_info(self.game)
+        return out.getvalue()
+
+    def _execute(self, parts):
+        command = parts[0]
+        if command == 'start' and any(not arg.startswith('seed=')
+                                      for arg in parts[1:]):
+            print('Event logs can\'t be written from a network session.')
+            return
+        if command == 'stats' and parts[1:] not in [[], ['show']]:
+            # Instrumentation is shared by every session, and "save" would
+            # let a client write files on the server.
+            print('Only "stats" and "stats show" are available from a '
+                  'network session.')
+            return
+        if command == 'suggest':
+            # The search blocks the loop for its whole budget, so cap it.
+            budget = int(parts[1]) if len(parts) > 1 else 200
+            parts = ['suggest', str(min(budget, self.max_suggest_ms))]
+        for arg, limit in zip(parts[1:], ARGUMENT_LIMITS.get(command, [])):
+            # Parsed the way the command will parse it, so "+N" or "1_000"
+            # can't slip past; anything int() rejects is left for the
+            # command to reject.
+            try:
+                value = int(arg)
+            except ValueError:
+                continue
+            if value > limit:
+                print(f'"{command}" takes numbers up to {limit} here.')
+                return
+        self.game = run_command(parts, self.game)
+
+
+class Server:
+    """Line-based TCP front end speaking the REPL's command language.
+
+    Each connection gets its own Session, and so its own Game. Sessions are
+    coroutines on one event loop, so idle connections only cost their
+    buffers and whatever game they hold.
+    """
+
+    def __init__(self, max_suggest_ms=200):
+        self.max_suggest_ms = max_suggest_ms
+        self.sessions = 0
+        self.commands = 0
+
+    async def handle(self, reader, writer):
+        session = Session(self.max_suggest_ms)
+        self.sessions += 1
+        try:
+            writer.write((session.info() + PROMPT).encode())
+            while True:
+                try:
+                    data = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    break
+                if not data:
+                    break
+                line = data.decode('utf-8', 'replace').strip()
+                if line in ['exit', 'quit']:
+                    break
+                if line:
+                    response = session.execute(line)
+                    self.commands += 1
+                else:
+                    response = session.info()
+                writer.write((response + PROMPT).encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # The server is shutting down; say so before the connection is
+            # closed below.
+            writer.write(b'\nServer shutting down.\n')
+            raise
+        finally:
+            self.sessions -= 1
+            game = session.game
+            if game is not None and game.log is not None:
+                game.log.close()
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=0):
+        return await asyncio.start_server(self.handle, host, port,
+                                          limit=MAX_LINE)
+
+
+async def serve(host, port, max_suggest_ms):
+    server = await Server(max_suggest_ms).start(host, port)
+    for sock in server.sockets:
+        print(f'Serving on {sock.getsockname()}')
+    async with server:
+        await server.serve_forever()
+
+
+# Commands for the load test, weighted towards the cheap ones a player
+# sends most often.
+LOAD_MIX = ['roll 3', 'attack', 'attack 2 1', 'player', 'player 2',
+            'view Alaska', 'view Asia', 'odds 5 3']
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[k]
+
+
+async def read_response(reader):
+    return await reader.readuntil(END_OF_RESPONSE)
+
+
+async def load_client(host, port, num_commands, rng, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        await read_response(reader)
+        commands = ['start'] + [rng.choice(LOAD_MIX)
+                                for _ in range(num_commands - 1)]
+        for command in commands:
+            started = time.perf_counter()
+            writer.write(command.encode() + b'\n')
+            await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+        writer.write(b'quit\n')
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def load_test(host, port, clients=100, commands=100, idle=0, seed=0):
+    """Run `clients` concurrent sessions of `commands` commands each
+    against a server, with `idle` more connections held open and silent.
+
+    Returns (sorted latencies in seconds, elapsed seconds).
+    """
+    rng = Random(seed)
+    idle_connections = []
+    for _ in range(idle):
+        reader, writer = await asyncio.open_connection(host, port)
+        await read_response(reader)
+        idle_connections.append(writer)
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        load_client(host, port, commands, Random(rng.getrandbits(64)),
+                    latencies)
+        for _ in range(clients)])
+    elapsed = time.perf_counter() - started
+    for writer in idle_connections:
+        writer.close()
+    return sorted(latencies), elapsed
+
+
+def print_load_test(latencies, elapsed, clients, idle):
+    print(f'{len(latencies)} commands from {clients} clients '
+          f'({idle} idle connections) in {elapsed:.2f}s, '
+          f'{len(latencies) / elapsed:.0f} commands/s')
+    print(f'  p50 {percentile(latencies, 0.50) * 1e3:8.3f} ms')
+    print(f'  p99 {percentile(latencies, 0.99) * 1e3:8.3f} ms')
+    print(f'  max {percentile(latencies, 1.0) * 1e3:8.3f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve many REPL sessions over TCP, or load test a '
+                    'server.')
+    sub = parser.add_subparsers(dest='command')
+    serve_parser = sub.add_parser('serve', help='run the server')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=7777)
+    serve_parser.add_argument('--max-suggest-ms', type=int, default=200)
+    load = sub.add_parser('loadtest', help='load test a running server')
+    load.add_argument('--host', default='127.0.0.1')
+    load.add_argument('--port', type=int, default=7777)
+    load.add_argument('--clients', type=int, default=100)
+    load.add_argument('--commands', type=int, default=100,
+                      help='commands per client')
+    load.add_argument('--idle', type=int, default=0,
+                      help='extra connections that stay open and silent')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args.host, args.port, args.max_suggest_ms))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'loadtest':
+        latencies, elapsed = asyncio.run(load_test(
+            args.host, args.port, args.clients, args.commands, args.idle))
+        print_load_test(latencies, elapsed, args.clients, args.idle)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
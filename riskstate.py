@@ -0,0 +1,82 @@
+from array import array
+
+from riskcli import Game, Player
+
+
+NO_OWNER = -1
+
+
+class GameState:
+    """Compact, index-based copy of the mutable part of a Game.
+
+    Territories are identified by their index in `game_map.territories` and
+    players by their index in the game's player list. Owners and army counts
+    are flat arrays, so copying a state is a couple of buffer copies; the map
+    topology is shared between copies and never modified.
+    """
+
+    def __init__(self, game_map, players, owners=None, armies=None,
+                 next_player=0):
+        self.game_map = game_map
+        # (name, color) pairs, only needed to turn the state back into a Game
+        self.players = tuple(players)
+        num_territories = len(game_map.territories)
+        if owners is None:
+            owners = array('h', [NO_OWNER]) * num_territories
+        if armies is None:
+            armies = array('i', [0]) * num_territories
+        self.owners = owners
+        self.armies = armies
+        self.next_player = next_player
+
+    @property
+    def num_players(self):
+        return len(self.players)
+
+    @staticmethod
+    def from_game(game):
+        p_index = {p: i for i, p in enumerate(game.players)}
+        territories = game.game_map.territories
+        owners = array('h', (NO_OWNER if t.owner is None else p_index[t.owner]
+                             for t in territories))
+        armies = array('i', (t.num_armies for t in territories))
+        return GameState(game.game_map,
+                         [(p.name, p.color) for p in game.players],
+                         owners, armies, p_index[game.next_player])
+
+    def apply_to(self, game):
+        # Write owners and armies back into the objects of `game`, which must
+        # be played on the same map (or a copy of it) with the same players.
+        for t, owner, num_armies in zip(game.game_map.territories,
+                                        self.owners, self.armies):
+            t.owner = None if owner == NO_OWNER else game.players[owner]
+            t.num_armies = num_armies
+        game.next_player = game.players[self.next_player]
+
+    def to_game(self):
+        game = Game(players=[Player(name, color)
+                             for name, color in self.players],
+                    game_map=self.game_map.copy())
+        self.apply_to(game)
+        return game
+
+    def copy(self):
+        return GameState(self.game_map, self.players, self.owners[:],
+                         self.armies[:], self.next_player)
+
+    def neighbors(self, index):
+        return self.game_map.neighbor_indexes(index)
+
+    def territories_of(self, player):
+        return [i for i, owner in enumerate(self.owners) if owner == player]
+
+    def count_territories(self, player):
+        return self.owners.count(player)
+
+    def count_armies(self, player):
+        return sum(n for owner, n in zip(self.owners, self.armies)
+                   if owner == player)
+
+    def is_border(self, index):
+        owner = self.owners[index]
+        return any(self.owners[n] != owner for n in self.neighbors(index))
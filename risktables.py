@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+from itertools import product
+
+from riskodds import MAX_ATTACK_DICE, MAX_DEFEND_DICE
+
+
+# An exchange is decided by one uniform draw below ROLLS, standing for all
+# five dice at once: its base-6 digits, most significant first, are the
+# attacker's three dice and then the defender's two. With fewer dice the
+# first ones of each side count and the others are ignored, which leaves
+# every outcome exactly as likely as with real dice.
+DICE = MAX_ATTACK_DICE + MAX_DEFEND_DICE
+ROLLS = 6 ** DICE
+ROLL_BITS = ROLLS.bit_length()
+
+# The tables: the byte at table_offset(a, d) + roll is the result of the
+# exchange with `a` attacking and `d` defending dice, coded as
+# attacker_loses << 2 | defender_loses.
+SIZE = (MAX_ATTACK_DICE + 1) * (MAX_DEFEND_DICE + 1) * ROLLS
+# The cache file is MAGIC, then the SHA-256 of the parameters and the
+# tables, then the tables.
+MAGIC = b'RISKXCH2'
+HEADER_SIZE = len(MAGIC) + hashlib.sha256().digest_size
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '__pycache__', 'risktables.bin')
+
+
+def table_offset(attack_dice, defend_dice):
+    return (attack_dice * (MAX_DEFEND_DICE + 1) + defend_dice) * ROLLS
+
+
+def exchange_dice(roll, attack_dice, defend_dice):
+    # The dice a roll stands for, sorted highest first like `roll` does.
+    dice = []
+    for _ in range(DICE):
+        roll, face = divmod(roll, 6)
+        dice.append(face + 1)
+    dice.reverse()
+    return (sorted(dice[:attack_dice], reverse=True),
+            sorted(dice[MAX_ATTACK_DICE:MAX_ATTACK_DICE + defend_dice],
+                   reverse=True))
+
+
+def build_tables():
+    tables = bytearray(SIZE)
+    for roll, dice in enumerate(product(range(1, 7), repeat=DICE)):
+        for attack_dice in range(1, MAX_ATTACK_DICE + 1):
+            attacker = sorted(dice[:attack_dice], reverse=True)
+            for defend_dice in range(1, MAX_DEFEND_DICE + 1):
+                defender = sorted(
+                    dice[MAX_ATTACK_DICE:MAX_ATTACK_DICE + defend_dice],
+                    reverse=True)
+                attacker_loses = 0
+                defender_loses = 0
+                # ties go to the defender, as in resolve_exchange
+                for a, d in zip(attacker, defender):
+                    if d >= a:
+                        attacker_loses += 1
+                    else:
+                        defender_loses += 1
+                tables[table_offset(attack_dice, defend_dice) + roll] = \
+                    attacker_loses << 2 | defender_loses
+    return bytes(tables)
+
+
+def checksum(tables):
+    digest = hashlib.sha256(
+        f'{MAX_ATTACK_DICE},{MAX_DEFEND_DICE},{ROLLS}'.encode())
+    digest.update(tables)
+    return digest.digest()
+
+
+def load_tables(path=CACHE_PATH):
+    """The exchange tables, read from `path` if it holds them, otherwise
+    built and written there for next time. A file that is cut short,
+    corrupted or made for other parameters fails its checksum and is
+    replaced."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        tables = data[HEADER_SIZE:]
+        if data[:len(MAGIC)] == MAGIC and len(tables) == SIZE and \
+                data[len(MAGIC):HEADER_SIZE] == checksum(tables):
+            return tables
+    except OSError:
+        pass
+    tables = build_tables()
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC + checksum(tables) + tables)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return tables
+
+
+TABLES = load_tables()
+
+
+def sample_exchange(attack_dice, defend_dice, rng):
+    """Fight one exchange with a single draw from `rng` (a random.Random).
+    Returns (attacker_loses, defender_loses, roll); see exchange_dice for
+    the dice that were thrown."""
+    getrandbits = rng.getrandbits
+    roll = getrandbits(ROLL_BITS)
+    while roll >= ROLLS:
+        roll = getrandbits(ROLL_BITS)
+    code = TABLES[table_offset(attack_dice, defend_dice) + roll]
+    return code >> 2, code & 3, roll
+
+
+if __name__ == '__main__':
+    # Rebuild the cache, e.g. as a step of installing.
+    if os.path.exists(CACHE_PATH):
+        os.remove(CACHE_PATH)
+    load_tables()
+    print(f'Wrote {CACHE_PATH}')
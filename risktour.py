@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import combinations
+from math import log, log10, sqrt
+
+from riskengine import POLICIES, get_policy, play_games
+
+
+def score_from_elo(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * log10(1 / score - 1)
+
+
+class Matchup:
+    # Results of policy `a` against policy `b`, from a's side.
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        # None while undecided, then a, b, 'equal' or 'undecided' if the
+        # game limit was reached first
+        self.decision = None
+
+    @property
+    def games(self):
+        return self.wins + self.losses + self.draws
+
+    def add(self, wins, losses, draws):
+        self.wins += wins
+        self.losses += losses
+        self.draws += draws
+
+    def _mean_and_variance(self):
+        # Per-game score of `a`, with half a win and half a loss added so
+        # that a clean sweep of a few games doesn't look like a certainty.
+        wins = self.wins + 0.5
+        losses = self.losses + 0.5
+        n = wins + losses + self.draws
+        mean = (wins + self.draws / 2) / n
+        variance = (wins * (1 - mean) ** 2 + self.draws * (0.5 - mean) ** 2
+                    + losses * mean ** 2) / n
+        return mean, variance
+
+    @property
+    def score(self):
+        return (self.wins + self.draws / 2) / self.games if self.games \
+            else 0.5
+
+    @property
+    def elo(self):
+        return elo_from_score(self._mean_and_variance()[0])
+
+    def elo_interval(self, z=1.96):
+        mean, variance = self._mean_and_variance()
+        error = z * sqrt(variance / max(self.games, 1))
+        return elo_from_score(mean - error), elo_from_score(mean + error)
+
+    def llr(self, elo0, elo1):
+        """Log-likelihood ratio of "a is elo1 stronger than b" against "a is
+        elo0 stronger", in the normal approximation to the trinomial
+        distribution of game results."""
+        mean, variance = self._mean_and_variance()
+        s0 = score_from_elo(elo0)
+        s1 = score_from_elo(elo1)
+        return self.games * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+
+class SPRT:
+    """Sequential probability ratio test of a matchup, both ways: is `a`
+    `elo` stronger than `b`, or `b` than `a`? Each side is a one-sided test
+    with error rates `alpha` and `beta`. When both sides accept "no
+    stronger", the policies are called equal.
+
+    Games stop as soon as a side is decided, which takes few games for
+    mismatched policies and many only for close ones.
+    """
+
+    def __init__(self, elo=20, alpha=0.05, beta=0.05):
+        self.elo = elo
+        self.lower = log(beta / (1 - alpha))
+        self.upper = log((1 - beta) / alpha)
+
+    def decide(self, matchup):
+        stronger = matchup.llr(0, self.elo)
+        weaker = matchup.llr(0, -self.elo)
+        if stronger >= self.upper:
+            return matchup.a
+        if weaker >= self.upper:
+            return matchup.b
+        if stronger <= self.lower and weaker <= self.lower:
+            return 'equal'
+        return None
+
+
+def play_batch(a, b, seed, start, count, max_turns=500):
+    # `count` games with a in the first seat and the same `count` games
+    # (same seeds) with b there, so the first player's advantage cancels
+    # out. Returns a's (wins, losses, draws).
+    first = play_games([a, b], seed, start, count, max_turns)
+    second = play_games([b, a], seed, start, count, max_turns)
+    return (first.wins[0] + second.wins[1],
+            first.wins[1] + second.wins[0],
+            first.draws + second.draws)
+
+
+class Tournament:
+    def __init__(self, names, matchups, elapsed):
+        self.names = names
+        self.matchups = matchups
+        self.elapsed = elapsed
+
+    @property
+    def games(self):
+        return sum(m.games for m in self.matchups)
+
+    def ratings(self, iterations=200):
+        """Elo rating of every policy, fitted to all the results with the
+        Bradley-Terry model and averaging 0. Each pairing gets one draw
+        added, so a policy that never scored still gets a finite rating."""
+        index = {name: i for i, name in enumerate(self.names)}
+        k = len(self.names)
+        scores = [0.0] * k
+        games = [[0] * k for _ in range(k)]
+        for m in self.matchups:
+            i, j = index[m.a], index[m.b]
+            games[i][j] += m.games + 1
+            games[j][i] += m.games + 1
+            scores[i] += m.wins + (m.draws + 1) / 2
+            scores[j] += m.losses + (m.draws + 1) / 2
+        # Minorization-maximization (Hunter 2004) on gamma = 10 ** (elo/400)
+        gamma = [1.0] * k
+        for _ in range(iterations):
+            gamma = [scores[i] / sum(games[i][j] / (gamma[i] + gamma[j])
+                                     for j in range(k) if games[i][j])
+                     for i in range(k)]
+            mean = sum(log10(g) for g in gamma) / k
+            gamma = [g / 10 ** mean for g in gamma]
+        return {name: 400 * log10(g) for name, g in zip(self.names, gamma)}
+
+
+def run_tournament(names, seed=0, workers=None, batch_size=10,
+                   max_games=10000, sprt=None, max_turns=500,
+                   callback=None):
+    """Play every pair of the policies named in `names` against each other
+    until the SPRT decides the pairing or it has played `max_games`.
+
+    Games are played in batches of 2 * `batch_size` on a process pool; pass
+    workers=1 to play in this process instead. Every pairing takes its
+    batches in order, whichever worker finishes first, so the results only
+    depend on the seed. `callback(matchup)` is called after each batch.
+    """
+    started = time.perf_counter()
+    sprt = SPRT() if sprt is None else sprt
+    matchups = [Matchup(a, b) for a, b in combinations(names, 2)]
+    max_batches = -(-max_games // (2 * batch_size))
+
+    def args(m, k):
+        return (get_policy(m.a), get_policy(m.b), f'{seed}:{m.a}:{m.b}',
+                k * batch_size, batch_size, max_turns)
+
+    def apply(m, counts):
+        m.add(*counts)
+        m.decision = sprt.decide(m)
+        if m.decision is None and m.games >= max_batches * 2 * batch_size:
+            m.decision = 'undecided'
+        if callback is not None:
+            callback(m)
+
+    if workers == 1:
+        for m in matchups:
+            k = 0
+            while m.decision is None:
+                apply(m, play_batch(*args(m, k)))
+                k += 1
+    else:
+        workers = workers or os.cpu_count()
+        submitted = {m: 0 for m in matchups}
+        arrived = {m: {} for m in matchups}
+        applied = {m: 0 for m in matchups}
+        running = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            def fill():
+                # Keep every worker busy, spreading the batches over the
+                # pairings still being played.
+                active = [m for m in matchups if m.decision is None and
+                          submitted[m] < max_batches]
+                while active and len(running) < 2 * workers:
+                    m = min(active, key=lambda m: submitted[m])
+                    future = executor.submit(play_batch,
+                                             *args(m, submitted[m]))
+                    running[future] = (m, submitted[m])
+                    submitted[m] += 1
+                    if submitted[m] == max_batches:
+                        active.remove(m)
+
+            fill()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    m, k = running.pop(future)
+                    if m.decision is not None:
+                        continue
+                    arrived[m][k] = future.result()
+                    while m.decision is None and applied[m] in arrived[m]:
+                        apply(m, arrived[m].pop(applied[m]))
+                        applied[m] += 1
+                    if m.decision is not None:
+                        for other, (owner, _) in list(running.items()):
+                            if owner is m and other.cancel():
+                                del running[other]
+                fill()
+    return Tournament(list(names), matchups, time.perf_counter() - started)
+
+
+def print_matchup(m):
+    low, high = m.elo_interval()
+    if m.decision in [m.a, m.b]:
+        verdict = f'{m.decision} is stronger'
+    elif m.decision == 'equal':
+        verdict = 'no clear difference'
+    else:
+        verdict = 'undecided'
+    print(f'  {m.a} vs {m.b}: +{m.wins} -{m.losses} ={m.draws}, '
+          f'score {m.score:.1%}, Elo {m.elo:+.0f} [{low:+.0f}, {high:+.0f}]'
+          f': {verdict} after {m.games} games')
+
+
+def print_tournament(tournament):
+    print(f'{tournament.games} games in {tournament.elapsed:.2f}s')
+    for m in tournament.matchups:
+        print_matchup(m)
+    print('  ratings:')
+    ratings = tournament.ratings()
+    for name in sorted(ratings, key=lambda name: -ratings[name]):
+        print(f'    {name:12s} {ratings[name]:+7.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Round-robin tournament between bot policies, each '
+                    'pairing played until a sequential test decides it.')
+    parser.add_argument('policies', nargs='+', metavar='POLICY',
+                        help=f'at least two, from {", ".join(POLICIES)}')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--max-games', type=int, default=10000,
+                        help='per pairing')
+    parser.add_argument('--max-turns', type=int, default=500)
+    parser.add_argument('--elo', type=float, default=20,
+                        help='smallest difference the test has to detect')
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    args = parser.parse_args()
+    if len(set(args.policies)) < 2:
+        parser.error('At least two different policies are needed')
+    for name in args.policies:
+        if name not in POLICIES:
+            parser.error(f'Unknown policy "{name}"')
+
+    def report(m):
+        if m.decision is not None:
+            print_matchup(m)
+
+    tournament = run_tournament(
+        list(dict.fromkeys(args.policies)), seed=args.seed,
+        workers=args.workers, batch_size=args.batch_size,
+        max_games=args.max_games, sprt=SPRT(args.elo, args.alpha, args.beta),
+        max_turns=args.max_turns, callback=report)
+    print_tournament(tournament)
+
+
+if __name__ == '__main__':
+    main()
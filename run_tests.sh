@@ -1,7 +1,7 @@
 #!/bin/bash
 
-SOURCES=riskcli
-ALL_SOURCES="$SOURCES tools tests"
+SOURCES=riskcli,riskodds,risksim,riskstate,riskengine,riskmaps,riskmcts,risklog,riskexport,riskserver,riskplan,riskplace,riskprof,risktour,riskdice,risktables
+ALL_SOURCES="risk*.py tools tests benchmarks"
 
 coverage run --source=$SOURCES --branch -m unittest discover -s tests -p '*.py' -t . "$@" && \
     coverage html && \
@@ -0,0 +1,107 @@
+from random import Random
+from unittest import TestCase
+
+from riskcli import (Continent, Player, Territory, gen_default_map,
+                     AUSTRALIA, E_AUST, INDONESIA, NEW_GUINEA, W_AUST)
+
+
+def brute_force(player, continents):
+    armies = sum(t.num_armies for t in player.territories)
+    counts = {c: sum(1 for t in c.territories if t.owner is player)
+              for c in continents}
+    return armies, counts
+
+
+class PlayerAggregatesTest(TestCase):
+    def test_count_all_armies_follows_owner_and_army_changes(self):
+        # given
+        p = Player('p', 'red')
+        t1 = Territory('t1')
+        t2 = Territory('t2')
+        t1.num_armies = 3
+        # when
+        t1.owner = p
+        p.territories.add(t2)
+        t2.num_armies = 4
+        # then
+        self.assertEqual(7, p.count_all_armies())
+        # when
+        t1.owner = None
+        # then
+        self.assertEqual(4, p.count_all_armies())
+
+    def test_owns_continent_and_reinforcements(self):
+        # given
+        game_map = gen_default_map()
+        p = Player('p', 'red')
+        australia = game_map.c_by_name[AUSTRALIA]
+        # when
+        for name in [INDONESIA, NEW_GUINEA, W_AUST]:
+            game_map.t_by_name[name].owner = p
+        # then
+        self.assertFalse(p.owns_continent(australia))
+        self.assertEqual(3, p.count_territories_in(australia))
+        self.assertEqual(3, p.reinforcements())
+        # when
+        game_map.t_by_name[E_AUST].owner = p
+        # then
+        self.assertTrue(p.owns_continent(australia))
+        self.assertEqual([australia], p.owned_continents())
+        self.assertEqual(3 + australia.bonus, p.reinforcements())
+
+    def test_reinforcements_grow_with_territory_count(self):
+        # given
+        p = Player('p', 'red')
+        # when
+        for i in range(14):
+            Territory(f't{i}').owner = p
+        # then
+        self.assertEqual(4, p.reinforcements())
+
+    def test_moving_owned_territory_between_continents(self):
+        # given
+        p = Player('p', 'red')
+        c1 = Continent('c1', 2)
+        c2 = Continent('c2', 3)
+        t = Territory('t')
+        t.owner = p
+        t.continent = c1
+        # precondition
+        self.assertTrue(p.owns_continent(c1))
+        # when
+        c2.territories.add(t)
+        # then
+        self.assertFalse(p.owns_continent(c1))
+        self.assertEqual(0, p.count_territories_in(c1))
+        self.assertTrue(p.owns_continent(c2))
+
+    def test_random_changes_agree_with_recount(self):
+        # given
+        rng = Random(1234)
+        game_map = gen_default_map()
+        players = [Player(f'p{i}', 'red') for i in range(3)]
+        territories = game_map.territories
+        continents = game_map.continents + [Continent('extra', 1)]
+        for step in range(3000):
+            # when
+            t = rng.choice(territories)
+            action = rng.randrange(5)
+            if action == 0:
+                t.owner = rng.choice(players + [None])
+            elif action == 1:
+                rng.choice(players).territories.add(t)
+            elif action == 2:
+                t.num_armies = rng.randrange(20)
+            elif action == 3 and t.owner is not None:
+                t.owner.territories.remove(t)
+            else:
+                t.continent = rng.choice(continents)
+            # then
+            for p in players:
+                armies, counts = brute_force(p, continents)
+                self.assertEqual(armies, p.count_all_armies())
+                for c in continents:
+                    self.assertEqual(counts[c], p.count_territories_in(c))
+                    self.assertEqual(
+                        counts[c] == len(c.territories) > 0,
+                        p.owns_continent(c))
@@ -0,0 +1,98 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+from riskcli import main, run_script
+
+
+def run(script, **kwargs):
+    out = io.StringIO()
+    game, commands, errors = run_script(script.splitlines(), out=out,
+                                        **kwargs)
+    return game, commands, errors, out.getvalue()
+
+
+SCRIPT = '''# a game
+start seed=7
+roll 3
+attack 3 2
+
+odds 3 2
+view Alaska
+'''
+
+
+class RunScriptTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_same_seed_same_output(self):
+        # when
+        game, commands, errors, output = run(SCRIPT)
+        # then
+        self.assertEqual(5, commands)
+        self.assertEqual(0, errors)
+        self.assertEqual(output, run(SCRIPT)[3])
+        self.assertNotEqual(output, run(SCRIPT.replace('=7', '=8'))[3])
+        self.assertIn('attacker wins: 65.60%', output)
+        self.assertIn('Owner: ' + game.game_map.t_by_name['Alaska'].owner.name,
+                      output)
+
+    def test_json_results(self):
+        # when
+        _, _, errors, output = run(SCRIPT + 'roll x\nbogus\n',
+                                   json_output=True)
+        results = [json.loads(line) for line in output.splitlines()]
+        # then
+        self.assertEqual(2, errors)
+        self.assertEqual([2, 3, 4, 6, 7, 8, 9], [r['line'] for r in results])
+        self.assertEqual('roll 3', results[1]['command'])
+        self.assertRegex(results[1]['output'], r'^    \[\d, \d, \d\]\n$')
+        self.assertNotIn('error', results[1])
+        self.assertIn('ValueError', results[5]['error'])
+        self.assertIn('UnknownCommand', results[6]['error'])
+        self.assertIn('Unknown: "bogus"', results[6]['error'])
+
+    def test_errors_and_exit(self):
+        # when
+        _, commands, errors, output = run('roll\nplayer\nexit\nroll\n')
+        # then
+        self.assertEqual(2, commands)
+        self.assertEqual(1, errors)
+        self.assertIn('Error on line 2: AttributeError', output)
+        # expect
+        self.assertEqual(1, run('player\nroll\n', stop_on_error=True)[1])
+
+    def test_large_output_is_flushed_in_order(self):
+        # when
+        _, _, _, output = run('start seed=1\n' + 'player 1\n' * 2000)
+        # then
+        chunks = output.split('    player1\n')
+        self.assertEqual(2001, len(chunks))
+        self.assertEqual(1, len(set(chunks[1:])))
+
+    def test_command_line(self):
+        # given
+        path = os.path.join(self.tmp_dir, 'script.txt')
+        with open(path, 'w') as f:
+            f.write(SCRIPT)
+        out = io.StringIO()
+        # when
+        with redirect_stdout(out):
+            main([path, '--json'])
+        # then
+        self.assertEqual(5, len(out.getvalue().splitlines()))
+        for bad_line in ['roll x\n', 'bogus\n']:
+            with open(path, 'w') as f:
+                f.write(SCRIPT + bad_line)
+            with redirect_stdout(out), \
+                    self.assertRaises(SystemExit) as raised:
+                main([path])
+            self.assertEqual(1, raised.exception.code)
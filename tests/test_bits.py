@@ -0,0 +1,91 @@
+from random import Random
+from unittest import TestCase
+
+from riskcli import Player, gen_default_map
+from riskmaps import generate_map
+
+
+def by_index(territories):
+    return sorted(territories, key=lambda t: t.index)
+
+
+class BitboardsTest(TestCase):
+    def setUp(self):
+        self.players = [Player('p1', 'red'), Player('p2', 'black'),
+                        Player('p3', 'blue')]
+
+    def check(self, game_map):
+        bits = game_map.bitboards
+        for p in self.players:
+            owned = set(p.territories)
+            self.assertEqual(by_index(owned),
+                             bits.to_territories(bits.owned(p)))
+            self.assertEqual(
+                by_index(t for t in owned
+                         if any(n.owner is not p for n in t.neighbors)),
+                bits.to_territories(bits.border(p)))
+            self.assertEqual(
+                by_index({n for t in owned for n in t.neighbors
+                          if n.owner is not p}),
+                bits.to_territories(bits.frontier(p)))
+            for c in game_map.continents:
+                self.assertEqual(p.owns_continent(c),
+                                 bits.owns_continent(p, c))
+
+    def test_kept_in_sync_with_owners(self):
+        # given
+        game_map = generate_map(300, seed=2).build()
+        rng = Random(0)
+        for t in game_map.territories:
+            t.owner = rng.choice(self.players)
+        game_map.bitboards
+        # when
+        for _ in range(200):
+            t = rng.choice(game_map.territories)
+            if rng.random() < 0.5:
+                t.owner = rng.choice(self.players + [None])
+            else:
+                rng.choice(self.players).territories.add(t)
+            # then
+            self.check(game_map)
+
+    def test_undone_with_hypotheticals(self):
+        # given
+        game_map = gen_default_map()
+        for i, t in enumerate(game_map.territories):
+            t.owner = self.players[i % 3]
+        # when
+        with game_map.hypothetical():
+            for t in game_map.territories[:20]:
+                t.owner = self.players[0]
+            self.check(game_map)
+        # then
+        self.check(game_map)
+
+    def test_a_whole_continent(self):
+        # given
+        game_map = gen_default_map()
+        for t in game_map.territories:
+            t.owner = self.players[1]
+        asia = game_map.c_by_name['Asia']
+        for t in asia.territories:
+            t.owner = self.players[0]
+        # then
+        self.check(game_map)
+        self.assertTrue(game_map.bitboards.owns_continent(self.players[0],
+                                                          asia))
+
+    def test_expand(self):
+        # given
+        game_map = gen_default_map()
+        bits = game_map.bitboards
+        t = game_map.t_by_name
+        start = 1 << t['Alaska'].index
+        # expect
+        self.assertEqual(
+            {'Alaska', 'Kamchatka', 'Northwest Territory', 'Alberta'},
+            {u.name for u in bits.to_territories(bits.expand(start))})
+        everything = bits.expand(start, steps=len(game_map.territories))
+        self.assertEqual(bits.all, everything)
+        australia = bits.continents[game_map.c_by_name['Australia']]
+        self.assertEqual(start, bits.expand(start, within=australia))
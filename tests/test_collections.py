@@ -218,3 +218,74 @@ class ContinentTerritoriesTest(TestCase):
         self.assertIs(c2, t.continent)
         self.assertEqual(set(), set(c1.territories))
         self.assertEqual({t}, set(c2.territories))
+
+
+class SortedByNameTest(TestCase):
+    def test_iteration_is_in_name_order_after_adds_and_removes(self):
+        # given
+        p = Player('p', 'red')
+        ts = [Territory(name) for name in 'dbeac']
+        for t in ts[:3]:
+            p.territories.add(t)
+        # precondition
+        self.assertEqual(['b', 'd', 'e'], [t.name for t in p.territories])
+        # when
+        p.territories.add(ts[3])
+        p.territories.add(ts[4])
+        p.territories.remove(ts[0])
+        # then
+        self.assertEqual(['a', 'b', 'c', 'e'],
+                         [t.name for t in p.territories])
+
+    def test_territories_with_the_same_name_are_kept_apart(self):
+        # given
+        c = Continent('c')
+        t1 = Territory('t')
+        t2 = Territory('t')
+        c.territories.add(t1)
+        c.territories.add(t2)
+        list(c.territories)
+        # when
+        c.territories.remove(t2)
+        # then
+        self.assertEqual([t1], list(c.territories))
+
+    def test_can_change_owner_while_iterating(self):
+        # given
+        p1 = Player('p1', 'red')
+        p2 = Player('p2', 'blue')
+        for name in 'abc':
+            Territory(name).owner = p1
+        # when
+        for t in p1.territories:
+            t.owner = p2
+        # then
+        self.assertEqual(0, len(p1.territories))
+        self.assertEqual(['a', 'b', 'c'], [t.name for t in p2.territories])
+
+    def test_iterators_see_the_set_as_it_was_when_they_started(self):
+        # given
+        p = Player('p', 'red')
+        ts = [Territory(name) for name in 'abcd']
+        for t in ts[:3]:
+            p.territories.add(t)
+        first = iter(p.territories)
+        # when
+        p.territories.remove(ts[1])
+        p.territories.add(ts[3])
+        second = iter(p.territories)
+        p.territories.remove(ts[0])
+        # then
+        self.assertEqual(['a', 'b', 'c'], [t.name for t in first])
+        self.assertEqual(['a', 'c', 'd'], [t.name for t in second])
+        self.assertEqual(['c', 'd'], [t.name for t in p.territories])
+
+    def test_iter_unordered_yields_every_member(self):
+        # given
+        t = Territory('t')
+        neighbors = [Territory(name) for name in 'zyx']
+        for n in neighbors:
+            t.neighbors.add(n)
+        # expect
+        self.assertEqual(set(neighbors), set(t.neighbors.iter_unordered()))
+        self.assertEqual(['x', 'y', 'z'], [n.name for n in t.neighbors])
@@ -0,0 +1,107 @@
+import io
+import os
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+from riskcli import cmd_attack, cmd_roll, cmd_start, roll
+from riskdice import Dice, RecordingDice, ReplayDice, ReplayError
+
+
+def quietly(fn, *args):
+    out = io.StringIO()
+    with redirect_stdout(out):
+        result = fn(*args)
+    return result, out.getvalue()
+
+
+class DiceTest(TestCase):
+    def test_same_seed_same_rolls(self):
+        # given
+        first = Dice(7)
+        second = Dice(7)
+        # expect
+        for n in [1, 2, 3] * 3000 + [5000]:
+            self.assertEqual(first.roll(n), second.roll(n))
+        self.assertNotEqual([Dice(7).roll(3) for _ in range(10)],
+                            [Dice(8).roll(3) for _ in range(10)])
+
+    def test_rolls_are_fair_and_sorted(self):
+        # given
+        dice = Dice(0)
+        counts = Counter()
+        # when
+        for _ in range(20000):
+            result = dice.roll(3)
+            self.assertEqual(sorted(result, reverse=True), result)
+            counts.update(result)
+        # then
+        self.assertEqual(set(range(1, 7)), set(counts))
+        for face in range(1, 7):
+            self.assertAlmostEqual(1 / 6, counts[face] / 60000, delta=0.01)
+
+    def test_spawned_sources_are_reproducible_and_distinct(self):
+        # given
+        dice = Dice(3)
+        # when
+        a, b = dice.split(2)
+        # then
+        self.assertEqual(Dice(3).spawn(0).roll(20), a.roll(20))
+        self.assertNotEqual(Dice(3).spawn(0).roll(20), b.roll(20))
+
+    def test_roll_uses_the_given_dice(self):
+        # expect
+        self.assertEqual(Dice(5).roll(3), roll(3, Dice(5)))
+        self.assertEqual(3, len(roll(3)))
+
+    def test_negative_counts_are_refused(self):
+        # given
+        dice = Dice(2)
+        expected = Dice(2)
+        self.assertEqual(expected.roll(4), dice.roll(4))
+        # expect
+        with self.assertRaises(ValueError):
+            dice.roll(-2)
+        with self.assertRaises(ValueError):
+            cmd_roll(-2)
+        # nothing already handed out is dealt again
+        self.assertEqual(expected.roll(4), dice.roll(4))
+
+
+class RecordReplayTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_replay_reproduces_a_session(self):
+        # given
+        recording = RecordingDice(Dice())
+        game, _ = quietly(cmd_start, None, recording)
+        _, attacks = quietly(lambda: [cmd_attack(3, 2, game)
+                                      for _ in range(5)])
+        path = os.path.join(self.dir, 'dice.jsonl')
+        recording.save(path)
+        # when
+        replayed, _ = quietly(cmd_start, None, ReplayDice.load(path))
+        _, replayed_attacks = quietly(lambda: [cmd_attack(3, 2, replayed)
+                                               for _ in range(5)])
+        # then
+        self.assertEqual([t.owner.name for t in game.game_map.territories],
+                         [t.owner.name
+                          for t in replayed.game_map.territories])
+        self.assertEqual(attacks, replayed_attacks)
+        with self.assertRaises(ReplayError):
+            replayed.dice.roll(1)
+
+    def test_replay_rejects_different_requests(self):
+        # given
+        recording = RecordingDice(Dice(1))
+        recording.roll(3)
+        replay = ReplayDice(recording.events)
+        # expect
+        with self.assertRaises(ReplayError):
+            replay.roll(2)
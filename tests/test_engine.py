@@ -0,0 +1,100 @@
+from random import Random
+from unittest import TestCase
+
+from riskcli import Game, Map, Player, Territory
+from riskengine import (AggressivePolicy, HeadlessGame, Policy,
+                        RandomPolicy, run_games)
+
+
+class HeadlessGameTest(TestCase):
+    def test_game_ends_with_winner_owning_everything(self):
+        # given
+        game = HeadlessGame([AggressivePolicy, RandomPolicy], seed=1)
+        # when
+        result = game.play()
+        # then
+        self.assertIsNotNone(result.winner)
+        winner = game.game.players[result.winner]
+        self.assertEqual(42, len(winner.territories))
+        self.assertGreater(result.turns, 0)
+
+    def test_same_seed_plays_the_same_game(self):
+        # when
+        first = HeadlessGame([AggressivePolicy, AggressivePolicy],
+                             seed='x').play()
+        second = HeadlessGame([AggressivePolicy, AggressivePolicy],
+                              seed='x').play()
+        # then
+        self.assertEqual(first.winner, second.winner)
+        self.assertEqual(first.turns, second.turns)
+        self.assertEqual(first.continent_captures,
+                         second.continent_captures)
+
+    def test_passive_players_hit_the_turn_limit(self):
+        # given
+        game = HeadlessGame([Policy, Policy], seed=2, max_turns=10)
+        # when
+        result = game.play()
+        # then
+        self.assertIsNone(result.winner)
+        self.assertEqual(10, result.turns)
+
+    def test_armies_are_never_negative_or_unowned(self):
+        # given
+        game = HeadlessGame([RandomPolicy, RandomPolicy, RandomPolicy],
+                            seed=3)
+        # when
+        for _ in range(30):
+            if len(game.alive()) == 1:
+                break
+            game.play_turn()
+            # then
+            for t in game.game.game_map.territories:
+                self.assertIsNotNone(t.owner)
+                self.assertGreaterEqual(t.num_armies, 1)
+
+
+class PolicyTest(TestCase):
+    def test_players_without_a_border_still_reinforce(self):
+        # given
+        islands = [Territory('a', []), Territory('b', []),
+                   Territory('c', ['b'])]
+        players = [Player('p1', 'red'), Player('p2', 'black')]
+        game = Game(players=players, game_map=Map(islands, []))
+        islands[0].owner = players[0]
+        for t in islands[1:]:
+            t.owner = players[1]
+        for policy in [Policy, RandomPolicy, AggressivePolicy]:
+            for player in players:
+                # when
+                placements = policy(Random(0)).place_reinforcements(
+                    game, player, 5)
+                # then
+                self.assertEqual(5, sum(n for _, n in placements))
+                for t, _ in placements:
+                    self.assertIs(player, t.owner)
+
+
+class RunGamesTest(TestCase):
+    def test_summary_counts_every_game(self):
+        # when
+        summary = run_games(20, [AggressivePolicy, RandomPolicy], seed=4,
+                            workers=1, chunk_size=7)
+        # then
+        self.assertEqual(20, summary.games)
+        self.assertEqual(20, sum(summary.wins) + summary.draws)
+        self.assertAlmostEqual(1, sum(summary.win_rates) +
+                               summary.draws / summary.games)
+        self.assertGreater(summary.games_per_second, 0)
+
+    def test_results_do_not_depend_on_the_pool(self):
+        # when
+        serial = run_games(8, [AggressivePolicy, RandomPolicy], seed=5,
+                           workers=1, chunk_size=3)
+        parallel = run_games(8, [AggressivePolicy, RandomPolicy], seed=5,
+                             workers=2, chunk_size=3)
+        # then
+        self.assertEqual(serial.wins, parallel.wins)
+        self.assertEqual(serial.total_turns, parallel.total_turns)
+        self.assertEqual(serial.continent_captures,
+                         parallel.continent_captures)
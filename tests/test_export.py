@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+
+import numpy as np
+
+from riskcli import gen_default_map
+from riskengine import AggressivePolicy, RandomPolicy, run_games
+from riskexport import (BATTLE_COLUMNS, ColumnWriter, GameExport, NpzChunks,
+                        export_battles, iter_chunks, pyarrow, read_columns)
+
+
+class ColumnWriterTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def write_rows(self, path):
+        with ColumnWriter(path, [('a', 'i4'), ('b', 'f8')],
+                          chunk_rows=7) as writer:
+            for i in range(5):
+                writer.append(i, i / 2)
+            writer.extend(np.arange(5, 20), np.arange(5, 20) / 2)
+            writer.append(20, 10.0)
+        return writer
+
+    def test_rows_survive_chunking(self):
+        # when
+        writer = self.write_rows(self.path('x.npz'))
+        # then
+        self.assertEqual(21, writer.rows)
+        columns = read_columns(self.path('x.npz'))
+        self.assertEqual(list(range(21)), columns['a'].tolist())
+        self.assertEqual([i / 2 for i in range(21)], columns['b'].tolist())
+        self.assertEqual([7, 7, 7], [len(chunk['a']) for chunk in
+                                     iter_chunks(self.path('x.npz'))])
+
+    def test_npz_opens_with_numpy(self):
+        # given
+        self.write_rows(self.path('x.npz'))
+        # when
+        with np.load(self.path('x.npz')) as data:
+            # then
+            self.assertEqual(np.int32, data['a.000000'].dtype)
+            self.assertEqual(6, len(data.files))
+
+    def test_npz_chunks_must_match_the_columns(self):
+        # given
+        out = NpzChunks(self.path('x.npz'), [('a', 'i4'), ('b', 'f8')])
+        self.addCleanup(out.close)
+        # expect
+        out.write({'a': np.arange(3, dtype='i4'), 'b': np.zeros(3)})
+        for arrays in [{'a': np.arange(3, dtype='i8'), 'b': np.zeros(3)},
+                       {'a': np.arange(3, dtype='i4')},
+                       {'b': np.zeros(3), 'a': np.arange(3, dtype='i4')}]:
+            with self.assertRaises(ValueError):
+                out.write(arrays)
+
+    @skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_round_trip(self):
+        # when
+        self.write_rows(self.path('x.parquet'))
+        # then
+        columns = read_columns(self.path('x.parquet'))
+        self.assertEqual(list(range(21)), columns['a'].tolist())
+
+    def test_battles_are_consistent(self):
+        # when
+        rows = export_battles(self.path('b.npz'), 1000, 10, 10, seed=1,
+                              batch_size=300, chunk_rows=256)
+        # then
+        self.assertEqual(1000, rows)
+        columns = read_columns(self.path('b.npz'))
+        self.assertEqual([name for name, _ in BATTLE_COLUMNS],
+                         list(columns))
+        left = columns['attackers_left']
+        self.assertTrue(((left > 0) == columns['attacker_won']).all())
+        self.assertTrue((left <= columns['attackers']).all())
+        self.assertTrue(((left == 0) | (columns['defenders_left'] == 0))
+                        .all())
+
+    def test_games_export_one_row_per_seat(self):
+        # given
+        continents = [c.name for c in gen_default_map().continents]
+        # when
+        with GameExport(self.path('g.npz'), continents,
+                        chunk_rows=16) as export:
+            summary = run_games(10, [AggressivePolicy, RandomPolicy],
+                                seed=2, workers=1, chunk_size=3,
+                                export=export)
+        # then
+        columns = read_columns(self.path('g.npz'))
+        self.assertEqual(sorted(list(range(10)) * 2),
+                         columns['game'].tolist())
+        self.assertEqual(summary.wins[0], columns['won'][
+            columns['seat'] == 0].sum())
+        self.assertEqual(42 * 10, columns['territories'].sum())
+        self.assertEqual(4 * 10, columns['territories_australia'].sum())
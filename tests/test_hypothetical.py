@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+from riskcli import ASIA, KAMCHATKA
+from riskengine import AggressivePolicy, HeadlessGame, RandomPolicy
+
+
+def snapshot(game):
+    game_map = game.game_map
+    return (
+        [(t.owner, t.num_armies) for t in game_map.territories],
+        [(p.count_all_armies(), list(p.territories),
+          dict(p._territories_by_continent)) for p in game.players],
+        [[u.index for u in game_map.region(t)]
+         for t in game_map.territories],
+        game.next_player, len(game.turns))
+
+
+class HypotheticalTest(TestCase):
+    def setUp(self):
+        self.headless = HeadlessGame([AggressivePolicy, RandomPolicy], seed=4)
+        for _ in range(5):
+            self.headless.play_turn()
+        self.game = self.headless.game
+
+    def test_turns_played_in_the_block_are_undone(self):
+        # given
+        before = snapshot(self.game)
+        # when
+        with self.game.hypothetical():
+            for _ in range(10):
+                self.headless.play_turn()
+            changed = snapshot(self.game)
+        # then
+        self.assertNotEqual(before, changed)
+        self.assertEqual(before, snapshot(self.game))
+
+    def test_blocks_nest(self):
+        # given
+        kamchatka = self.game.game_map.t_by_name[KAMCHATKA]
+        me, other = self.game.players
+        asia = self.game.game_map.c_by_name[ASIA]
+        before = snapshot(self.game)
+        # when
+        with self.game.hypothetical():
+            kamchatka.owner = other
+            kamchatka.num_armies = 7
+            outer = snapshot(self.game)
+            with self.game.hypothetical():
+                for t in asia.territories:
+                    t.owner = me
+                    t.num_armies += 1
+                self.assertTrue(me.owns_continent(asia))
+            # then
+            self.assertEqual(outer, snapshot(self.game))
+            kamchatka.num_armies = 2
+        self.assertEqual(before, snapshot(self.game))
+
+    def test_undone_on_exceptions(self):
+        # given
+        before = snapshot(self.game)
+        # when
+        with self.assertRaises(ZeroDivisionError):
+            with self.game.hypothetical():
+                self.game.game_map.territories[0].owner = None
+                1 / 0
+        # then
+        self.assertEqual(before, snapshot(self.game))
+
+    def test_nothing_is_logged(self):
+        # given
+        log = object()
+        self.game.log = log
+        # when
+        with self.game.hypothetical():
+            seen = self.game.log
+        # then
+        self.assertIsNone(seen)
+        self.assertIs(log, self.game.log)
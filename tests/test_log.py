@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from riskcli import Game, Map, Player, Territory, gen_default_map
+from riskengine import AggressivePolicy, HeadlessGame, RandomPolicy
+from risklog import (EventLogReader, EventLogWriter, MAX_TERRITORIES, RECORD,
+                     SNAPSHOT, pack_dice, unpack_dice)
+from riskstate import GameState
+
+
+def snapshot(state):
+    return list(state.owners), list(state.armies), state.next_player
+
+
+class EventLogTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'game.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def play(self, turns, snapshot_every=10000):
+        # Plays `turns` turns and returns the state before each one and at
+        # the end.
+        game = HeadlessGame([AggressivePolicy, RandomPolicy,
+                             AggressivePolicy], seed=7, log_path=self.path)
+        game.game.log.snapshot_every = snapshot_every
+        states = []
+        for _ in range(turns):
+            states.append(GameState.from_game(game.game))
+            game.play_turn()
+        states.append(GameState.from_game(game.game))
+        game.game.log.close()
+        return game, states
+
+    def test_replay_matches_the_game(self):
+        # given
+        game, states = self.play(30)
+        reader = EventLogReader(self.path)
+        # when
+        state = reader.state_at(gen_default_map(), states[-1].players)
+        # then
+        self.assertEqual(snapshot(states[-1])[:2], snapshot(state)[:2])
+
+    def test_state_at_turn_with_and_without_snapshots(self):
+        # given
+        _, states = self.play(30, snapshot_every=50)
+        reader = EventLogReader(self.path)
+        game_map = gen_default_map()
+        # then
+        self.assertTrue(reader.snapshots)
+        for turn in [1, 5, 17, 29]:
+            self.assertEqual(snapshot(states[turn]), snapshot(
+                reader.state_at(game_map, states[0].players, turn=turn)))
+        os.remove(f'{self.path}.idx')
+        scanned = EventLogReader(self.path)
+        self.assertEqual(reader.snapshots, scanned.snapshots)
+        self.assertEqual(snapshot(states[17]), snapshot(
+            scanned.state_at(game_map, states[0].players, turn=17)))
+
+    def test_snapshots_are_skipped_when_replaying(self):
+        # given
+        _, states = self.play(20, snapshot_every=30)
+        reader = EventLogReader(self.path)
+        # when
+        events = list(reader.events())
+        # then
+        self.assertEqual(len(reader) - sum(
+            record[5] for record in events if record[0] == SNAPSHOT),
+            len(events))
+
+    def test_torn_record_is_ignored(self):
+        # given
+        _, states = self.play(10)
+        with open(self.path, 'ab') as f:
+            f.write(b'\x05\x01\x02')
+        # when
+        reader = EventLogReader(self.path)
+        # then
+        self.assertEqual(os.path.getsize(self.path) // RECORD.size,
+                         len(reader))
+        self.assertEqual(snapshot(states[-1])[:2], snapshot(
+            reader.state_at(gen_default_map(), states[0].players))[:2])
+
+    def test_engine_writes_a_log(self):
+        # given
+        game = HeadlessGame([AggressivePolicy, AggressivePolicy], seed=3,
+                            max_turns=12, log_path=self.path)
+        # when
+        game.play()
+        # then
+        state = EventLogReader(self.path).state_at(
+            gen_default_map(), [(p.name, p.color) for p in game.game.players])
+        self.assertEqual(snapshot(GameState.from_game(game.game))[:2],
+                         snapshot(state)[:2])
+
+    def test_a_new_game_replaces_the_old_log(self):
+        # given
+        HeadlessGame([AggressivePolicy, AggressivePolicy], seed=3,
+                     max_turns=12, log_path=self.path).play()
+        # when
+        game = HeadlessGame([AggressivePolicy, RandomPolicy, RandomPolicy],
+                            seed=4, max_turns=12, log_path=self.path)
+        game.play()
+        # then
+        reader = EventLogReader(self.path)
+        self.assertEqual(3, reader.num_players)
+        self.assertEqual(1, sum(1 for r in reader.records() if r[0] == 0))
+        state = reader.state_at(
+            gen_default_map(), [(p.name, p.color) for p in game.game.players])
+        self.assertEqual(snapshot(GameState.from_game(game.game))[:2],
+                         snapshot(state)[:2])
+
+    def test_maps_too_big_for_the_format_are_refused(self):
+        # given
+        territories = [Territory(f'T{i}', [])
+                       for i in range(MAX_TERRITORIES + 1)]
+        game = Game(players=[Player('p1', 'red'), Player('p2', 'black')],
+                    game_map=Map(territories, []))
+        # expect
+        with self.assertRaises(ValueError):
+            EventLogWriter(self.path, game)
+
+    def test_dice_round_trip(self):
+        # expect
+        for rattacker, rdefender in [([6, 5, 1], [4, 4]), ([1], [6]),
+                                     ([3, 2], [2])]:
+            self.assertEqual((rattacker, rdefender),
+                             unpack_dice(pack_dice(rattacker, rdefender)))
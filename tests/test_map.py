@@ -0,0 +1,193 @@
+from random import Random
+from unittest import TestCase
+
+from riskcli import (Continent, Map, Player, Territory, gen_default_map,
+                     _build_default_map, ALASKA, ARGENTINA, BRAZIL,
+                     GREENLAND, KAMCHATKA, MADAGASCAR, NW_TERR, ONTARIO, PERU,
+                     VENEZ)
+from riskmaps import generate_map
+
+
+def brute_force_regions(game_map):
+    regions = {}
+    for t in game_map.territories:
+        if t.owner is None or t in regions:
+            continue
+        members = {t}
+        frontier = [t]
+        while frontier:
+            u = frontier.pop()
+            for v in u.neighbors:
+                if v.owner is t.owner and v not in members:
+                    members.add(v)
+                    frontier.append(v)
+        for u in members:
+            regions[u] = members
+    return regions
+
+
+class MapDistanceTest(TestCase):
+    def test_distances_on_default_map(self):
+        # given
+        game_map = gen_default_map()
+        t = game_map.t_by_name
+        # expect
+        self.assertEqual(0, game_map.distance(t[ALASKA], t[ALASKA]))
+        self.assertEqual(1, game_map.distance(t[ALASKA], t[KAMCHATKA]))
+        self.assertEqual(2, game_map.distance(t[ALASKA], t[ONTARIO]))
+        self.assertEqual(2, game_map.distance(t[VENEZ], t[ARGENTINA]))
+        self.assertEqual(3, game_map.distance(t[BRAZIL], t[MADAGASCAR]))
+
+    def test_distances_are_symmetric(self):
+        # given
+        game_map = gen_default_map()
+        # expect
+        for a in game_map.territories:
+            for b in game_map.territories:
+                self.assertEqual(game_map.distance(a, b),
+                                 game_map.distance(b, a))
+
+    def test_unreachable_territory_has_no_distance(self):
+        # given
+        game_map = Map(territories=[Territory('a', ['b']),
+                                    Territory('b', []),
+                                    Territory('c', [])],
+                       continents=[])
+        a, b, c = game_map.territories
+        # expect
+        self.assertEqual(1, game_map.distance(a, b))
+        self.assertIsNone(game_map.distance(a, c))
+
+    def test_large_maps_compute_rows_on_demand(self):
+        # given
+        names = [f't{i}' for i in range(Map.EAGER_DISTANCE_LIMIT + 1)]
+        game_map = Map(territories=[Territory(name, [nxt])
+                                    for name, nxt in zip(names, names[1:])] +
+                       [Territory(names[-1], [])],
+                       continents=[])
+        first = game_map.territories[0]
+        last = game_map.territories[-1]
+        # expect
+        self.assertEqual(len(names) - 1, game_map.distance(first, last))
+
+
+class MapRegionTest(TestCase):
+    def test_regions_merge_and_split_with_ownership(self):
+        # given
+        game_map = gen_default_map()
+        t = game_map.t_by_name
+        p1 = Player('p1', 'red')
+        p2 = Player('p2', 'black')
+        t[ALASKA].owner = p1
+        t[GREENLAND].owner = p1
+        # precondition
+        self.assertFalse(game_map.connected(t[ALASKA], t[GREENLAND]))
+        self.assertEqual([t[ALASKA]], game_map.region(t[ALASKA]))
+        # when
+        t[NW_TERR].owner = p1
+        # then
+        self.assertTrue(game_map.connected(t[ALASKA], t[GREENLAND]))
+        self.assertEqual({t[ALASKA], t[GREENLAND], t[NW_TERR]},
+                         set(game_map.region(t[GREENLAND])))
+        # when
+        t[ALASKA].owner = p2
+        # then
+        self.assertFalse(game_map.connected(t[ALASKA], t[GREENLAND]))
+        self.assertEqual({t[GREENLAND], t[NW_TERR]},
+                         set(game_map.region(t[NW_TERR])))
+
+    def test_unowned_territory_has_no_region(self):
+        # given
+        game_map = gen_default_map()
+        t = game_map.t_by_name
+        # expect
+        self.assertEqual([], game_map.region(t[PERU]))
+        self.assertFalse(game_map.connected(t[PERU], t[PERU]))
+
+    def test_random_ownership_changes_agree_with_flood_fill(self):
+        # given
+        rng = Random(99)
+        game_map = gen_default_map()
+        players = [Player(f'p{i}', 'red') for i in range(3)]
+        for step in range(2000):
+            # when
+            t = rng.choice(game_map.territories)
+            if rng.random() < 0.1:
+                t.owner = None
+            else:
+                rng.choice(players).territories.add(t)
+            # then
+            expected = brute_force_regions(game_map)
+            for u in game_map.territories:
+                self.assertEqual(expected.get(u, set()),
+                                 set(game_map.region(u)))
+
+    def test_regions_on_a_generated_map_built_after_changes(self):
+        # given
+        rng = Random(5)
+        game_map = generate_map(300, seed=5).build()
+        players = [Player('p1', 'red'), Player('p2', 'black')]
+        for t in game_map.territories:
+            t.owner = rng.choice(players)
+        for step in range(500):
+            # when
+            t = rng.choice(game_map.territories)
+            t.owner = players[0] if t.owner is players[1] else players[1]
+            if step < 100:
+                # nothing has asked for regions yet
+                continue
+            # then
+            expected = brute_force_regions(game_map)
+            for u in game_map.territories:
+                self.assertEqual(expected[u], set(game_map.region(u)))
+
+
+class MapTemplateTest(TestCase):
+    def test_default_map_matches_map_built_from_names(self):
+        # given
+        expected = _build_default_map()
+        # when
+        game_map = gen_default_map()
+        # then
+        self.assertEqual([t.name for t in expected.territories],
+                         [t.name for t in game_map.territories])
+        for t, u in zip(expected.territories, game_map.territories):
+            self.assertEqual([n.name for n in t.neighbors],
+                             [n.name for n in u.neighbors])
+            self.assertEqual(t.continent.name, u.continent.name)
+        for c, d in zip(expected.continents, game_map.continents):
+            self.assertEqual(c.bonus, d.bonus)
+            self.assertEqual([t.name for t in c.territories],
+                             [t.name for t in d.territories])
+        self.assertEqual(list(expected.adjacency), list(game_map.adjacency))
+
+    def test_each_call_returns_independent_objects(self):
+        # given
+        first = gen_default_map()
+        second = gen_default_map()
+        p = Player('p', 'red')
+        # when
+        first.t_by_name[ALASKA].owner = p
+        # then
+        self.assertIsNone(second.t_by_name[ALASKA].owner)
+        self.assertEqual([first.t_by_name[ALASKA]],
+                         first.region(first.t_by_name[ALASKA]))
+        self.assertEqual([], second.region(second.t_by_name[ALASKA]))
+        self.assertIsNot(first.t_by_name[ALASKA], second.t_by_name[ALASKA])
+
+    def test_template_round_trip_of_custom_map(self):
+        # given
+        game_map = Map(territories=[Territory('a', ['b']),
+                                    Territory('b', ['c']),
+                                    Territory('c', [])],
+                       continents=[Continent('x', 4, ['a', 'b'])])
+        # when
+        result = game_map.to_template().build()
+        # then
+        a, b, c = result.territories
+        self.assertEqual([b], list(a.neighbors))
+        self.assertEqual([a, c], list(b.neighbors))
+        self.assertEqual([a, b], list(result.c_by_name['x'].territories))
+        self.assertIs(result.c_by_name['x'], a.continent)
+        self.assertIsNone(c.continent)
+        self.assertEqual(2, result.distance(a, c))
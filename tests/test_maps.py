@@ -0,0 +1,227 @@
+import os
+import shutil
+import struct
+import tempfile
+from unittest import TestCase
+
+from riskcli import Map, gen_default_map, ALASKA, KAMCHATKA
+from riskmaps import (HEADER, MapFormatError, compile_map, generate_map,
+                      load_compiled, load_csv, load_json, load_map,
+                      template_from_lists, validate, write_json)
+
+
+TOOLS_CSV = os.path.join(os.path.dirname(__file__), '..', 'tools',
+                         'territories.csv')
+
+
+def topology(template):
+    offsets = template.adjacency_offsets
+    return ([name for name in template.names],
+            [list(template.adjacency[offsets[i]:offsets[i + 1]])
+             for i in range(len(template.names))],
+            [(name, bonus, list(members))
+             for name, bonus, members in template.continents])
+
+
+class MapLoaderTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def write(self, name, text):
+        with open(self.path(name), 'w') as f:
+            f.write(text)
+        return self.path(name)
+
+    def test_json_round_trip_of_default_map(self):
+        # given
+        template = gen_default_map().to_template()
+        write_json(template, self.path('classic.json'))
+        # when
+        result = load_json(self.path('classic.json'))
+        # then
+        self.assertEqual(topology(template), topology(result))
+
+    def test_compiled_round_trip_of_default_map(self):
+        # given
+        template = gen_default_map().to_template()
+        compile_map(template, self.path('classic.rmap'))
+        # when
+        result = load_compiled(self.path('classic.rmap'))
+        # then
+        self.assertEqual(topology(template), topology(result))
+
+    def test_map_can_be_built_from_compiled_file(self):
+        # given
+        compile_map(gen_default_map().to_template(),
+                    self.path('classic.rmap'))
+        # when
+        game_map = Map.load(self.path('classic.rmap'))
+        # then
+        alaska = game_map.t_by_name[ALASKA]
+        self.assertIn(game_map.t_by_name[KAMCHATKA], alaska.neighbors)
+        self.assertEqual(42, len(game_map.territories))
+        self.assertEqual(7, game_map.c_by_name['Asia'].bonus)
+
+    def test_load_map_writes_and_reuses_compiled_cache(self):
+        # given
+        path = self.write('tiny.json', '{"territories": ['
+                          '{"name": "a", "neighbors": ["b"]},'
+                          '{"name": "b"}],'
+                          '"continents": [{"name": "c", "bonus": 2,'
+                          '"territories": ["a", "b"]}]}')
+        # when
+        first = load_map(path)
+        # then
+        self.assertTrue(os.path.exists(path + '.rmap'))
+        self.assertEqual(topology(first), topology(load_map(path)))
+        self.assertEqual([[1], [0]], topology(first)[1])
+
+    def test_tools_csv_matches_default_map_shape(self):
+        # when
+        template = load_csv(TOOLS_CSV)
+        # then
+        self.assertEqual(42, len(template.names))
+        self.assertEqual(2 * 82, len(template.adjacency))
+
+    def test_csv_with_continents(self):
+        # given
+        path = self.write('m.csv', ',a,b,c\na,-,1,\nb,,-,x\nc,,,-\n')
+        continents = self.write('c.csv', 'one,3,a\none,3,b\ntwo,1,c\n')
+        # when
+        template = load_csv(path, continents)
+        # then
+        self.assertEqual(['a', 'b', 'c'], topology(template)[0])
+        self.assertEqual([[1], [0, 2], [1]], topology(template)[1])
+        self.assertEqual([('one', 3, [0, 1]), ('two', 1, [2])],
+                         topology(template)[2])
+
+    def test_asymmetric_csv_is_rejected(self):
+        # given
+        path = self.write('m.csv', ',a,b,c\na,-,1,1\nb,1,-,\nc,,1,-\n')
+        # expect
+        self.assertRaises(MapFormatError, load_csv, path)
+
+    def test_invalid_maps_are_rejected(self):
+        # expect
+        self.assertRaises(MapFormatError, template_from_lists,
+                          ['a', 'a'], [['a'], []], [])
+        self.assertRaises(MapFormatError, template_from_lists,
+                          ['a', 'b'], [['c'], []], [])
+        self.assertRaises(MapFormatError, template_from_lists,
+                          ['a', 'b'], [['a'], []], [])
+        self.assertRaises(MapFormatError, template_from_lists,
+                          ['a', 'b', 'c'], [['b'], [], []], [])
+        self.assertRaises(MapFormatError, template_from_lists,
+                          ['a', 'b'], [['b'], []],
+                          [('x', 1, ['a']), ('y', 1, ['a', 'b'])])
+
+    def test_corrupt_compiled_file_is_rejected(self):
+        # given
+        compile_map(gen_default_map().to_template(), self.path('m.rmap'))
+        with open(self.path('m.rmap'), 'rb') as f:
+            data = f.read()
+        bad = self.path('bad.rmap')
+        with open(bad, 'wb') as f:
+            f.write(data[:-5])
+        # expect
+        self.assertRaises(MapFormatError, load_compiled, bad)
+        self.assertRaises(MapFormatError, load_compiled,
+                          self.write('x.rmap', 'not a map at all, no sir'))
+
+    def test_damaged_tables_are_rejected(self):
+        # given
+        template = gen_default_map().to_template()
+        compile_map(template, self.path('m.rmap'))
+        self.assertEqual([], [name for name in os.listdir(self.dir)
+                              if name.endswith('.tmp')])
+        with open(self.path('m.rmap'), 'rb') as f:
+            data = f.read()
+        # the first neighbor of the first territory
+        position = HEADER.size + 4 * (len(template.names) + 1)
+        neighbor = template.adjacency[0]
+        for value in [len(template.names), -1, 0, neighbor + 1]:
+            bad = self.path(f'bad{value}.rmap')
+            with open(bad, 'wb') as f:
+                f.write(data[:position] + struct.pack('<i', value) +
+                        data[position + 4:])
+            # expect
+            self.assertRaises(MapFormatError, load_compiled, bad)
+
+    def test_damaged_cache_is_rebuilt(self):
+        # given
+        path = self.write('tiny.json', '{"territories": ['
+                          '{"name": "a", "neighbors": ["b"]},'
+                          '{"name": "b"}]}')
+        expected = topology(load_map(path))
+        with open(path + '.rmap', 'r+b') as f:
+            f.truncate(HEADER.size + 3)
+        # when
+        template = load_map(path)
+        # then
+        self.assertEqual(expected, topology(template))
+        self.assertEqual(expected, topology(load_compiled(path + '.rmap')))
+
+
+class GenerateMapTest(TestCase):
+    def test_same_seed_same_map(self):
+        # expect
+        self.assertEqual(topology(generate_map(500, seed=3)),
+                         topology(generate_map(500, seed=3)))
+        self.assertNotEqual(topology(generate_map(500, seed=3)),
+                            topology(generate_map(500, seed=4)))
+
+    def test_bad_arguments_are_refused(self):
+        # expect
+        for kwargs in [{'num_territories': 0}, {'num_territories': -5},
+                       {'num_territories': 10, 'mean_degree': -1},
+                       {'num_territories': 10, 'max_degree': 0},
+                       {'num_territories': 10, 'continent_size': 0}]:
+            with self.assertRaisesRegex(ValueError, 'territory|must'):
+                generate_map(**kwargs)
+        self.assertEqual(('T0',), tuple(generate_map(1).names))
+
+    def test_maps_are_valid_at_every_size(self):
+        for n in [1, 2, 42, 1000]:
+            # when
+            template = generate_map(n)
+            # then
+            validate(template)
+            covered = sorted(i for _, _, members in template.continents
+                             for i in members)
+            self.assertEqual(list(range(n)), covered)
+            self.assertEqual(n, len(template.build().territories))
+
+    def test_degrees(self):
+        # given
+        n = 2000
+        # when
+        template = generate_map(n, mean_degree=3.5, max_degree=5)
+        # then
+        offsets = template.adjacency_offsets
+        degrees = [offsets[i + 1] - offsets[i] for i in range(n)]
+        self.assertAlmostEqual(3.5, sum(degrees) / n, delta=0.1)
+        self.assertLessEqual(max(degrees), 5)
+
+    def test_continents_are_connected_with_bonuses(self):
+        # given
+        game_map = generate_map(300, seed=1, continent_size=10).build()
+        # expect
+        self.assertEqual(30, len(game_map.continents))
+        for c in game_map.continents:
+            self.assertGreaterEqual(c.bonus, 1)
+            members = set(c.territories)
+            start = next(iter(members))
+            seen = {start}
+            frontier = [start]
+            while frontier:
+                for t in frontier.pop().neighbors:
+                    if t in members and t not in seen:
+                        seen.add(t)
+                        frontier.append(t)
+            self.assertEqual(members, seen)
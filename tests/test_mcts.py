@@ -0,0 +1,121 @@
+import time
+from random import Random
+from unittest import TestCase
+
+from riskcli import Game, Player, gen_default_map, ALASKA, KAMCHATKA
+from riskengine import AggressivePolicy, HeadlessGame
+from riskmcts import (END_TURN, MCTS, MCTSPolicy, SearchState, ZobristKeys,
+                      battle_outcomes)
+from riskstate import GameState
+
+
+def one_enemy_territory_state():
+    game = Game(players=[Player('p1', 'red'), Player('p2', 'black')],
+                game_map=gen_default_map())
+    for t in game.game_map.territories:
+        t.owner = game.players[0]
+        t.num_armies = 1
+    game.game_map.t_by_name[KAMCHATKA].owner = game.players[1]
+    game.game_map.t_by_name[ALASKA].num_armies = 10
+    return GameState.from_game(game)
+
+
+class BattleOutcomesTest(TestCase):
+    def test_outcomes_cover_every_result(self):
+        # when
+        cumulative, outcomes = battle_outcomes(3, 2)
+        # then
+        self.assertEqual([(1, 0), (2, 0), (3, 0), (0, 1), (0, 2)], outcomes)
+        self.assertAlmostEqual(1, cumulative[-1])
+        self.assertEqual(sorted(cumulative), cumulative)
+
+
+class SearchStateTest(TestCase):
+    def test_incremental_hash_matches_full_hash(self):
+        # given
+        rng = Random(0)
+        keys = ZobristKeys(1)
+        game = HeadlessGame([AggressivePolicy, AggressivePolicy], seed=2)
+        for _ in range(4):
+            game.play_turn()
+        search_state = SearchState.from_state(
+            GameState.from_game(game.game), keys)
+        player = search_state.state.next_player
+        for _ in range(10):
+            actions = search_state.attacks(player)
+            if not actions:
+                break
+            # when
+            search_state.apply(rng.choice(actions), rng)
+            # then
+            fresh = SearchState.from_state(search_state.state.copy(), keys)
+            self.assertEqual(fresh.hash, search_state.hash)
+
+    def test_copies_do_not_share_armies(self):
+        # given
+        state = one_enemy_territory_state()
+        alaska = state.game_map.t_by_name[ALASKA].index
+        kamchatka = state.game_map.t_by_name[KAMCHATKA].index
+        search_state = SearchState.from_state(state, ZobristKeys())
+        # when
+        other = search_state.copy()
+        other.apply(('attack', alaska, kamchatka), Random(1))
+        # then
+        self.assertEqual(10, search_state.state.armies[alaska])
+        self.assertEqual(1, other.state.armies[alaska])
+        self.assertNotEqual(search_state.hash, other.hash)
+
+
+class MCTSTest(TestCase):
+    def test_finds_the_winning_attack(self):
+        # given
+        state = one_enemy_territory_state()
+        alaska = state.game_map.t_by_name[ALASKA].index
+        kamchatka = state.game_map.t_by_name[KAMCHATKA].index
+        # when
+        decision = MCTS(seed=0).decide(state, time_budget=5,
+                                       max_iterations=300)
+        # then
+        self.assertEqual(('attack', alaska, kamchatka), decision.action)
+        self.assertGreater(decision.nodes_per_second, 0)
+
+    def test_respects_the_time_budget(self):
+        # given
+        state = GameState.from_game(
+            HeadlessGame([AggressivePolicy, AggressivePolicy],
+                         seed=3).game)
+        started = time.perf_counter()
+        # when
+        decision = MCTS(seed=0).decide(state, time_budget=0.05)
+        # then
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(END_TURN, decision.action)
+
+    def test_transposition_table_is_bounded(self):
+        # given
+        game = HeadlessGame([AggressivePolicy, AggressivePolicy], seed=4)
+        for _ in range(4):
+            game.play_turn()
+        search = MCTS(seed=0, max_nodes=20)
+        # when
+        search.decide(GameState.from_game(game.game), time_budget=5,
+                      max_iterations=200)
+        # then
+        self.assertLessEqual(len(search.table), 20)
+
+
+class FastMCTSPolicy(MCTSPolicy):
+    time_budget = 0.005
+
+
+class MCTSPolicyTest(TestCase):
+    def test_plays_legal_turns_in_the_engine(self):
+        # given
+        game = HeadlessGame([FastMCTSPolicy, AggressivePolicy], seed=5,
+                            max_turns=6)
+        # when
+        result = game.play()
+        # then
+        self.assertEqual(6, result.turns)
+        for t in game.game.game_map.territories:
+            self.assertGreaterEqual(t.num_armies, 1)
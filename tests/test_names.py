@@ -0,0 +1,90 @@
+from unittest import TestCase
+
+from riskcli import (E_US, NW_TERR, Continent, Game, NameIndex, Player,
+                     Territory, complete_line, gen_default_map)
+from riskmaps import generate_map
+
+
+def default_game():
+    return Game(players=[Player('player1', 'red'), Player('player2', 'black')],
+                game_map=gen_default_map())
+
+
+class NameLookupTest(TestCase):
+    def test_exact_names_ignore_case_and_spacing(self):
+        # given
+        game = default_game()
+        # expect
+        self.assertIs(game.players[1], game.get_object_by_name('PLAYER2'))
+        self.assertIs(game.game_map.t_by_name[E_US],
+                      game.get_object_by_name('eastern  united states'))
+        self.assertIsInstance(game.get_object_by_name('asia'), Continent)
+        self.assertIsNone(game.get_object_by_name('Atlantis'))
+
+    def test_aliases(self):
+        # given
+        game = default_game()
+        # expect
+        self.assertIs(game.game_map.t_by_name[E_US],
+                      game.get_object_by_name('e_us'))
+        self.assertIs(game.game_map.t_by_name[NW_TERR],
+                      game.get_object_by_name('NW TERR'))
+
+    def test_unique_prefixes(self):
+        # given
+        game = default_game()
+        # expect
+        self.assertIs(game.game_map.t_by_name['Kamchatka'],
+                      game.get_object_by_name('kam'))
+        # India and Indonesia
+        self.assertIsNone(game.get_object_by_name('ind'))
+        # an exact name wins over longer ones starting with it
+        index = NameIndex()
+        index.add('Congo', 1)
+        index.add('Congo Basin', 2)
+        self.assertEqual(1, index.get('congo'))
+        self.assertEqual(2, index.get('congo b'))
+
+    def test_players_win_name_clashes(self):
+        # given
+        game = Game(players=[Player('Peru', 'red'), Player('p2', 'black')],
+                    game_map=gen_default_map())
+        # expect
+        self.assertIs(game.players[0], game.get_object_by_name('Peru'))
+
+    def test_large_map(self):
+        # given
+        game_map = generate_map(5000).build()
+        players = [Player(f'player{i}', 'red') for i in range(500)]
+        game = Game(players=players, game_map=game_map)
+        # expect
+        for t in game_map.territories[::97]:
+            self.assertIs(t, game.get_object_by_name(t.name.lower()))
+        self.assertIs(players[321], game.get_object_by_name('player321'))
+        self.assertEqual([f'T{i}' for i in range(4990, 5000)],
+                         game.names.complete('t499'))
+
+
+class CompletionTest(TestCase):
+    def test_completes_commands_and_names(self):
+        # given
+        game = default_game()
+        # expect
+        self.assertEqual(['plan ', 'player '], complete_line('pl', game))
+        self.assertEqual(['view Eastern United States'],
+                         complete_line('view eastern u', game))
+        self.assertEqual(['view Eastern Australia',
+                          'view Eastern United States'],
+                         complete_line('view eastern', game))
+        self.assertEqual(['plan Brazil to Argentina'],
+                         complete_line('plan Brazil to arg', game))
+        self.assertEqual([], complete_line('view eastern', None))
+
+    def test_aliases_are_not_offered(self):
+        # given
+        index = NameIndex()
+        index.add('Eastern United States', Territory('Eastern United States'))
+        index.add_alias('E_US', 'Eastern United States')
+        # expect
+        self.assertEqual([], index.complete('e_'))
+        self.assertEqual(['Eastern United States'], index.complete(''))
@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+from riskodds import exchange_outcomes, battle_odds
+
+
+class ExchangeOutcomesTest(TestCase):
+    def test_three_versus_two_matches_known_odds(self):
+        # when
+        result = exchange_outcomes(3, 2)
+        # then
+        self.assertEqual(3, len(result))
+        probs = {(al, dl): p for al, dl, p in result}
+        self.assertAlmostEqual(2890 / 7776, probs[0, 2])
+        self.assertAlmostEqual(2611 / 7776, probs[1, 1])
+        self.assertAlmostEqual(2275 / 7776, probs[2, 0])
+
+    def test_one_versus_one_ties_go_to_the_defender(self):
+        # when
+        result = exchange_outcomes(1, 1)
+        # then
+        probs = {(al, dl): p for al, dl, p in result}
+        self.assertAlmostEqual(15 / 36, probs[0, 1])
+        self.assertAlmostEqual(21 / 36, probs[1, 0])
+
+    def test_probabilities_sum_to_one(self):
+        for na in range(1, 4):
+            for nd in range(1, 3):
+                # when
+                result = exchange_outcomes(na, nd)
+                # then
+                self.assertAlmostEqual(1, sum(p for _, _, p in result))
+
+
+class BattleOddsTest(TestCase):
+    def test_single_exchange_battle_matches_exchange_outcomes(self):
+        # when
+        odds = battle_odds(1, 1)
+        # then
+        self.assertAlmostEqual(15 / 36, odds.win_probability)
+        self.assertAlmostEqual(21 / 36, odds.loss_probability)
+        self.assertEqual((0.0, 15 / 36), odds.attacker_survivors)
+        self.assertEqual((0.0, 21 / 36), odds.defender_survivors)
+
+    def test_no_defenders_means_attacker_wins_with_everything(self):
+        # when
+        odds = battle_odds(5, 0)
+        # then
+        self.assertEqual(1.0, odds.win_probability)
+        self.assertEqual(5, odds.expected_attacker_survivors)
+
+    def test_distribution_sums_to_one(self):
+        # when
+        odds = battle_odds(14, 9)
+        # then
+        self.assertAlmostEqual(
+            1, odds.win_probability + odds.loss_probability)
+        self.assertEqual(15, len(odds.attacker_survivors))
+        self.assertEqual(10, len(odds.defender_survivors))
+
+    def test_two_versus_one_recursion(self):
+        # given
+        p_win = 15 / 36
+        # when
+        odds = battle_odds(2, 1)
+        # then
+        self.assertAlmostEqual(125 / 216, odds.attacker_survivors[2])
+        self.assertAlmostEqual((91 / 216) * p_win,
+                               odds.attacker_survivors[1])
+
+    def test_repeated_queries_are_cached(self):
+        # when
+        first = battle_odds(200, 200)
+        second = battle_odds(200, 200)
+        # then
+        self.assertIs(first, second)
+        self.assertAlmostEqual(
+            1, first.win_probability + first.loss_probability)
+
+    def test_negative_armies_raise(self):
+        # expect
+        self.assertRaises(ValueError, battle_odds, -1, 2)
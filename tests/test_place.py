@@ -0,0 +1,128 @@
+from random import Random
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from riskcli import Game, Player, gen_default_map
+from riskengine import AggressivePolicy, HeadlessGame, is_border
+from riskplace import (CONTINENT_WEIGHT, OPPORTUNITY_WEIGHT, THREAT_WEIGHT,
+                       ThreatPolicy, recommend_placements,
+                       reinforcement_counts, threat_scores)
+from riskstate import GameState
+
+
+def random_game(seed):
+    rng = Random(seed)
+    game = Game(players=[Player('p1', 'red'), Player('p2', 'black'),
+                         Player('p3', 'blue')], game_map=gen_default_map())
+    for t in game.game_map.territories:
+        t.owner = rng.choice(game.players)
+        t.num_armies = rng.randint(1, 8)
+    return game
+
+
+def loop_score(t):
+    # The same score, one territory at a time.
+    enemies = [n for n in t.neighbors if n.owner is not t.owner]
+    held = t.owner.count_territories_in(t.continent)
+    return (THREAT_WEIGHT * sum(n.num_armies for n in enemies) /
+            t.num_armies +
+            OPPORTUNITY_WEIGHT * sum(1 / n.num_armies for n in enemies) +
+            CONTINENT_WEIGHT * t.continent.bonus * held /
+            len(t.continent.territories))
+
+
+class ReinforcementCountsTest(TestCase):
+    def test_matches_player_reinforcements(self):
+        for seed in range(5):
+            # given
+            game = random_game(seed)
+            for t in game.game_map.c_by_name['Australia'].territories:
+                t.owner = game.players[seed % 3]
+            # when
+            counts = reinforcement_counts(GameState.from_game(game))
+            # then
+            self.assertEqual([p.reinforcements() for p in game.players],
+                             counts.tolist())
+
+
+class ThreatScoresTest(TestCase):
+    def test_matches_per_territory_scores(self):
+        # given
+        game = random_game(7)
+        player = game.players[1]
+        # when
+        scores, border = threat_scores(GameState.from_game(game), 1)
+        # then
+        for t in game.game_map.territories:
+            if t.owner is player and is_border(t):
+                self.assertTrue(border[t.index])
+                self.assertAlmostEqual(loop_score(t), scores[t.index])
+            else:
+                self.assertFalse(border[t.index])
+                self.assertEqual(0, scores[t.index])
+
+    def test_placements_go_to_the_best_borders(self):
+        # given
+        game = random_game(8)
+        state = GameState.from_game(game)
+        scores, border = threat_scores(state, 0)
+        # when
+        placements = recommend_placements(state, 0, 10, spread=3)
+        # then
+        self.assertEqual(10, sum(n for _, n in placements))
+        self.assertEqual(sorted(scores, reverse=True)[0],
+                         scores[placements[0][0]])
+        for i, _ in placements:
+            self.assertTrue(border[i])
+
+    def test_empty_enemy_neighbors_are_scored(self):
+        # given
+        game = random_game(10)
+        alaska = game.game_map.t_by_name['Alaska']
+        alaska.owner = game.players[0]
+        for t in alaska.neighbors:
+            t.owner = None
+            t.num_armies = 0
+        state = GameState.from_game(game)
+        # when
+        scores, border = threat_scores(state, 0)
+        placements = recommend_placements(state, 0, 7, spread=3)
+        # then
+        self.assertTrue(border[alaska.index])
+        self.assertTrue(np.isfinite(scores).all())
+        self.assertEqual(7, sum(n for _, n in placements))
+        for i, n in placements:
+            self.assertTrue(border[i])
+            self.assertGreater(n, 0)
+
+    def test_zero_scores_are_split_evenly(self):
+        # given
+        game = random_game(11)
+        state = GameState.from_game(game)
+        # when
+        with patch.multiple('riskplace', THREAT_WEIGHT=0.0,
+                            OPPORTUNITY_WEIGHT=0.0, CONTINENT_WEIGHT=0.0):
+            placements = recommend_placements(state, 0, 6, spread=3)
+        # then
+        self.assertEqual([2, 2, 2], [n for _, n in placements])
+
+    def test_default_count_is_what_the_player_is_due(self):
+        # given
+        game = random_game(9)
+        # when
+        placements = recommend_placements(GameState.from_game(game), 2)
+        # then
+        self.assertEqual(game.players[2].reinforcements(),
+                         sum(n for _, n in placements))
+
+
+class ThreatPolicyTest(TestCase):
+    def test_plays_legal_games(self):
+        # given
+        game = HeadlessGame([ThreatPolicy, AggressivePolicy], seed=5)
+        # when
+        result = game.play()
+        # then
+        self.assertIsNotNone(result.winner)
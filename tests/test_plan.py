@@ -0,0 +1,130 @@
+from random import Random
+from unittest import TestCase
+
+import numpy as np
+
+from riskcli import Game, Player, gen_default_map
+from riskengine import AggressivePolicy, HeadlessGame
+from riskplan import PlannerPolicy, plan_attack, transition_matrix
+
+
+def enemy_board(seed, max_defenders=3):
+    game = Game(players=[Player('p1', 'red'), Player('p2', 'black')],
+                game_map=gen_default_map())
+    rng = Random(seed)
+    for t in game.game_map.territories:
+        t.owner = game.players[1]
+        t.num_armies = rng.randint(1, max_defenders)
+    return game
+
+
+def chain_distribution(source, path, num_armies):
+    distribution = np.zeros(num_armies)
+    distribution[num_armies - 1] = 1.0
+    for t in path:
+        distribution = distribution @ transition_matrix(num_armies - 1,
+                                                        t.num_armies)
+    return distribution
+
+
+def best_by_brute_force(source, goal, num_armies, max_length):
+    # Every simple chain of enemy territories up to max_length long.
+    player = source.owner
+    best = 0.0
+
+    def extend(path, visited):
+        nonlocal best
+        if goal <= set(path):
+            best = max(best, chain_distribution(source, path,
+                                                num_armies).sum())
+            return
+        if len(path) == max_length:
+            return
+        last = path[-1] if path else source
+        for n in last.neighbors:
+            if n.owner is not player and n not in visited:
+                extend(path + [n], visited | {n})
+
+    extend([], {source})
+    return best
+
+
+class PlanAttackTest(TestCase):
+    def test_matches_brute_force(self):
+        for seed in range(6):
+            # given
+            game = enemy_board(seed)
+            game_map = game.game_map
+            source = game_map.t_by_name['Brazil']
+            source.owner = game.players[0]
+            source.num_armies = 8 + seed
+            goal = {game_map.t_by_name[name] for name in
+                    ['North Africa', 'Egypt', 'East Africa', 'Congo']}
+            # when
+            plan = plan_attack(source, goal)
+            # then
+            self.assertTrue(goal <= set(plan.path))
+            self.assertAlmostEqual(
+                chain_distribution(source, plan.path,
+                                   source.num_armies).sum(),
+                plan.probability)
+            self.assertAlmostEqual(
+                best_by_brute_force(source, goal, source.num_armies, 6),
+                plan.probability)
+
+    def test_takes_a_continent(self):
+        # given
+        game = enemy_board(1)
+        game_map = game.game_map
+        source = game_map.t_by_name['Ukraine']
+        source.owner = game.players[0]
+        source.num_armies = 50
+        asia = game_map.c_by_name['Asia']
+        # when
+        plan = plan_attack(source, asia, objective='armies')
+        # then
+        self.assertEqual(set(asia.territories), set(plan.path))
+        for a, b in zip([source] + plan.path, plan.path):
+            self.assertIn(b, a.neighbors)
+        self.assertGreater(plan.probability, 0.5)
+        self.assertLess(plan.expected_armies, 50)
+
+    def test_owned_and_unreachable_targets(self):
+        # given
+        game = enemy_board(2)
+        game_map = game.game_map
+        source = game_map.t_by_name['Brazil']
+        source.owner = game.players[0]
+        source.num_armies = 10
+        for name in ['Argentina', 'Peru', 'Venezuela']:
+            game_map.t_by_name[name].owner = game.players[0]
+        south_america = game_map.c_by_name['South America']
+        # expect
+        self.assertEqual([], plan_attack(source, south_america).path)
+        self.assertIsNone(plan_attack(
+            game_map.t_by_name['Peru'], [game_map.t_by_name['Siam']],
+            num_armies=2))
+
+    def test_time_budget(self):
+        # given
+        game = enemy_board(3, max_defenders=5)
+        source = game.game_map.t_by_name['Ukraine']
+        source.owner = game.players[0]
+        source.num_armies = 30
+        # when
+        plan = plan_attack(source, game.game_map.c_by_name['Asia'],
+                           time_budget=0.01)
+        # then
+        self.assertLess(plan.elapsed, 0.1)
+
+
+class PlannerPolicyTest(TestCase):
+    def test_plays_legal_games(self):
+        # given
+        game = HeadlessGame([PlannerPolicy, AggressivePolicy], seed=6)
+        # when
+        result = game.play()
+        # then
+        self.assertIsNotNone(result.winner)
+        for t in game.game.game_map.territories:
+            self.assertGreaterEqual(t.num_armies, 1)
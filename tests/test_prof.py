@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+import riskcli
+import riskprof
+from riskcli import Game, Player, gen_default_map
+from riskprof import (CollapsedStackExporter, Instrumentation, JsonExporter,
+                      Sampler)
+
+
+class InstrumentationTest(TestCase):
+    def test_disabled_leaves_functions_untouched(self):
+        # given
+        roll = riskcli.roll
+        owner = riskcli.Territory.__dict__['owner']
+        instrumentation = Instrumentation()
+        # when
+        instrumentation.enable()
+        # then
+        self.assertIsNot(roll, riskcli.roll)
+        instrumentation.disable()
+        self.assertIs(roll, riskcli.roll)
+        self.assertIs(owner, riskcli.Territory.__dict__['owner'])
+
+    def test_counts_calls_and_times(self):
+        # given
+        instrumentation = Instrumentation()
+        instrumentation.enable([('riskcli', 'roll'),
+                                ('riskcli', 'Territory.owner')])
+        try:
+            # when
+            for _ in range(3):
+                riskcli.roll(3)
+            game = Game(players=[Player('p1', 'red')],
+                        game_map=gen_default_map())
+            territory = game.game_map.territories[0]
+            territory.owner = game.players[0]
+            owner = territory.owner
+        finally:
+            instrumentation.disable()
+        # then
+        self.assertIs(game.players[0], owner)
+        report = instrumentation.report()
+        self.assertEqual(3, report['riskcli.roll']['calls'])
+        self.assertEqual(3, sum(report['riskcli.roll']['histogram']))
+        self.assertGreater(report['riskcli.roll']['total_ns'], 0)
+        self.assertGreaterEqual(report['riskcli.Territory.owner']['calls'],
+                                1)
+
+    def test_reset_keeps_recording(self):
+        # given
+        instrumentation = Instrumentation()
+        instrumentation.enable([('riskcli', 'roll')])
+        try:
+            riskcli.roll(1)
+            # when
+            instrumentation.reset()
+            riskcli.roll(1)
+        finally:
+            instrumentation.disable()
+        # then
+        self.assertEqual(1, instrumentation.stats['riskcli.roll'].calls)
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_sampled_games_export(self):
+        # given
+        from riskengine import AggressivePolicy, RandomPolicy
+        stats, stacks = riskprof.profile_games(
+            3, [AggressivePolicy, RandomPolicy], interval=0.0005)
+        json_path = os.path.join(self.dir, 'report.json')
+        folded_path = os.path.join(self.dir, 'report.folded')
+        # when
+        JsonExporter().write(json_path, stats, stacks)
+        CollapsedStackExporter().write(folded_path, stats, stacks)
+        # then
+        with open(json_path) as f:
+            report = json.load(f)
+        self.assertIn('riskengine.HeadlessGame.play_turn',
+                      report['functions'])
+        with open(folded_path) as f:
+            for line in f:
+                stack, count = line.rsplit(' ', 1)
+                self.assertGreater(int(count), 0)
+                self.assertNotIn('wrapper', stack)
+        self.assertFalse(riskprof.instrumentation.enabled)
+
+
+class SamplerTest(TestCase):
+    def busy(self, seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    def test_samples_the_calling_thread(self):
+        # when
+        with Sampler(interval=0.001) as sampler:
+            self.busy(0.05)
+        # then
+        self.assertTrue(sampler.stacks)
+        self.assertTrue(any('test_prof.py:busy' in stack
+                            for stack in sampler.stacks))
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import riskprof
+from riskserver import END_OF_RESPONSE, Server, load_test
+
+
+async def send(reader, writer, line):
+    writer.write(line.encode() + b'\n')
+    response = await reader.readuntil(END_OF_RESPONSE)
+    return response.decode()
+
+
+class ServerTest(TestCase):
+    def run_with_server(self, coroutine_fn):
+        async def main():
+            server = Server(max_suggest_ms=10)
+            listener = await server.start()
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                result = await coroutine_fn(server, port)
+                # Let the sessions see their clients go before the loop
+                # shuts down and cancels them.
+                for _ in range(1000):
+                    if not server.sessions:
+                        break
+                    await asyncio.sleep(0.001)
+                return result
+        return asyncio.run(main())
+
+    def test_sessions_have_their_own_games(self):
+        async def scenario(server, port):
+            first = await asyncio.open_connection('127.0.0.1', port)
+            second = await asyncio.open_connection('127.0.0.1', port)
+            greeting = await first[0].readuntil(END_OF_RESPONSE)
+            await second[0].readuntil(END_OF_RESPONSE)
+            started = await send(*first, 'start')
+            player = await send(*first, 'player')
+            view = await send(*first, 'view Alaska')
+            other = await send(*second, 'player')
+            sessions = server.sessions
+            for _, writer in [first, second]:
+                writer.close()
+            return greeting.decode(), started, player, view, other, sessions
+
+        # when
+        greeting, started, player, view, other, sessions = \
+            self.run_with_server(scenario)
+        # then
+        self.assertIn('No game started', greeting)
+        self.assertIn('The players, in order, are:', started)
+        self.assertIn('player1', player)
+        self.assertIn('Alaska', view)
+        self.assertIn('Error:', other)
+        self.assertIn('No game started', other)
+        self.assertEqual(2, sessions)
+
+    def test_event_logs_are_refused(self):
+        async def scenario(server, port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await reader.readuntil(END_OF_RESPONSE)
+            response = await send(reader, writer, 'start /tmp/x.log')
+            writer.close()
+            return response
+
+        # expect
+        self.assertIn('can\'t be written', self.run_with_server(scenario))
+
+    def test_stats_can_only_be_shown(self):
+        async def scenario(server, port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await reader.readuntil(END_OF_RESPONSE)
+            responses = [await send(reader, writer, line)
+                         for line in ['stats save ' + path, 'stats on',
+                                      'stats reset', 'stats']]
+            writer.close()
+            return responses
+
+        # given
+        path = os.path.join(tempfile.mkdtemp(), 'stats.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        # when
+        save, on, reset, show = self.run_with_server(scenario)
+        # then
+        for response in [save, on, reset]:
+            self.assertIn('Only "stats" and "stats show"', response)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(riskprof.instrumentation.enabled)
+        self.assertNotIn('Only', show)
+
+    def test_expensive_arguments_are_refused(self):
+        async def scenario(server, port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await reader.readuntil(END_OF_RESPONSE)
+            responses = [await send(reader, writer, line)
+                         for line in ['odds 10000 10000', 'roll 100000000',
+                                      'roll +3000000', 'odds 2_000 2_000',
+                                      'attack 3 +1000000',
+                                      'roll \t 1000', 'roll 2', 'odds 5 3']]
+            writer.close()
+            return responses
+
+        # when
+        *refused, small_roll, small_odds = self.run_with_server(scenario)
+        # then
+        odds, roll, plus, underscores, attack, spaced = refused
+        for response in [odds, underscores]:
+            self.assertIn('takes numbers up to 500', response)
+        for response in [roll, plus, attack, spaced]:
+            self.assertIn('takes numbers up to 100', response)
+        self.assertRegex(small_roll, r'\[\d, \d\]')
+        self.assertIn('attacker wins', small_odds)
+
+    def test_load_test_measures_every_command(self):
+        async def scenario(server, port):
+            return await load_test('127.0.0.1', port, clients=5,
+                                   commands=10, idle=20)
+
+        # when
+        latencies, elapsed = self.run_with_server(scenario)
+        # then
+        self.assertEqual(50, len(latencies))
+        self.assertEqual(sorted(latencies), latencies)
+        self.assertGreater(elapsed, 0)
@@ -0,0 +1,108 @@
+from itertools import product
+from random import seed
+from unittest import TestCase
+
+import numpy as np
+
+from riskcli import roll, resolve_exchange
+from riskodds import battle_odds, exchange_outcomes
+from risksim import (roll_batch, resolve_exchanges, simulate_exchanges,
+                     simulate_battles)
+
+
+def scalar_battle(attackers, defenders):
+    while attackers > 0 and defenders > 0:
+        attacker_loses, defender_loses = resolve_exchange(
+            roll(min(attackers, 3)), roll(min(defenders, 2)))
+        attackers -= attacker_loses
+        defenders -= defender_loses
+    return attackers, defenders
+
+
+class RollBatchTest(TestCase):
+    def test_rows_are_sorted_highest_first_and_padded(self):
+        # when
+        dice = roll_batch([1, 2, 3], 3, rng=0)
+        # then
+        self.assertEqual((3, 3), dice.shape)
+        for row, n in zip(dice.tolist(), [1, 2, 3]):
+            self.assertEqual(sorted(row, reverse=True), row)
+            self.assertTrue(all(1 <= x <= 6 for x in row[:n]))
+            self.assertTrue(all(x == 0 for x in row[n:]))
+
+    def test_same_seed_gives_same_dice(self):
+        # expect
+        np.testing.assert_array_equal(roll_batch(3, 100, rng=42),
+                                      roll_batch(3, 100, rng=42))
+
+
+class ResolveExchangesTest(TestCase):
+    def test_matches_scalar_resolve_exchange_for_every_roll(self):
+        for na, nd in product(range(1, 4), range(1, 3)):
+            # given
+            rolls = [(sorted(r[:na], reverse=True),
+                      sorted(r[na:], reverse=True))
+                     for r in product(range(1, 7), repeat=na + nd)]
+            rattacker = np.zeros((len(rolls), 3), dtype=np.int8)
+            rdefender = np.zeros((len(rolls), 2), dtype=np.int8)
+            for i, (ra, rd) in enumerate(rolls):
+                rattacker[i, :na] = ra
+                rdefender[i, :nd] = rd
+            expected = [resolve_exchange(ra, rd) for ra, rd in rolls]
+            # when
+            attacker_loses, defender_loses = resolve_exchanges(rattacker,
+                                                               rdefender)
+            # then
+            self.assertEqual(expected,
+                             list(zip(attacker_loses.tolist(),
+                                      defender_loses.tolist())))
+
+    def test_exchange_frequencies_match_exact_odds(self):
+        # when
+        attacker_loses, _ = simulate_exchanges(3, 2, 200000, rng=1)
+        # then
+        freqs = np.bincount(attacker_loses, minlength=3) / 200000
+        for (al, _, p) in exchange_outcomes(3, 2):
+            self.assertAlmostEqual(p, freqs[al], delta=0.01)
+
+
+class SimulateBattlesTest(TestCase):
+    def test_every_battle_ends_with_one_side_eliminated(self):
+        # when
+        a, d = simulate_battles(10, 10, 1000, rng=3)
+        # then
+        self.assertTrue(((a == 0) ^ (d == 0)).all())
+        self.assertTrue((a <= 10).all())
+        self.assertTrue((d <= 10).all())
+
+    def test_per_battle_army_counts(self):
+        # when
+        a, d = simulate_battles([5, 0, 3], [0, 4, 1], 3, rng=3)
+        # then
+        self.assertEqual(5, a[0])
+        self.assertEqual(4, d[1])
+        self.assertEqual(0, a[1])
+
+    def test_seeded_runs_are_reproducible(self):
+        # when
+        first = simulate_battles(7, 5, 1000, rng=np.random.default_rng(9))
+        second = simulate_battles(7, 5, 1000, rng=np.random.default_rng(9))
+        # then
+        np.testing.assert_array_equal(first[0], second[0])
+        np.testing.assert_array_equal(first[1], second[1])
+
+    def test_win_rate_agrees_with_scalar_path_and_exact_odds(self):
+        # given
+        seed(5)
+        n = 20000
+        scalar_wins = sum(scalar_battle(6, 4)[0] > 0 for _ in range(n))
+        # when
+        a, _ = simulate_battles(6, 4, n, rng=5)
+        # then
+        exact = battle_odds(6, 4).win_probability
+        self.assertAlmostEqual(exact, (a > 0).mean(), delta=0.02)
+        self.assertAlmostEqual(exact, scalar_wins / n, delta=0.02)
+
+    def test_negative_armies_raise(self):
+        # expect
+        self.assertRaises(ValueError, simulate_battles, 3, -1, 10)
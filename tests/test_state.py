@@ -0,0 +1,115 @@
+from itertools import cycle
+from unittest import TestCase
+
+from riskcli import Game, Player, gen_default_map, ALASKA, KAMCHATKA
+from riskstate import GameState, NO_OWNER
+
+
+def make_game():
+    game = Game(players=[Player('p1', 'red'), Player('p2', 'black')],
+                game_map=gen_default_map())
+    for i, (t, p) in enumerate(zip(game.game_map.territories,
+                                   cycle(game.players))):
+        t.owner = p
+        t.num_armies = 1 + i % 4
+    return game
+
+
+class MapIndexTest(TestCase):
+    def test_territories_are_indexed_in_map_order(self):
+        # when
+        game_map = gen_default_map()
+        # then
+        for i, t in enumerate(game_map.territories):
+            self.assertEqual(i, t.index)
+
+    def test_adjacency_matches_neighbors(self):
+        # given
+        game_map = gen_default_map()
+        # expect
+        for t in game_map.territories:
+            self.assertEqual(
+                {n.index for n in t.neighbors},
+                set(game_map.neighbor_indexes(t.index)))
+
+    def test_copy_has_same_topology_and_fresh_objects(self):
+        # given
+        game_map = gen_default_map()
+        # when
+        result = game_map.copy()
+        # then
+        self.assertEqual(list(game_map.adjacency), list(result.adjacency))
+        self.assertEqual(list(game_map.continent_of),
+                         list(result.continent_of))
+        self.assertIsNot(game_map.t_by_name[ALASKA],
+                         result.t_by_name[ALASKA])
+
+
+class GameStateTest(TestCase):
+    def test_from_game_captures_owners_and_armies(self):
+        # given
+        game = make_game()
+        # when
+        state = GameState.from_game(game)
+        # then
+        for t in game.game_map.territories:
+            self.assertIs(t.owner, game.players[state.owners[t.index]])
+            self.assertEqual(t.num_armies, state.armies[t.index])
+        self.assertEqual(0, state.next_player)
+        self.assertEqual(21, state.count_territories(0))
+
+    def test_round_trip_through_new_game(self):
+        # given
+        game = make_game()
+        state = GameState.from_game(game)
+        # when
+        result = state.to_game()
+        # then
+        self.assertEqual(['p1', 'p2'], [p.name for p in result.players])
+        for t, u in zip(game.game_map.territories,
+                        result.game_map.territories):
+            self.assertEqual(t.name, u.name)
+            self.assertEqual(t.owner.name, u.owner.name)
+            self.assertEqual(t.num_armies, u.num_armies)
+        self.assertEqual(GameState.from_game(result).owners, state.owners)
+
+    def test_copy_is_independent(self):
+        # given
+        state = GameState.from_game(make_game())
+        # when
+        other = state.copy()
+        other.owners[0] = NO_OWNER
+        other.armies[0] = 99
+        # then
+        self.assertNotEqual(NO_OWNER, state.owners[0])
+        self.assertNotEqual(99, state.armies[0])
+        self.assertIs(state.game_map, other.game_map)
+
+    def test_apply_to_updates_existing_game(self):
+        # given
+        game = make_game()
+        state = GameState.from_game(game)
+        kamchatka = game.game_map.t_by_name[KAMCHATKA]
+        state.owners[kamchatka.index] = 1 - state.owners[kamchatka.index]
+        state.armies[kamchatka.index] = 7
+        state.next_player = 1
+        # when
+        state.apply_to(game)
+        # then
+        self.assertIs(game.players[state.owners[kamchatka.index]],
+                      kamchatka.owner)
+        self.assertIn(kamchatka, kamchatka.owner.territories)
+        self.assertEqual(7, kamchatka.num_armies)
+        self.assertIs(game.players[1], game.next_player)
+
+    def test_count_armies_and_borders(self):
+        # given
+        game = make_game()
+        state = GameState.from_game(game)
+        # expect
+        self.assertEqual(
+            sum(t.num_armies for t in game.players[0].territories),
+            state.count_armies(0))
+        for t in game.game_map.territories:
+            self.assertEqual(any(n.owner is not t.owner for n in t.neighbors),
+                             state.is_border(t.index))
@@ -0,0 +1,66 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+from benchmarks.suite import compare, main
+
+
+def results(**seconds):
+    return {'results': {name: {'seconds_per_call': s}
+                        for name, s in seconds.items()}}
+
+
+class CompareTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def compare(self, baseline, current, threshold=0.10):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            regressions = compare(baseline, current, threshold)
+        return regressions, out.getvalue()
+
+    def test_regressions_and_improvements(self):
+        # when
+        regressions, output = self.compare(
+            results(slower=1.0, faster=1.0, same=1.0),
+            results(slower=1.2, faster=0.5, same=1.05, new=1.0))
+        # then
+        self.assertEqual(['slower'], regressions)
+        lines = {line.split()[0]: line for line in output.splitlines()}
+        self.assertIn('REGRESSION', lines['slower'])
+        self.assertIn('faster', lines['faster'])
+        self.assertNotIn('REGRESSION', lines['same'])
+        self.assertNotIn('faster', lines['same'])
+        self.assertIn('new', lines['new'])
+
+    def test_zero_baseline_is_not_compared(self):
+        # when
+        regressions, output = self.compare(results(a=0.0), results(a=1.0))
+        # then
+        self.assertEqual([], regressions)
+        self.assertIn('no usable baseline', output)
+
+    def test_compare_command_exits_with_1_on_regression(self):
+        # given
+        paths = []
+        for name, seconds in [('baseline', 1.0), ('current', 2.0)]:
+            paths.append(os.path.join(self.dir, f'{name}.json'))
+            with open(paths[-1], 'w') as f:
+                json.dump(results(a=seconds), f)
+        # when
+        with redirect_stdout(io.StringIO()), \
+                self.assertRaises(SystemExit) as raised:
+            main(['compare', *paths])
+        # then
+        self.assertEqual(1, raised.exception.code)
+        # expect
+        with redirect_stdout(io.StringIO()):
+            main(['compare', paths[1], paths[0]])
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from random import Random
+from unittest import TestCase
+
+import numpy as np
+
+from riskcli import resolve_exchange
+from riskodds import exchange_outcomes
+from risksim import sample_exchanges
+from risktables import (DICE, HEADER_SIZE, ROLLS, TABLES, build_tables,
+                        exchange_dice, load_tables, sample_exchange,
+                        table_offset)
+
+
+class ExchangeTablesTest(TestCase):
+    def test_tables_hold_the_exact_distribution(self):
+        for na in range(1, 4):
+            for nd in range(1, 3):
+                # given
+                offset = table_offset(na, nd)
+                counts = {}
+                for code in TABLES[offset:offset + ROLLS]:
+                    key = (code >> 2, code & 3)
+                    counts[key] = counts.get(key, 0) + 1
+                # expect
+                self.assertEqual(
+                    [(al, dl, round(p * ROLLS))
+                     for al, dl, p in exchange_outcomes(na, nd)],
+                    [(al, dl, count)
+                     for (al, dl), count in sorted(counts.items())])
+
+    def test_entries_match_the_dice_they_stand_for(self):
+        for roll in range(0, ROLLS, 7):
+            for na, nd in [(1, 1), (3, 2), (2, 1)]:
+                # given
+                attacker, defender = exchange_dice(roll, na, nd)
+                # expect
+                self.assertEqual(
+                    resolve_exchange(attacker, defender),
+                    (TABLES[table_offset(na, nd) + roll] >> 2,
+                     TABLES[table_offset(na, nd) + roll] & 3))
+        self.assertEqual(([1, 1, 1], [1, 1]), exchange_dice(0, 3, 2))
+        self.assertEqual(([6, 6, 6], [6, 6]),
+                         exchange_dice(6 ** DICE - 1, 3, 2))
+
+    def test_sampled_exchanges_follow_the_exact_odds(self):
+        # given
+        rng = Random(2)
+        n = 60000
+        # when
+        scalar = [sample_exchange(3, 2, rng)[0] for _ in range(n)]
+        vector, _ = sample_exchanges(3, 2, n, rng=2)
+        # then
+        for al, _, p in exchange_outcomes(3, 2):
+            self.assertAlmostEqual(p, scalar.count(al) / n, delta=0.01)
+            self.assertAlmostEqual(p, (vector == al).mean(), delta=0.01)
+
+
+class TableCacheTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'cache', 'tables.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_built_once_then_read(self):
+        # when
+        built = load_tables(self.path)
+        # then
+        self.assertEqual(build_tables(), built)
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(built, load_tables(self.path))
+
+    def test_bad_cache_is_rebuilt(self):
+        # given
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'wb') as f:
+            f.write(b'RISKXCH2 but cut short')
+        # expect
+        self.assertEqual(TABLES, load_tables(self.path))
+        self.assertEqual(TABLES, load_tables(self.path))
+        self.assertTrue(np.array_equal(
+            np.frombuffer(TABLES, dtype=np.uint8),
+            np.fromfile(self.path, dtype=np.uint8)[HEADER_SIZE:]))
+
+    def test_corrupted_cache_is_rebuilt(self):
+        # given
+        load_tables(self.path)
+        with open(self.path, 'r+b') as f:
+            f.seek(HEADER_SIZE + table_offset(3, 2) + 1234)
+            f.write(bytes([TABLES[table_offset(3, 2) + 1234] ^ 5]))
+        # when
+        tables = load_tables(self.path)
+        # then
+        self.assertEqual(TABLES, tables)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(TABLES, f.read()[HEADER_SIZE:])
@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+from risktour import (SPRT, Matchup, Tournament, elo_from_score,
+                      run_tournament, score_from_elo)
+
+
+def matchup(wins, losses, draws=0, a='a', b='b'):
+    m = Matchup(a, b)
+    m.add(wins, losses, draws)
+    return m
+
+
+class EloTest(TestCase):
+    def test_score_and_elo_convert_both_ways(self):
+        # expect
+        self.assertAlmostEqual(0.5, score_from_elo(0))
+        self.assertAlmostEqual(0.75, score_from_elo(elo_from_score(0.75)))
+        self.assertAlmostEqual(-191.0, elo_from_score(0.25), places=0)
+
+    def test_interval_narrows_with_games(self):
+        # given
+        few = matchup(6, 4)
+        many = matchup(600, 400)
+        # expect
+        for m in [few, many]:
+            low, high = m.elo_interval()
+            self.assertLess(low, m.elo)
+            self.assertLess(m.elo, high)
+        self.assertLess(many.elo_interval()[1] - many.elo_interval()[0],
+                        few.elo_interval()[1] - few.elo_interval()[0])
+
+    def test_ratings_fit_the_results(self):
+        # given
+        tournament = Tournament(['a', 'b', 'c'], [
+            matchup(750, 250, a='a', b='b'),
+            matchup(750, 250, a='b', b='c'),
+            matchup(900, 100, a='a', b='c')], 0.0)
+        # when
+        ratings = tournament.ratings()
+        # then
+        self.assertAlmostEqual(0.0, sum(ratings.values()))
+        self.assertGreater(ratings['a'], ratings['b'])
+        self.assertGreater(ratings['b'], ratings['c'])
+        self.assertAlmostEqual(191, ratings['a'] - ratings['b'], delta=20)
+
+
+class SPRTTest(TestCase):
+    def test_decisions(self):
+        # given
+        sprt = SPRT(elo=20)
+        # expect
+        self.assertEqual('a', sprt.decide(matchup(600, 400)))
+        self.assertEqual('b', sprt.decide(matchup(400, 600)))
+        self.assertEqual('equal', sprt.decide(matchup(2000, 2000)))
+        self.assertIsNone(sprt.decide(matchup(6, 4)))
+        self.assertIsNone(sprt.decide(matchup(0, 0)))
+
+
+class RunTournamentTest(TestCase):
+    def test_stops_early_and_matches_across_workers(self):
+        # given
+        names = ['aggressive', 'passive', 'random']
+        # when
+        serial = run_tournament(names, seed=1, workers=1, batch_size=5)
+        parallel = run_tournament(names, seed=1, workers=2, batch_size=5)
+        # then
+        self.assertEqual(3, len(serial.matchups))
+        for m, other in zip(serial.matchups, parallel.matchups):
+            self.assertLess(m.games, 100)
+            self.assertEqual((m.wins, m.losses, m.draws, m.decision),
+                             (other.wins, other.losses, other.draws,
+                              other.decision))
+        self.assertEqual('aggressive', serial.matchups[0].decision)
+        ratings = serial.ratings()
+        self.assertEqual('aggressive', max(ratings, key=ratings.get))
+
+    def test_game_limit(self):
+        # when
+        tournament = run_tournament(['aggressive', 'aggressive'], workers=1,
+                                    batch_size=5, max_games=20)
+        # then
+        m, = tournament.matchups
+        self.assertEqual(20, m.games)
+        self.assertEqual('undecided', m.decision)